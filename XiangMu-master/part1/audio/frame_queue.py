@@ -0,0 +1,82 @@
+import numpy as np
+from config import CHUNK, RATE, RING_SEC
+
+
+class FrameQueue:
+    """
+    单生产者/单消费者的定长帧队列(无锁)
+    - 预分配 capacity × frame_size 的 int16 数组
+    - 生产者只修改 _tail，消费者只修改 _head，整数赋值在 GIL 下是原子的，无需加锁
+    - 队列满时丢弃新帧并计入 overflows；drain 时数据不足计入 underflows
+    - position 是下一帧在生产者写入序列中的样本位置(含被丢弃的帧)，
+      消费者据此得到与生产者一致的绝对位置，丢帧处表现为位置跳跃
+    """
+    def __init__(self, capacity: int = RATE * RING_SEC // CHUNK, frame_size: int = CHUNK):
+        self._frames = np.zeros((capacity + 1, frame_size), dtype=np.int16)  # 多留一格区分空/满
+        self._slots = capacity + 1
+        self.frame_size = frame_size
+        self._head = 0  # 下一个读取位置(仅消费者修改)
+        self._tail = 0  # 下一个写入位置(仅生产者修改)
+        self.overflows = 0  # 因队列已满被丢弃的帧数(仅生产者修改)
+        self.underflows = 0  # 数据不足的 drain 次数(仅消费者修改)
+        self.position = 0  # 下一次 drain 返回数据的起始样本位置(仅消费者修改)
+        self._overflows_seen = 0  # 已计入 position 的丢帧数(仅消费者修改)
+
+    def __len__(self):
+        return (self._tail - self._head) % self._slots
+
+    def push(self, frame) -> bool:
+        """
+        生产者写入一帧
+        param frame: int16 数组或 PCM 字节，长度为 frame_size
+        return: 队列已满时丢弃该帧并返回 False
+        """
+        tail = self._tail
+        nxt = (tail + 1) % self._slots
+        if nxt == self._head:
+            self.overflows += 1
+            return False
+        if isinstance(frame, (bytes, bytearray, memoryview)):
+            frame = np.frombuffer(frame, np.int16)
+        self._frames[tail] = frame
+        self._tail = nxt  # 数据写完后再发布
+        return True
+
+    def drain(self, n: int = None):
+        """
+        消费者批量取出最多 n 帧
+        param n: 帧数，None 表示取出全部
+        return: 连续的一维 int16 数组，无数据时返回 None
+        """
+        head, tail = self._head, self._tail
+        available = (tail - head) % self._slots
+        if n is None:
+            n = available
+        if available < n or available == 0:
+            self.underflows += 1
+            n = available
+        if n == 0:
+            return None
+        end = head + n
+        if end <= self._slots:
+            out = self._frames[head:end].ravel().copy()
+        else:
+            out = np.concatenate((self._frames[head:].ravel(),
+                                  self._frames[:end - self._slots].ravel()))
+        self._head = end % self._slots
+        self.position += n * self.frame_size
+        # 丢帧只发生在队列满时，在 _head 前移之前发生的丢帧必然位于已有的全部帧之后：
+        # 本次取空了队列时计入 position，否则留到取完剩余帧的那次 drain
+        if n == available:
+            overflows = self.overflows
+            self.position += (overflows - self._overflows_seen) * self.frame_size
+            self._overflows_seen = overflows
+        return out
+
+    def clear(self):
+        """丢弃所有帧(仅在生产者停止时调用)"""
+        self._head = self._tail = 0
+        self.overflows = 0
+        self.underflows = 0
+        self.position = 0
+        self._overflows_seen = 0
@@ -1,5 +1,10 @@
 #音频采集与缓冲模块
 from .recorder import AudioRecorder
 from .stream_buffer import StreamBuffer
+from .segment_store import SegmentStore
+from .frame_queue import FrameQueue
+from .vad_segmenter import VadSegmenter, Utterance
+from .sources import AudioSource, MicrophoneSource, WavFileSource, SyntheticSource
 
-__all__ = ["AudioRecorder", "StreamBuffer"]
\ No newline at end of file
+__all__ = ["AudioRecorder", "StreamBuffer", "SegmentStore", "FrameQueue", "VadSegmenter", "Utterance",
+           "AudioSource", "MicrophoneSource", "WavFileSource", "SyntheticSource"]
\ No newline at end of file
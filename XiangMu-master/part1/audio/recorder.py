@@ -1,85 +1,150 @@
+import queue
 import threading
-import pyaudio
+import time
 import logging
 import numpy as np
-import webrtcvad
-from array import array
-from config import CHUNK, RATE, CHANNELS, FORMAT  
+from audio.frame_queue import FrameQueue
+from audio.segment_store import SegmentStore
+from audio.sources import MicrophoneSource
+from audio.vad_segmenter import VadSegmenter
+from config import RATE
 
 _logger = logging.getLogger(__name__)
-_vad = webrtcvad.Vad(3)
+
+_STOP = object()  # 停止录音时投递的哨兵，标记本次录音的最后一帧
+
 
 class AudioRecorder(threading.Thread):
-    """音频录制器，基于PyAudio实现实时音频采集与处理"""
+    """
+    音频录制器，从可替换的音频源(默认麦克风)事件驱动地采集音频
+    - 空闲时音频源处于停止状态，采集线程阻塞在队列上，几乎不占用CPU
+    - 开始录音时先启动音频源，再返回，保证不丢失开头的音频帧
+    """
     daemon = True
 
-    def __init__(self):
+    def __init__(self, source=None):
+        """
+        param source: AudioSource 实例，None 时使用麦克风
+        """
         super().__init__()
-        self._pa = pyaudio.PyAudio() 
-        self._stream = None
-        self._is_recording = False 
-        self.full_audio = array("h")  
-        self.realtime_buffer = array("h") 
-        self.buffer_lock = threading.Lock()  
+        self._frames = queue.Queue()  # 音频源回调 -> 采集线程 的帧队列
+        self.source = source if source is not None else MicrophoneSource()
+        self.source.open(self._on_frame)
+        self._source_lock = threading.Lock()
+        self._drained = threading.Event()  # 停止录音后，剩余帧处理完毕的信号
+        self._drained.set()
+        self._is_recording = False
+        self.full_audio = SegmentStore()  # 完整录音(保留句间停顿)
+        self.utterances = queue.Queue()  # 已完成的语音段，录音结束时放入 None
+        self.segmenter = VadSegmenter(self.utterances)
+        self.realtime_frames = FrameQueue()  # 采集线程 -> 实时识别 的无锁帧队列
+        self._reset_capture_stats()
 
     def start_recording(self):
-        """开始录音，初始化缓冲区"""
+        """开始录音，初始化缓冲区并启动音频源"""
         if self._is_recording:
             return
-        self.full_audio = array("h")
-        self.realtime_buffer = array("h")
+        self._drained.wait()
+        self.full_audio.clear()
+        self.segmenter.reset()
+        while not self.utterances.empty():
+            self.utterances.get_nowait()
+        self.realtime_frames.clear()
+        self._reset_capture_stats()
+        self._drained.clear()
         self._is_recording = True
+        with self._source_lock:
+            self.source.start()
 
     def stop_recording(self):
-        """停止录音"""
+        """停止录音，并等待已采集的帧全部处理完毕"""
+        if not self._is_recording:
+            return
         self._is_recording = False
+        with self._source_lock:
+            # 音频源停止后不会再有回调，末尾的帧都已进入队列
+            self.source.stop()
+        self._frames.put(_STOP)
+        if self.is_alive():
+            self._drained.wait()
+        else:
+            self._drained.set()
+
+    def _on_frame(self, data):
+        """音频源回调：记录帧到达间隔(衡量采集抖动)后转交采集线程"""
+        now = time.perf_counter()
+        if self._last_frame_t is not None:
+            gap = now - self._last_frame_t
+            self._jitter_sum += abs(gap - self._frame_sec)
+            self._max_gap = max(self._max_gap, gap)
+        self._last_frame_t = now
+        self._frame_count += 1
+        self._frames.put(data)
+
+    def _reset_capture_stats(self):
+        self._frame_sec = self.realtime_frames.frame_size / RATE
+        self._last_frame_t = None
+        self._frame_count = 0
+        self._jitter_sum = 0.0
+        self._max_gap = 0.0
+
+    def capture_stats(self) -> dict:
+        """
+        本次录音的采集统计
+        return: frames 帧数；dropped 丢帧数(音频源溢出 + 实时队列溢出)；
+                mean_jitter_ms 帧到达间隔与帧时长之差的平均值；max_gap_ms 最大到达间隔
+        """
+        intervals = max(1, self._frame_count - 1)
+        return {
+            "frames": self._frame_count,
+            "dropped": getattr(self.source, "overflows", 0) + self.realtime_frames.overflows,
+            "mean_jitter_ms": self._jitter_sum / intervals * 1000,
+            "max_gap_ms": self._max_gap * 1000,
+        }
 
     def get_realtime_chunk(self, max_length=None):
         """
         获取实时音频片段
-        :param max_length: 最大长度限制，None表示获取全部
+        :param max_length: 最大长度限制(样本数，按整帧取)，None表示获取全部
         :return: 音频数据的numpy数组( dtype=int16 )，无数据时返回None
         """
-        with self.buffer_lock:
-            if not self.realtime_buffer:
-                return None
-            if max_length and len(self.realtime_buffer) > max_length:
-                chunk = self.realtime_buffer[:max_length]
-                self.realtime_buffer = self.realtime_buffer[max_length:]
-            else:
-                chunk = self.realtime_buffer
-                self.realtime_buffer = array("h")
-            return np.array(chunk, dtype="int16")
+        frames = None if not max_length else max(1, max_length // self.realtime_frames.frame_size)
+        return self.realtime_frames.drain(frames)
+
+    @property
+    def realtime_position(self) -> int:
+        """下一次 get_realtime_chunk 返回数据在本次录音中的样本位置(实时队列丢帧时会跳过被丢弃的部分)"""
+        return self.realtime_frames.position
 
     @property
     def is_recording(self):
         """获取当前录音状态"""
         return self._is_recording
 
+    @staticmethod
+    def measure_idle_cpu(seconds: float = 1.0) -> float:
+        """
+        测量一段时间内进程的CPU占用率，用于验证空闲时不再空转
+        param seconds: 测量时长(秒)
+        return: CPU时间 / 墙钟时间，单核满载约为1.0
+        """
+        cpu_start = time.process_time()
+        wall_start = time.perf_counter()
+        time.sleep(seconds)
+        return (time.process_time() - cpu_start) / (time.perf_counter() - wall_start)
+
     def run(self):
-        """线程主方法，持续采集音频数据"""
-        self._stream = self._pa.open(
-            format=getattr(pyaudio, f"pa{FORMAT}"),  
-            channels=CHANNELS,  
-            rate=RATE,  
-            input=True, 
-            frames_per_buffer=CHUNK, 
-        )
-        self._stream.start_stream()
-        
+        """线程主方法，阻塞等待回调送来的音频帧并处理"""
         while True:
-            if not self._is_recording:
-                continue 
-            try:
-                data = self._stream.read(CHUNK, exception_on_overflow=False)
-            except Exception as e:
-                _logger.error("读取音频流失败: %s", e)
+            data = self._frames.get()
+            if data is _STOP:
+                self.segmenter.flush()
+                self.utterances.put(None)
+                self._drained.set()
                 continue
-            
+
             pcm = np.frombuffer(data, np.int16)
-            
-            with self.buffer_lock:
-                self.realtime_buffer.extend(pcm)
-            
-            if _vad.is_speech(data, RATE):
-                self.full_audio.extend(pcm)
\ No newline at end of file
+            self.realtime_frames.push(pcm)
+
+            self.full_audio.extend(pcm)
+            self.segmenter.feed(pcm)
@@ -0,0 +1,72 @@
+import logging
+import tempfile
+import numpy as np
+from config import RATE, MAX_RECORD_SEC, SPILL_SEC
+
+_logger = logging.getLogger(__name__)
+
+
+class SegmentStore:
+    """
+    整段录音存储，替代不断 extend 的 array("h")
+    - 内存层：预分配 SPILL_SEC 秒的int16数组，按块顺序写入
+    - 磁盘层：超过阈值后溢写到临时文件的内存映射，之后的块直接写入映射区
+    - view() 始终返回零拷贝的连续numpy视图，可直接交给语音识别
+    """
+    def __init__(self, max_samples: int = RATE * MAX_RECORD_SEC,
+                 spill_samples: int = RATE * SPILL_SEC):
+        self._max = max_samples
+        self._spill = min(spill_samples, max_samples)
+        self._ram = np.empty(self._spill, dtype=np.int16)
+        self._buf = self._ram
+        self._file = None
+        self._size = 0
+        self.dropped = 0  # 超过最大录音时长被丢弃的样本数
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def spilled(self) -> bool:
+        """是否已溢写到磁盘"""
+        return self._file is not None
+
+    def _spill_to_disk(self):
+        """创建临时文件内存映射，并把内存层已有数据拷贝过去(仅一次)"""
+        self._file = tempfile.TemporaryFile(prefix="recording_", suffix=".pcm")
+        mm = np.memmap(self._file, dtype=np.int16, mode="w+", shape=(self._max,))
+        mm[:self._size] = self._buf[:self._size]
+        self._buf = mm
+        _logger.info("录音超过 %.0f 秒，已溢写到临时文件", self._spill / RATE)
+
+    def extend(self, pcm):
+        """追加一块音频数据"""
+        pcm = np.asarray(pcm, dtype=np.int16).ravel()
+        end = self._size + pcm.size
+        if end > self._buf.shape[0]:
+            if not self.spilled and self._spill < self._max:
+                self._spill_to_disk()
+            if end > self._max:
+                keep = self._max - self._size
+                self.dropped += pcm.size - keep
+                pcm = pcm[:keep]
+                end = self._max
+        self._buf[self._size:end] = pcm
+        self._size = end
+
+    def view(self) -> np.ndarray:
+        """返回已录制音频的零拷贝只读视图"""
+        view = self._buf[:self._size].view(np.ndarray)
+        view.flags.writeable = False
+        return view
+
+    def clear(self):
+        """清空录音，释放磁盘层(已交出的视图仍然有效)"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        # 上一次交出的视图可能仍被持有，重新分配避免被覆盖
+        self._ram = np.empty(self._spill, dtype=np.int16)
+        self._buf = self._ram
+        self._size = 0
+        self.dropped = 0
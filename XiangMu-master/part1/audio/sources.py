@@ -0,0 +1,201 @@
+import threading
+import time
+import wave
+import numpy as np
+from config import CHUNK, RATE, CHANNELS, FORMAT
+
+# 麦克风依赖 PyAudio，无声卡的环境(如CI)中仍可使用文件/合成音频源
+try:
+    import pyaudio
+except ImportError:
+    pyaudio = None
+
+
+class AudioSource:
+    """
+    音频源基类：以 CHUNK 个样本为一帧，把 int16 PCM 字节交给回调
+    - open(callback) 绑定回调，start()/stop() 对应一次录音的开始/结束
+    - stop() 返回时保证不会再有回调
+    - finished 事件在音频源耗尽(文件读完)时置位
+    """
+    def __init__(self):
+        self._callback = None
+        self.finished = threading.Event()
+
+    def open(self, callback):
+        """绑定帧回调 callback(data: bytes)"""
+        self._callback = callback
+
+    def start(self):
+        raise NotImplementedError
+
+    def stop(self):
+        raise NotImplementedError
+
+    def close(self):
+        """释放资源"""
+
+
+class MicrophoneSource(AudioSource):
+    """麦克风音频源，基于PyAudio回调模式，空闲时音频流处于停止状态"""
+    def __init__(self):
+        super().__init__()
+        if pyaudio is None:
+            raise RuntimeError("使用麦克风需要PyAudio库，请先安装：pip install pyaudio")
+        self._pa = pyaudio.PyAudio()
+        self._stream = None
+        self.overflows = 0  # 声卡输入溢出(丢帧)次数
+
+    def _on_audio(self, in_data, frame_count, time_info, status):
+        """PyAudio回调：只负责转交原始帧，保持回调足够轻量"""
+        if status & pyaudio.paInputOverflow:
+            self.overflows += 1
+        self._callback(in_data)
+        return None, pyaudio.paContinue
+
+    def start(self):
+        self.overflows = 0
+        if self._stream is None:
+            self._stream = self._pa.open(
+                format=getattr(pyaudio, f"pa{FORMAT}"),
+                channels=CHANNELS,
+                rate=RATE,
+                input=True,
+                frames_per_buffer=CHUNK,
+                start=False,
+                stream_callback=self._on_audio,
+            )
+        self._stream.start_stream()
+
+    def stop(self):
+        if self._stream is not None:
+            # stop_stream 会等待已排队的缓冲区回调完成，末尾的帧不会丢失
+            self._stream.stop_stream()
+
+    def close(self):
+        if self._stream is not None:
+            self._stream.close()
+            self._stream = None
+        self._pa.terminate()
+
+
+class _ReplaySource(AudioSource):
+    """
+    回放类音频源的公共实现：在独立线程中逐帧推送
+    param realtime: True 按真实时间节奏推送，False 尽可能快地推送
+    """
+    def __init__(self, realtime: bool = False):
+        super().__init__()
+        self.realtime = realtime
+        self._frames = None
+        self._thread = None
+        self._stop = threading.Event()
+
+    def _iter_frames(self):
+        """子类实现：逐帧产出 CHUNK 个样本的 int16 数组"""
+        raise NotImplementedError
+
+    def read_all(self) -> np.ndarray:
+        """不经过回调，一次性读出全部音频(离线处理/基准测试用)"""
+        return np.concatenate(list(self._iter_frames()))
+
+    def start(self):
+        if self._frames is None:
+            self._frames = self._iter_frames()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._pump, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _pump(self):
+        frame_sec = CHUNK / RATE
+        deadline = time.perf_counter()
+        while not self._stop.is_set():
+            frame = next(self._frames, None)
+            if frame is None:
+                self.finished.set()
+                return
+            if frame.size < CHUNK:
+                frame = np.pad(frame, (0, CHUNK - frame.size))
+            if self.realtime:
+                deadline += frame_sec
+                delay = deadline - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            self._callback(frame.astype(np.int16, copy=False).tobytes())
+
+
+class WavFileSource(_ReplaySource):
+    """
+    WAV/PCM 文件音频源
+    - .wav 需为 16kHz、单声道、16bit
+    - 其他扩展名按无文件头的 int16 单声道 PCM 读取
+    """
+    def __init__(self, path, realtime: bool = False):
+        super().__init__(realtime)
+        self.path = str(path)
+        if self.path.lower().endswith(".wav"):
+            with wave.open(self.path, "rb") as wf:
+                if (wf.getframerate(), wf.getnchannels(), wf.getsampwidth()) != (RATE, CHANNELS, 2):
+                    raise ValueError(f"WAV 格式需为 {RATE}Hz、单声道、16bit：{self.path}")
+                self.duration = wf.getnframes() / RATE
+        else:
+            self.duration = np.memmap(self.path, dtype=np.int16, mode="r").size / RATE
+
+    def _iter_frames(self):
+        if self.path.lower().endswith(".wav"):
+            with wave.open(self.path, "rb") as wf:
+                while True:
+                    data = wf.readframes(CHUNK)
+                    if not data:
+                        return
+                    yield np.frombuffer(data, np.int16)
+        else:
+            pcm = np.memmap(self.path, dtype=np.int16, mode="r")
+            for i in range(0, pcm.size, CHUNK):
+                yield np.asarray(pcm[i:i + CHUNK])
+
+
+class SyntheticSource(_ReplaySource):
+    """
+    合成音频源
+    param generator: 可迭代对象，逐块产出 int16 数组(长度任意)；
+                     None 时按 pattern 生成“语音段+静音”交替的测试信号
+    param pattern: [(秒数, 是否有声), ...]
+    """
+    def __init__(self, generator=None, pattern=((0.5, False), (2.0, True), (1.0, False)),
+                 realtime: bool = False, seed: int = 0):
+        super().__init__(realtime)
+        self._generator = generator
+        self.pattern = list(pattern)
+        self.duration = sum(sec for sec, _ in self.pattern) if generator is None else None
+        self._rng = np.random.default_rng(seed)
+
+    def _tone(self, n):
+        """带谐波和噪声的浊音信号，能被 VAD 判定为语音"""
+        t = np.arange(n) / RATE
+        f0 = 140 + 20 * np.sin(2 * np.pi * 3 * t)
+        phase = 2 * np.pi * np.cumsum(f0) / RATE
+        wave_ = sum(np.sin(k * phase) / k for k in range(1, 8))
+        wave_ += 0.05 * self._rng.standard_normal(n)
+        return (wave_ * 6000).clip(-32768, 32767).astype(np.int16)
+
+    def _generate(self):
+        for sec, voiced in self.pattern:
+            n = int(sec * RATE)
+            yield self._tone(n) if voiced else (self._rng.standard_normal(n) * 30).astype(np.int16)
+
+    def _iter_frames(self):
+        pending = np.zeros(0, dtype=np.int16)
+        for block in (self._generator if self._generator is not None else self._generate()):
+            pending = np.concatenate((pending, np.asarray(block, dtype=np.int16).ravel()))
+            while pending.size >= CHUNK:
+                yield pending[:CHUNK]
+                pending = pending[CHUNK:]
+        if pending.size:
+            yield pending
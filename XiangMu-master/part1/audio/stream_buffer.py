@@ -1,20 +1,66 @@
-from collections import deque
-from config import RATE, RING_SEC  
+import numpy as np
+from config import RATE, RING_SEC
+
 
 class StreamBuffer:
-    """音频流缓冲区，用于存储实时音频片段并提供numpy转换功能"""
-    def __init__(self):
-        self._buf = deque(maxlen=RATE * RING_SEC)
+    """
+    音频流环形缓冲区，基于预分配的int16 numpy数组实现
+    - extend 以整帧为单位向量化写入
+    - to_numpy / latest 返回视图或一次连续拷贝
+    """
+    def __init__(self, capacity: int = RATE * RING_SEC):
+        self._buf = np.zeros(capacity, dtype=np.int16)
+        self._capacity = capacity
+        self._end = 0  # 下一个写入位置
+        self._size = 0  # 当前有效样本数
+        self.total = 0  # 累计写入的样本数(用于换算绝对位置)
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def capacity(self) -> int:
+        """缓冲区容量(样本数)"""
+        return self._capacity
 
     def extend(self, pcm):
         """添加音频数据到缓冲区"""
-        self._buf.extend(pcm)
+        pcm = np.asarray(pcm, dtype=np.int16).ravel()
+        n = pcm.size
+        self.total += n
+        if n >= self._capacity:
+            # 新数据超过容量，只保留最后 capacity 个样本
+            self._buf[:] = pcm[-self._capacity:]
+            self._end = 0
+            self._size = self._capacity
+            return
+        first = min(n, self._capacity - self._end)
+        self._buf[self._end:self._end + first] = pcm[:first]
+        self._buf[:n - first] = pcm[first:]
+        self._end = (self._end + n) % self._capacity
+        self._size = min(self._size + n, self._capacity)
 
     def clear(self):
         """清空缓冲区"""
-        self._buf.clear()
+        self._end = 0
+        self._size = 0
+        self.total = 0
+
+    def latest(self, n: int = None) -> np.ndarray:
+        """
+        获取最近的 n 个样本(按时间顺序)
+        param n: 样本数，None 表示全部
+        return: 数据未跨越环形边界时返回只读视图，否则返回一次连续拷贝
+        """
+        n = self._size if n is None else max(0, min(n, self._size))
+        end = self._end or (self._capacity if self._size else 0)
+        start = end - n
+        if start >= 0:
+            view = self._buf[start:end]
+            view.flags.writeable = False
+            return view
+        return np.concatenate((self._buf[start:], self._buf[:self._end]))
 
     def to_numpy(self):
         """将缓冲区数据转换为numpy数组"""
-        from numpy import array
-        return array(self._buf, dtype="int16")
\ No newline at end of file
+        return self.latest()
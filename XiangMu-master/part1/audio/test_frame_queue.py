@@ -0,0 +1,62 @@
+import threading
+import time
+import numpy as np
+from audio.frame_queue import FrameQueue
+
+
+def test_push_and_drain():
+    q = FrameQueue(capacity=4, frame_size=2)
+    assert q.drain() is None
+    assert q.underflows == 1
+    q.push(np.array([1, 2], np.int16))
+    q.push(np.array([3, 4], np.int16).tobytes())
+    assert len(q) == 2
+    assert q.drain().tolist() == [1, 2, 3, 4]
+    assert len(q) == 0
+
+
+def test_drain_wraps_around():
+    q = FrameQueue(capacity=3, frame_size=1)
+    for i in range(3):
+        q.push(np.array([i], np.int16))
+    assert q.drain(2).tolist() == [0, 1]
+    for i in range(3, 5):
+        q.push(np.array([i], np.int16))
+    assert q.drain().tolist() == [2, 3, 4]
+
+
+def test_position_counts_dropped_frames():
+    q = FrameQueue(capacity=4, frame_size=2)
+    for i in range(7):  # 队列满后丢弃 3 帧
+        q.push(np.full(2, i, np.int16))
+    assert q.overflows == 3
+    assert q.position == 0
+    assert q.drain(2).tolist() == [0, 0, 1, 1]
+    assert q.position == 4  # 只取出一部分时，丢帧留到取空队列时计入
+    assert q.drain().tolist() == [2, 2, 3, 3]
+    assert q.position == 14
+    q.push(np.full(2, 9, np.int16))
+    assert q.drain().tolist() == [9, 9]
+    assert q.position == 16
+
+
+def test_concurrent_producer_consumer():
+    q = FrameQueue(capacity=8, frame_size=4)
+    n = 2000
+    got = []
+
+    def produce():
+        for i in range(n):
+            while not q.push(np.full(4, i, np.int16)):
+                time.sleep(0)
+
+    t = threading.Thread(target=produce)
+    t.start()
+    while len(got) < n * 4:
+        pcm = q.drain()
+        if pcm is not None:
+            got.extend(pcm.tolist())
+        time.sleep(0)
+    t.join()
+    assert got[::4] == list(range(n))
+    assert q.position == n * 4 + q.overflows * 4
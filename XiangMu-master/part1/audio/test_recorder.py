@@ -0,0 +1,41 @@
+from audio.recorder import AudioRecorder
+from audio.sources import SyntheticSource
+from config import CHUNK
+
+
+def _record(recorder, source):
+    recorder.start_recording()
+    assert source.finished.wait(10)
+    recorder.stop_recording()
+
+
+def test_idle_recorder_does_not_spin():
+    recorder = AudioRecorder(SyntheticSource())
+    recorder.start()
+    # 未录音时采集线程阻塞在队列上
+    assert AudioRecorder.measure_idle_cpu(0.5) < 0.1
+    _record(recorder, recorder.source)
+    # 录音结束后重新回到空闲
+    assert AudioRecorder.measure_idle_cpu(0.5) < 0.1
+
+
+def test_recording_keeps_every_frame():
+    source = SyntheticSource(pattern=((0.5, False), (2.0, True), (1.0, False)))
+    recorder = AudioRecorder(source)
+    recorder.start()
+    _record(recorder, source)
+
+    frames = recorder.capture_stats()["frames"]
+    assert frames > 0
+    assert len(recorder.full_audio) == frames * CHUNK
+    assert recorder.segmenter.count == 1
+    utterances = []
+    while True:
+        utt = recorder.utterances.get(timeout=1)
+        if utt is None:
+            break
+        utterances.append(utt)
+    assert len(utterances) == 1
+    assert utterances[0].end - utterances[0].start == len(utterances[0].audio)
+    assert len(recorder.get_realtime_chunk()) == frames * CHUNK
+
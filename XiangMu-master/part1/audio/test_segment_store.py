@@ -0,0 +1,51 @@
+import numpy as np
+from audio.segment_store import SegmentStore
+
+
+def test_stays_in_memory_below_threshold():
+    store = SegmentStore(max_samples=100, spill_samples=20)
+    store.extend(np.arange(20))
+    assert not store.spilled
+    assert store.view().tolist() == list(range(20))
+
+
+def test_spills_to_memmap_past_threshold():
+    store = SegmentStore(max_samples=100, spill_samples=20)
+    for start in range(0, 50, 10):
+        store.extend(np.arange(start, start + 10))
+    assert store.spilled
+    assert isinstance(store._buf, np.memmap)
+    assert len(store) == 50
+    assert store.view().tolist() == list(range(50))
+
+
+def test_view_is_zero_copy_and_read_only():
+    store = SegmentStore(max_samples=100, spill_samples=20)
+    store.extend(np.arange(30))
+    view = store.view()
+    assert not view.flags.writeable
+    assert np.shares_memory(view, store._buf)
+    store.extend(np.arange(30, 40))
+    assert view.tolist() == list(range(30))  # 之前交出的视图不受后续写入影响
+
+
+def test_drops_samples_past_max():
+    store = SegmentStore(max_samples=100, spill_samples=20)
+    store.extend(np.arange(120))
+    assert len(store) == 100
+    assert store.dropped == 20
+    assert store.view().tolist() == list(range(100))
+
+
+def test_clear_releases_disk_layer():
+    store = SegmentStore(max_samples=100, spill_samples=20)
+    store.extend(np.arange(50))
+    old_view = store.view()
+    spill_file = store._file
+    store.clear()
+    assert spill_file.closed
+    assert not store.spilled
+    assert len(store) == 0 and store.dropped == 0
+    assert store.view().tolist() == []
+    store.extend(np.full(10, 7))
+    assert old_view[:10].tolist() == list(range(10))  # 已交出的视图仍然有效
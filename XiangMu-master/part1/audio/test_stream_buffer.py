@@ -0,0 +1,43 @@
+import numpy as np
+from audio.stream_buffer import StreamBuffer
+
+
+def test_wrap_around_keeps_order():
+    buf = StreamBuffer(capacity=10)
+    buf.extend(np.arange(7))
+    buf.extend(np.arange(7, 13))  # 跨越环形边界
+    assert len(buf) == 10
+    assert buf.total == 13
+    assert buf.to_numpy().tolist() == list(range(3, 13))
+
+
+def test_latest():
+    buf = StreamBuffer(capacity=10)
+    buf.extend(np.arange(4))
+    view = buf.latest(3)
+    assert view.tolist() == [1, 2, 3]
+    assert not view.flags.writeable  # 未跨越边界时返回只读视图
+    buf.extend(np.arange(4, 12))
+    assert buf.latest(5).tolist() == [7, 8, 9, 10, 11]  # 跨越边界时返回拷贝
+    assert buf.latest(100).tolist() == list(range(2, 12))
+    assert buf.latest(0).tolist() == []
+
+
+def test_extend_larger_than_capacity():
+    buf = StreamBuffer(capacity=10)
+    buf.extend(np.arange(3))
+    buf.extend(np.arange(100, 125))
+    assert len(buf) == 10
+    assert buf.total == 28
+    assert buf.to_numpy().tolist() == list(range(115, 125))
+    buf.extend(np.arange(2))
+    assert buf.latest(3).tolist() == [124, 0, 1]
+
+
+def test_clear():
+    buf = StreamBuffer(capacity=10)
+    buf.extend(np.arange(15))
+    buf.clear()
+    assert len(buf) == 0
+    assert buf.total == 0
+    assert buf.to_numpy().tolist() == []
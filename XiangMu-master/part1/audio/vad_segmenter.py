@@ -0,0 +1,121 @@
+import math
+from collections import deque
+from typing import NamedTuple, Optional
+import numpy as np
+import webrtcvad
+from config import (CHUNK, RATE, VAD_MODE, VAD_PRE_ROLL_MS, VAD_HANGOVER_MS,
+                    VAD_MIN_SILENCE_MS, VAD_MAX_UTTERANCE_SEC)
+
+
+class Utterance(NamedTuple):
+    """一个完整的语音段"""
+    start: int  # 在本次录音中的起始样本位置
+    end: int  # 结束样本位置(不含)
+    audio: np.ndarray  # int16 音频数据
+
+
+class VadSegmenter:
+    """
+    基于 webrtcvad 的有状态语音分段器
+    - pre-roll：语音起点之前保留的音频，避免吞掉首字
+    - hangover：语音结束后保留的尾部静音，避免截断尾音
+    - min-silence：连续静音达到该时长才切分，句中的自然停顿保留在语音段内
+    每完成一个语音段就放入队列，下游识别无需等待整段录音结束
+    """
+    def __init__(self, out_queue=None,
+                 pre_roll_ms: int = VAD_PRE_ROLL_MS,
+                 hangover_ms: int = VAD_HANGOVER_MS,
+                 min_silence_ms: int = VAD_MIN_SILENCE_MS,
+                 max_utterance_sec: float = VAD_MAX_UTTERANCE_SEC,
+                 mode: int = VAD_MODE, rate: int = RATE, frame_size: int = CHUNK):
+        self.queue = out_queue
+        self._vad = webrtcvad.Vad(mode)
+        self._rate = rate
+        frame_ms = frame_size * 1000 / rate
+        self._pre_roll = deque(maxlen=math.ceil(pre_roll_ms / frame_ms))
+        self._hangover = math.ceil(hangover_ms / frame_ms)
+        self._min_silence = max(math.ceil(min_silence_ms / frame_ms), self._hangover)
+        self._max_frames = int(max_utterance_sec * 1000 / frame_ms)
+        self.reset()
+
+    def reset(self):
+        """开始新的录音前重置状态"""
+        self._pos = 0  # 已处理的样本数
+        self._frames = []  # 当前语音段的帧
+        self._start = None  # 当前语音段起点，None 表示处于静音
+        self._silence = 0  # 当前语音段末尾的连续静音帧数
+        self._pre_roll.clear()
+        self.count = 0  # 已输出的语音段数
+        self.speech_span = None  # 所有语音段覆盖的 (起点, 终点)
+
+    @property
+    def in_speech(self) -> bool:
+        """当前是否处于语音段内"""
+        return self._start is not None
+
+    def feed(self, pcm: np.ndarray, is_speech: bool = None) -> Optional[Utterance]:
+        """
+        输入一帧音频
+        param pcm: int16 音频帧(长度需满足 webrtcvad 的 10/20/30ms 要求)
+        param is_speech: 外部给出的判定结果，None 时由 webrtcvad 判定
+        return: 本帧结束了一个语音段时返回该段，否则返回 None
+        """
+        if is_speech is None:
+            is_speech = self._vad.is_speech(pcm.tobytes(), self._rate)
+        pos = self._pos
+        self._pos += len(pcm)
+
+        if self._start is None:
+            if not is_speech:
+                self._pre_roll.append(pcm)
+                return None
+            self._start = pos - sum(len(f) for f in self._pre_roll)
+            self._frames = list(self._pre_roll)
+            self._pre_roll.clear()
+
+        self._frames.append(pcm)
+        self._silence = 0 if is_speech else self._silence + 1
+        if self._silence >= self._min_silence or len(self._frames) >= self._max_frames:
+            return self._emit()
+        return None
+
+    def flush(self) -> Optional[Utterance]:
+        """录音结束时输出尚未完成的语音段"""
+        if self._start is None:
+            return None
+        return self._emit()
+
+    def _emit(self) -> Utterance:
+        # 尾部静音只保留 hangover 部分，多余的静音留作下一段的 pre-roll
+        keep = len(self._frames) - max(0, self._silence - self._hangover)
+        audio = np.concatenate(self._frames[:keep])
+        utt = Utterance(self._start, self._start + audio.size, audio)
+        for frame in self._frames[keep:]:
+            self._pre_roll.append(frame)
+        self._frames = []
+        self._start = None
+        self._silence = 0
+
+        self.count += 1
+        first = self.speech_span[0] if self.speech_span else utt.start
+        self.speech_span = (first, utt.end)
+        if self.queue is not None:
+            self.queue.put(utt)
+        return utt
+
+    def segment(self, audio: np.ndarray, frame_size: int = CHUNK) -> list:
+        """
+        对一整段音频离线分段
+        param audio: int16 音频数据
+        return: 语音段列表(按时间顺序)
+        """
+        self.reset()
+        utterances = []
+        for i in range(0, len(audio) - frame_size + 1, frame_size):
+            utt = self.feed(audio[i:i + frame_size])
+            if utt is not None:
+                utterances.append(utt)
+        utt = self.flush()
+        if utt is not None:
+            utterances.append(utt)
+        return utterances
@@ -0,0 +1,344 @@
+"""
+离线基准测试(无需麦克风/声卡)
+用法：
+  python bench.py pipeline [--wav 文件] [--realtime] [--worker]
+  python bench.py stt [--wav 文件] [--backends whisper faster-whisper] [--runs 3]
+  python bench.py longform [--wav 文件]
+  python bench.py profiles [--runs 10]
+  python bench.py llm [--runs 20] [--tokens 2000]
+  python bench.py notes [--backends json journal sqlite] [--sizes 1000 10000 100000]
+  python bench.py semantic [--sizes 1000 100000] [--dim 768]
+"""
+import argparse
+import multiprocessing
+import threading
+import time
+import numpy as np
+from config import RATE, WHISPER_MODEL
+
+
+# ===========================
+# 录音 -> VAD 分段 -> 语音识别 全链路
+# ===========================
+def bench_pipeline(args):
+    from audio.recorder import AudioRecorder
+    from audio.sources import WavFileSource, SyntheticSource
+    from stt import whisper_engine
+    from stt.worker import SttWorker
+
+    engine = SttWorker() if args.worker else whisper_engine
+    if args.wav:
+        source = WavFileSource(args.wav, realtime=args.realtime)
+    else:
+        source = SyntheticSource(pattern=[(0.5, False), (2.0, True), (1.0, False)] * args.repeat,
+                                 realtime=args.realtime)
+    recorder = AudioRecorder(source)
+    recorder.start()
+
+    texts = []
+    t0 = time.perf_counter()
+    recorder.start_recording()
+    worker = threading.Thread(target=_consume, args=(recorder.utterances, texts, engine.transcribe_once))
+    worker.start()
+    source.finished.wait()
+    recorder.stop_recording()
+    t_capture = time.perf_counter() - t0
+    worker.join()
+    elapsed = time.perf_counter() - t0
+
+    audio_sec = len(recorder.full_audio) / RATE
+    print(f"音频时长: {audio_sec:.2f}s  语音段: {recorder.segmenter.count}")
+    print(f"采集+分段: {t_capture:.3f}s  全链路: {elapsed:.2f}s  "
+          f"实时率(RTF): {elapsed / max(audio_sec, 1e-9):.3f}")
+    capture = recorder.capture_stats()
+    print(f"采集帧数: {capture['frames']}  丢帧: {capture['dropped']}  "
+          f"平均抖动: {capture['mean_jitter_ms']:.2f}ms  最大帧间隔: {capture['max_gap_ms']:.1f}ms")
+    for i, text in enumerate(texts):
+        print(f"  [{i}] {text}")
+
+
+def _consume(utterances, texts, transcribe):
+    """依次转写语音段，收到 None 表示录音结束"""
+    while True:
+        utt = utterances.get()
+        if utt is None:
+            return
+        texts.append(transcribe(utt.audio))
+
+
+# ===========================
+# 语音识别后端对比：实时率与内存
+# ===========================
+def _load_audio(path, seconds=30.0):
+    """读取 WAV/PCM 文件为 int16 数组；未给出文件时生成合成信号"""
+    from audio.sources import WavFileSource, SyntheticSource
+    if path:
+        source = WavFileSource(path)
+    else:
+        source = SyntheticSource(pattern=[(seconds / 4, True), (seconds / 4, False)] * 2)
+    return source.read_all()
+
+
+def _run_backend(name, model_name, audio, runs, out):
+    """在独立子进程中运行，保证各后端的内存峰值互不干扰"""
+    import resource
+    from stt.backends import create_backend
+
+    t0 = time.perf_counter()
+    backend = create_backend(name, model_name).load()
+    load_sec = time.perf_counter() - t0
+    backend.warmup()
+
+    audio_f32 = audio.astype("float32") / 32768.0
+    times = []
+    text = ""
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        text = backend.transcribe(audio_f32)["text"]
+        times.append(time.perf_counter() - t0)
+    out.put({
+        "backend": name,
+        "load_sec": load_sec,
+        "rtf": min(times) / (len(audio) / RATE),
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "text": text,
+    })
+
+
+def bench_stt(args):
+    audio = _load_audio(args.wav)
+    ctx = multiprocessing.get_context("spawn")
+    print(f"音频时长: {len(audio) / RATE:.1f}s  模型: {args.model}  每个后端运行 {args.runs} 次")
+    print(f"{'后端':<16}{'加载(s)':>10}{'RTF':>8}{'峰值内存(MB)':>16}")
+    for name in args.backends:
+        out = ctx.Queue()
+        proc = ctx.Process(target=_run_backend, args=(name, args.model, audio, args.runs, out))
+        proc.start()
+        proc.join()
+        if proc.exitcode != 0 or out.empty():
+            print(f"{name:<16}运行失败(退出码 {proc.exitcode})")
+            continue
+        r = out.get()
+        print(f"{name:<16}{r['load_sec']:>10.2f}{r['rtf']:>8.3f}{r['peak_rss_mb']:>16.0f}")
+        print(f"  {r['text'][:60]}")
+
+
+# ===========================
+# 长录音：串行 vs 静音切块并行
+# ===========================
+def bench_longform(args):
+    from stt import longform
+    from stt.backends import create_backend
+
+    audio = _load_audio(args.wav, seconds=args.seconds)
+    audio_sec = len(audio) / RATE
+    chunks = longform.split_at_silences(audio)
+    print(f"音频时长: {audio_sec:.0f}s  切分块数: {len(chunks)}  进程数: {longform.worker_count()}")
+
+    backend = create_backend().load()
+    t0 = time.perf_counter()
+    backend.transcribe(audio.astype("float32") / 32768.0)
+    serial = time.perf_counter() - t0
+    print(f"串行: {serial:.2f}s  RTF {serial / audio_sec:.3f}")
+
+    longform.transcribe_long(audio[:RATE])  # 启动进程池并加载模型，不计入耗时
+    t0 = time.perf_counter()
+    longform.transcribe_long(audio)
+    parallel = time.perf_counter() - t0
+    longform.shutdown()
+    print(f"并行: {parallel:.2f}s  RTF {parallel / audio_sec:.3f}  加速比 {serial / parallel:.2f}x")
+
+
+# ===========================
+# 识别档位：短指令与长听写的延迟
+# ===========================
+def bench_profiles(args):
+    import statistics
+    from stt import whisper_engine
+
+    whisper_engine.preload().result()
+    for profile, seconds in (("command", 1.5), ("dictation", 1.5), ("dictation", 20.0)):
+        audio = _load_audio(args.wav, seconds=seconds)[:int(seconds * RATE)]
+        times = []
+        for _ in range(args.runs):
+            t0 = time.perf_counter()
+            whisper_engine.transcribe_once(audio, profile=profile)
+            times.append(time.perf_counter() - t0)
+        print(f"{profile:<10} 音频 {seconds:>5.1f}s  中位延迟 {statistics.median(times) * 1000:>8.1f}ms")
+
+
+# ===========================
+# 大模型客户端：基于本地 Ollama 替身服务
+# ===========================
+def bench_llm(args):
+    import statistics
+    from llm.deepseek_client import DeepSeekClient
+    from llm.history import ConversationHistory
+    from llm.stub_server import StubOllama
+
+    # 1) 首 token 延迟与客户端开销：服务端固定 prefill 延迟，超出部分即客户端开销
+    delay = 0.05
+    with StubOllama(token_rate=0, first_token_delay=delay) as stub:
+        client = DeepSeekClient(base_url=stub.url)
+        headers, connect, ttft = [], [], []
+        for _ in range(args.runs):
+            for _ in client.chat("你好", stateless=True):
+                pass
+            (headers if client.metrics["connection_reused"] else connect).append(client.metrics["headers_sec"])
+            ttft.append(client.metrics["ttft_sec"])
+        client.close()
+    if headers:
+        print(f"响应头(复用连接) 中位 {statistics.median(headers) * 1000:7.2f}ms")
+    print(f"响应头(新建连接) 中位 {statistics.median(connect) * 1000:7.2f}ms({len(connect)} 次)")
+    print(f"首 token 开销   中位 {(statistics.median(ttft) - delay) * 1000:7.2f}ms(已扣除服务端 {delay * 1000:.0f}ms)")
+
+    # 2) 流式解析吞吐：服务端不限速
+    with StubOllama(token_rate=0, n_tokens=args.tokens) as stub:
+        client = DeepSeekClient(base_url=stub.url, think_mode="raw")  # 推理块也计入输出
+        t0 = time.perf_counter()
+        count = sum(1 for _ in client.chat("你好", stateless=True))
+        elapsed = time.perf_counter() - t0
+        client.close()
+    print(f"解析吞吐        {count / elapsed:9.0f} token/s({count} token，{elapsed * 1000:.1f}ms)")
+
+    # 3) 历史管理开销：长对话中每轮追加消息并生成请求
+    history = ConversationHistory()
+    turn = "这是一段比较长的对话内容，用于测试历史裁剪的开销。" * 10
+    times = []
+    for _ in range(args.turns):
+        t0 = time.perf_counter()
+        history.append("user", turn)
+        history.messages()
+        history.append("assistant", turn)
+        times.append(time.perf_counter() - t0)
+    print(f"历史管理        中位 {statistics.median(times) * 1e6:7.1f}us/轮({args.turns} 轮，"
+          f"保留 {len(history)} 条，约 {history.tokens()} token)")
+
+
+# ===========================
+# 笔记存储：不同规模下的添加/列出/搜索延迟
+# ===========================
+def bench_notes(args):
+    import statistics
+    import tempfile
+    from pathlib import Path
+    from note_store import open_store
+
+    print(f"{'存储':<10}{'笔记数':>10}{'添加(us)':>12}{'最近10条(us)':>14}{'搜索(ms)':>10}")
+    for backend in args.backends:
+        for size in args.sizes:
+            with tempfile.TemporaryDirectory() as tmp:
+                store = open_store(backend, Path(tmp) / "notes.json")
+                # 预置数据：json 存储逐条添加是 O(n^2)，直接写入文件；sqlite 在单个事务中批量导入
+                if backend == "json":
+                    store._save([{"id": i + 1, "time": "2025-01-01 00:00:00", "text": f"第{i}条 项目报告"}
+                                 for i in range(size)])
+                elif backend == "sqlite":
+                    store.import_notes([{"time": "2025-01-01 00:00:00", "text": f"第{i}条 项目报告"}
+                                        for i in range(size)])
+                else:
+                    for i in range(size):
+                        store.add(f"第{i}条 项目报告")
+                add, last, search = [], [], []
+                for i in range(args.runs):
+                    t0 = time.perf_counter()
+                    store.add(f"新笔记 {i}")
+                    add.append(time.perf_counter() - t0)
+                    t0 = time.perf_counter()
+                    store.last(10)
+                    last.append(time.perf_counter() - t0)
+                    t0 = time.perf_counter()
+                    store.search("新笔记", limit=20)
+                    search.append(time.perf_counter() - t0)
+                store.close()
+            print(f"{backend:<10}{size:>10}{statistics.median(add) * 1e6:>12.1f}"
+                  f"{statistics.median(last) * 1e6:>14.1f}{statistics.median(search) * 1e3:>10.2f}")
+
+
+def bench_semantic(args):
+    import statistics
+    import tempfile
+    from pathlib import Path
+    from note_semantic import SemanticIndex, HashEmbedder
+
+    embedder = HashEmbedder(args.dim)
+    rng = np.random.default_rng(0)
+    print(f"{'笔记数':>10}{'维度':>6}{'打开(ms)':>10}{'新增1条(ms)':>13}{'检索(ms)':>10}{'文件(MB)':>10}")
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            index = SemanticIndex(Path(tmp) / "notes.emb", embedder)
+            # 预置数据：随机单位向量直接写入，不经过向量模型
+            for start in range(0, size, 10000):
+                n = min(10000, size - start)
+                vectors = rng.standard_normal((n, args.dim)).astype(np.float32)
+                index._append(list(range(start + 1, start + n + 1)),
+                              vectors / np.linalg.norm(vectors, axis=1, keepdims=True))
+            t0 = time.perf_counter()
+            index = SemanticIndex(Path(tmp) / "notes.emb", embedder)
+            open_ms = (time.perf_counter() - t0) * 1e3
+            add, search = [], []
+            for i in range(args.runs):
+                t0 = time.perf_counter()
+                index.add(size + i + 1, f"周五下午和客户开会 {i}")
+                index.wait_idle()  # 包含后台计算新增笔记的向量
+                add.append(time.perf_counter() - t0)
+                t0 = time.perf_counter()
+                index.search("项目会议", k=5)
+                search.append(time.perf_counter() - t0)
+            mb = (Path(tmp) / "notes.emb.npy").stat().st_size / 2 ** 20
+        print(f"{size:>10}{args.dim:>6}{open_ms:>10.1f}{statistics.median(add) * 1e3:>13.2f}"
+              f"{statistics.median(search) * 1e3:>10.2f}{mb:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="离线基准测试")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    p = sub.add_parser("pipeline", help="录音 -> VAD -> 识别 全链路吞吐")
+    p.add_argument("--wav", help="16kHz 单声道 WAV/PCM 文件，缺省使用合成信号")
+    p.add_argument("--realtime", action="store_true", help="按真实时间节奏回放")
+    p.add_argument("--repeat", type=int, default=3, help="合成信号的语音段数")
+    p.add_argument("--worker", action="store_true", help="在独立识别进程中识别")
+    p.set_defaults(func=bench_pipeline)
+
+    p = sub.add_parser("stt", help="对比各语音识别后端的实时率与内存")
+    p.add_argument("--wav", help="16kHz 单声道 WAV/PCM 文件，缺省使用 30 秒合成信号")
+    p.add_argument("--backends", nargs="+", default=["whisper", "faster-whisper"])
+    p.add_argument("--model", default=WHISPER_MODEL)
+    p.add_argument("--runs", type=int, default=3)
+    p.set_defaults(func=bench_stt)
+
+    p = sub.add_parser("longform", help="长录音串行识别与并行识别对比")
+    p.add_argument("--wav", help="16kHz 单声道 WAV/PCM 文件，缺省使用合成信号")
+    p.add_argument("--seconds", type=float, default=300, help="合成信号时长")
+    p.set_defaults(func=bench_longform)
+
+    p = sub.add_parser("profiles", help="各识别档位的中位延迟")
+    p.add_argument("--wav", help="16kHz 单声道 WAV/PCM 文件，缺省使用合成信号")
+    p.add_argument("--runs", type=int, default=10)
+    p.set_defaults(func=bench_profiles)
+
+    p = sub.add_parser("llm", help="大模型客户端开销、首 token 延迟与解析吞吐(本地替身服务)")
+    p.add_argument("--runs", type=int, default=20)
+    p.add_argument("--tokens", type=int, default=2000, help="吞吐测试的回复 token 数")
+    p.add_argument("--turns", type=int, default=500, help="历史管理测试的对话轮数")
+    p.set_defaults(func=bench_llm)
+
+    p = sub.add_parser("notes", help="各笔记存储在不同规模下的添加/读取/搜索延迟")
+    p.add_argument("--backends", nargs="+", default=["json", "journal", "sqlite"])
+    p.add_argument("--sizes", nargs="+", type=int, default=[1000, 10000, 100000])
+    p.add_argument("--runs", type=int, default=20)
+    p.set_defaults(func=bench_notes)
+
+    p = sub.add_parser("semantic", help="语义检索的打开、增量添加与 top-k 检索延迟(哈希向量)")
+    p.add_argument("--sizes", nargs="+", type=int, default=[1000, 10000, 100000])
+    p.add_argument("--dim", type=int, default=768, help="向量维度(nomic-embed-text 为 768)")
+    p.add_argument("--runs", type=int, default=20)
+    p.set_defaults(func=bench_semantic)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
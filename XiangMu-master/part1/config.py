@@ -8,14 +8,62 @@ FORMAT = "Int16"
 MAX_RECORD_SEC = 600
 RING_SEC = 15
 REALTIME_PROCESS_INTERVAL = 0.5  
+SPILL_SEC = 60  # 录音超过该时长后溢写到临时文件
+
+# ---------- 语音分段(VAD) ----------
+VAD_MODE = 3
+VAD_PRE_ROLL_MS = 300  # 语音起点前保留的音频
+VAD_HANGOVER_MS = 300  # 语音结束后保留的尾音
+VAD_MIN_SILENCE_MS = 700  # 连续静音超过该时长才切分语音段
+VAD_MAX_UTTERANCE_SEC = 30  # 单个语音段的最大时长
 
 # ---------- 模型 ----------
 WHISPER_MODEL = "small"  
+STT_BACKEND = "whisper"  # "whisper"(openai-whisper, fp32) 或 "faster-whisper"(CTranslate2)
+STT_COMPUTE_TYPE = "int8"  # faster-whisper 的量化类型
+# 识别档位：短指令用小模型+贪心解码+限制输出长度，长听写用大模型+beam search
+STT_PROFILES = {
+    "command": {"model": "base", "beam_size": None, "temperature": 0.0, "max_tokens": 32},
+    "dictation": {"model": WHISPER_MODEL, "beam_size": 5, "temperature": 0.0, "max_tokens": None},
+}
+COMMAND_MAX_SEC = 4  # 不超过该时长的语音按短指令档位识别
+MODEL_CACHE_MB = 2048  # 常驻识别模型的内存预算
+STT_WORKER_PROCESS = True  # 在独立进程中运行语音识别
+LONGFORM_MIN_SEC = 60  # 整段转写超过该时长的音频时按静音切块并行识别(离线/基准测试)
+LONGFORM_BACKLOG_SEC = 20  # 流式识别排队的语音段(如按键松开后的长听写)超过该总时长时交给进程池并行识别
+LONGFORM_CHUNK_SEC = 30  # 并行识别时每块的最大时长
+LONGFORM_WORKERS = 0  # 并行识别的进程数，0 表示按 CPU 核数；另受 MODEL_CACHE_MB 限制
+# 指令词快速检测：短语音先做几 token 的快速解码，命中且置信度足够时跳过完整识别
+KWS_KEYWORDS = {"删除": "delete", "列出": "list", "总结": "summarize", "退出": "exit"}  # 指令词 -> 意图
+KWS_MAX_SEC = 1.5  # 语音不超过该时长才尝试指令词检测
+KWS_MIN_LOGPROB = -0.5  # 快速解码的平均对数概率低于该值视为不可信
 OLLAMA_URL = "http://localhost:11434"
 LLM_MODEL = "deepseek-r1:1.5b"
-MAX_HISTORY = 10
+LLM_HISTORY_TOKENS = 2048  # 对话历史(近期消息)的 token 预算，超出部分并入滚动摘要
+LLM_SUMMARY_TOKENS = 256  # 滚动摘要的 token 上限
+LLM_CONNECT_TIMEOUT = 3.0  # 建立连接超时(秒)
+LLM_READ_TIMEOUT = 120.0  # 两次收到数据之间的最长等待(秒)，含模型首次加载
+LLM_RETRIES = 2  # 连接失败时的重试次数
+LLM_RETRY_BACKOFF = 0.5  # 首次重试前的等待(秒)，之后每次翻倍
+LLM_POOL_SIZE = 4  # 连接池大小(并发请求数)
+LLM_SESSION_CONTEXT = True  # 会话模式：复用服务端返回的对话上下文，每轮只 prefill 新消息
+LLM_KEEP_ALIVE = "30m"  # 请求后模型在服务端常驻的时间
+LLM_CONTEXT_MAX_TOKENS = 4096  # 会话上下文超过该长度时，改用预算内的历史与摘要重建
+LLM_THINK_MODE = "hide"  # deepseek-r1 推理块：hide 不显示；show 单独显示；raw 原样显示(含 <think> 标签；三者都不写入历史)
 SYSTEM_PROMPT = {"role": "system",
                  "content": "你是一个办公助手，帮助用户处理 1.文件的新增、删除、移动、查找。2.中英句子互译 等办公软件问题。"}
 
+# ---------- 笔记 ----------
+NOTE_BACKEND = "journal"  # "journal"(追加写日志)、"sqlite"(SQLite + FTS5 全文索引) 或 "json"(整体重写 notes.json)
+NOTE_FSYNC = "batch"  # 日志落盘策略："always" 每次写入；"batch" 至多每秒一次；"never" 交给操作系统
+NOTE_COMPACT_MIN = 1000  # 日志中失效记录超过该数量(且多于现存笔记)时后台压缩
+NOTE_SEARCH_LIMIT = 20  # 搜索最多返回的笔记条数(按添加顺序取最早的)
+NOTE_SEARCH_MODE = "hybrid"  # "keyword" 关键词；"semantic" 语义；"hybrid" 关键词没有结果时改用语义检索
+NOTE_EMBEDDER = "ollama"  # 语义检索的向量模型："ollama"(/api/embeddings) 或 "hash"(确定性的字符哈希，离线测试用)
+NOTE_EMBED_MODEL = "nomic-embed-text"  # Ollama 向量模型，需先 ollama pull
+NOTE_EMBED_BATCH = 64  # 后台为笔记计算向量时每批的条数(一次 /api/embed 请求)
+NOTE_SEMANTIC_TOP_K = 5  # 语义检索返回的笔记条数
+NOTE_SEMANTIC_MIN_SCORE = 0.5  # 余弦相似度低于该值的笔记不返回
+
 # ---------- 路径 ----------
 PROJECT_ROOT = Path(__file__).parent.resolve()
\ No newline at end of file
@@ -0,0 +1,3 @@
+# pytest 从本目录导入 config、audio、llm 等模块
+# test_note_assistant.py 是交互式的手动测试程序(读取键盘输入)，不作为自动测试收集
+collect_ignore = ["test_note_assistant.py"]
@@ -1,54 +1,361 @@
 import requests
+import asyncio
 import json
 import logging
-from config import OLLAMA_URL, LLM_MODEL, MAX_HISTORY, SYSTEM_PROMPT  
+import socket
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from llm.history import ConversationHistory, estimate_tokens
+from llm.reasoning import filter_stream
+from config import (OLLAMA_URL, LLM_MODEL, SYSTEM_PROMPT, LLM_SUMMARY_TOKENS,
+                    LLM_CONNECT_TIMEOUT, LLM_READ_TIMEOUT, LLM_RETRIES, LLM_RETRY_BACKOFF, LLM_POOL_SIZE,
+                    LLM_SESSION_CONTEXT, LLM_KEEP_ALIVE, LLM_CONTEXT_MAX_TOKENS, LLM_THINK_MODE)
 
 _logger = logging.getLogger(__name__)
+_FALLBACK = "抱歉，大模型调用失败"
+_DONE = object()  # 异步接口中表示流结束
 
-class DeepSeekClient:
-    """大模型客户端，用于与OLLAMA服务交互实现对话功能"""
+
+def _flatten(messages: list) -> tuple:
+    """把消息列表转换为 /api/generate 的 (system, prompt)：系统消息合并，之前的轮次作为对话记录"""
+    system = "\n".join(m["content"] for m in messages if m["role"] == "system")
+    turns = [m for m in messages if m["role"] != "system"]
+    prompt = turns[-1]["content"]
+    if len(turns) > 1:
+        lines = [f"{'用户' if m['role'] == 'user' else '助手'}：{m['content']}" for m in turns[:-1]]
+        prompt = "之前的对话：\n" + "\n".join(lines) + "\n\n" + prompt
+    return system, prompt
+
+
+def _socket_of(resp):
+    """响应所在连接的套接字；取不到时返回 None"""
+    conn = getattr(resp.raw, "connection", None) or getattr(resp.raw, "_connection", None)
+    return getattr(conn, "sock", None)
+
+
+class LLMCancelled(Exception):
+    """请求被 cancel() 取消"""
+
+
+class _Request:
+    """一次流式请求的状态：取消标志与正在读取的响应"""
     def __init__(self):
-        self.history = [SYSTEM_PROMPT]
+        self.cancelled = threading.Event()
+        self.response = None
+        self.recorded = False  # 用户消息已写入对话历史，结束时需要写入对应的回复
+        self.lock = threading.Lock()
+
+    def attach(self, resp):
+        with self.lock:
+            self.response = resp
+        if self.cancelled.is_set():
+            resp.close()
+            raise LLMCancelled()
+
+    def cancel(self):
+        """设置取消标志，并关闭底层套接字，使另一个线程中阻塞的读取立即返回"""
+        self.cancelled.set()
+        with self.lock:
+            resp = self.response
+        if resp is None:
+            return
+        sock = _socket_of(resp)
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
 
-    def chat(self, user_text: str):
+class DeepSeekClient:
+    """
+    大模型客户端，用于与OLLAMA服务交互实现对话功能
+    - 持有连接池化的 requests.Session，多轮对话复用 keep-alive 连接
+    - 连接/读取分别设置超时，Ollama 无响应时不会一直阻塞
+    - 建立连接失败时按指数退避重试有限次数；已开始输出后不重试，避免重复内容
+    - cancel() 可中断正在进行的流式请求
+    - metrics 记录最近一次请求的响应头耗时(含建立连接)、是否复用了已有连接、首 token 耗时等
+    - achat() 为异步版本，与 chat() 共用连接池
+    - 对话历史按 token 预算保留，较早的轮次在后台压缩为滚动摘要
+    - 会话模式下模型常驻(keep_alive)并复用上一轮的 context，metrics 报告节省的 prefill token 数
+    - deepseek-r1 的 <think> 推理块按 think_mode 隐藏/单独显示/原样显示，写入历史时总是去掉
+    """
+    def __init__(self, base_url: str = OLLAMA_URL, model: str = LLM_MODEL,
+                 timeout: tuple = (LLM_CONNECT_TIMEOUT, LLM_READ_TIMEOUT),
+                 retries: int = LLM_RETRIES, backoff: float = LLM_RETRY_BACKOFF,
+                 session_context: bool = LLM_SESSION_CONTEXT, think_mode: str = LLM_THINK_MODE,
+                 on_reasoning=None):
+        """
+        param timeout: (连接超时, 读取超时) 秒；读取超时是两次收到数据之间的最长等待
+        param retries: 连接失败时的最多重试次数
+        param backoff: 首次重试前的等待(秒)，之后每次翻倍
+        param session_context: 会话模式，复用服务端返回的对话上下文，每轮只 prefill 新消息
+        param think_mode: 推理块处理方式："hide" 不显示；"show" 交给 on_reasoning 单独显示；"raw" 原样显示(含推理块)
+        param on_reasoning: 推理内容回调 on_reasoning(text)，think_mode 为 "show" 时使用
+        """
+        self.base_url = base_url
+        self.model = model
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.history = ConversationHistory(summarizer=self._summarize)
+        self.session_context = session_context
+        self._context = None  # 会话模式下服务端返回的对话上下文(token 序列)
+        self.think_mode = think_mode
+        self.on_reasoning = on_reasoning
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=LLM_POOL_SIZE)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        # 异步接口在线程池中读取流，线程数与连接池大小一致
+        self._executor = ThreadPoolExecutor(max_workers=LLM_POOL_SIZE, thread_name_prefix="llm")
+        self._lock = threading.Lock()
+        self._active = set()  # 进行中的请求，供 cancel() 中断
+        self._sockets = weakref.WeakSet()  # 用过的连接套接字，判断本次请求是否复用了连接
+        self.metrics = {}
+
+    def close(self):
+        """取消进行中的请求并关闭连接池"""
+        self.cancel()
+        self._executor.shutdown(wait=False)
+        self.session.close()
+
+    def cancel(self):
+        """取消所有进行中的请求(可在其他线程调用)，chat()/achat() 随即结束"""
+        with self._lock:
+            requests_ = list(self._active)
+        for req in requests_:
+            req.cancel()
+
+    # ----------------- HTTP 流 -----------------
+    def _post(self, path: str, payload: dict, req: _Request, metrics: dict) -> requests.Response:
+        """发送流式请求；连接失败时退避重试，返回已收到响应头的 Response"""
+        t0 = time.perf_counter()
+        for attempt in range(self.retries + 1):
+            try:
+                resp = self.session.post(f"{self.base_url}{path}", json=payload, stream=True,
+                                         timeout=self.timeout)
+                break
+            except requests.ConnectionError as e:  # 包括连接超时；读取超时说明服务在忙，不重试
+                if attempt == self.retries:
+                    raise
+                wait = self.backoff * 2 ** attempt
+                _logger.warning("连接大模型服务失败(%s)，%.1f 秒后第 %d 次重试", e, wait, attempt + 1)
+                metrics["retries"] = attempt + 1
+                if req.cancelled.wait(wait):
+                    raise LLMCancelled()
+        metrics["headers_sec"] = time.perf_counter() - t0
+        sock = _socket_of(resp)
+        with self._lock:
+            # 复用连接时 headers_sec 只包含服务端耗时，否则还包含建立连接
+            metrics["connection_reused"] = sock is not None and sock in self._sockets
+            if sock is not None:
+                self._sockets.add(sock)
+        req.attach(resp)
+        try:
+            resp.raise_for_status()
+        except requests.HTTPError:
+            resp.close()
+            raise
+        return resp
+
+    def _stream(self, path: str, payload: dict, req: _Request, metrics: dict):
+        """
+        流式请求 /api/chat 或 /api/generate，逐块返回回复内容，最后一个数据块保存在 req.final
+        取消时抛出 LLMCancelled，网络/服务错误原样抛出
+        """
+        payload = {"model": self.model, "stream": True, "keep_alive": LLM_KEEP_ALIVE, **payload}
+        t0 = time.perf_counter()
+        metrics["retries"] = 0
+        metrics["prompt_tokens_est"] = sum(estimate_tokens(m["content"]) for m in payload.get("messages", ())) \
+            + estimate_tokens(payload.get("system", "") + payload.get("prompt", ""))
+        with self._lock:
+            self._active.add(req)
+        try:
+            with self._post(path, payload, req, metrics) as resp:
+                for line in resp.iter_lines(decode_unicode=True):
+                    if req.cancelled.is_set():
+                        raise LLMCancelled()
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    content = chunk.get("response") or chunk.get("message", {}).get("content", "")
+                    if content:
+                        if "ttft_sec" not in metrics:
+                            metrics["ttft_sec"] = time.perf_counter() - t0
+                        yield content
+                    if chunk.get("done"):
+                        req.final = chunk
+                        metrics["prompt_eval_count"] = chunk.get("prompt_eval_count")
+                        metrics["eval_count"] = chunk.get("eval_count")
+                # 读到流末尾(结束块之后的 chunked 终止符)，连接才会放回连接池复用
+                if req.cancelled.is_set():
+                    raise LLMCancelled()
+        except Exception:
+            if req.cancelled.is_set():
+                raise LLMCancelled()
+            raise
+        finally:
+            with self._lock:
+                self._active.discard(req)
+            metrics["total_sec"] = time.perf_counter() - t0
+
+    def _turn(self, user_text: str, stateless: bool, req: _Request, metrics: dict, options: dict):
+        """
+        一轮对话的流式回复；非无状态请求先把用户消息写入对话历史
+        param options: 附加到请求中的参数(如 think)
+        """
+        if stateless:
+            messages = [SYSTEM_PROMPT, {"role": "user", "content": user_text}]
+            yield from self._stream("/api/chat", {"messages": messages, **options}, req, metrics)
+            return
+        # 与 cancel() 互斥：请求开始前已被取消时不写入用户消息，历史中不会留下没有回复的一条
+        with req.lock:
+            if req.cancelled.is_set():
+                raise LLMCancelled()
+            self.history.append("user", user_text)
+            req.recorded = True
+        if self.session_context:
+            yield from self._session_turn(user_text, req, metrics, options)
+        else:
+            yield from self._stream("/api/chat", {"messages": self.history.messages(), **options},
+                                    req, metrics)
+
+    def _session_turn(self, user_text: str, req: _Request, metrics: dict, options: dict):
+        """
+        会话模式：/api/generate 附带上一轮返回的 context，服务端只需对本轮的新消息做 prefill
+        没有可用的 context(首轮、上一轮失败或取消、过长)时，用预算内的历史与摘要重建
+        服务端拒绝(HTTP 错误且尚未输出)时改用 /api/chat 发送完整历史，下一轮再重建 context
+        """
+        context = self._context
+        self._context = None  # 本轮完成前视为失效
+        if context is not None and len(context) > LLM_CONTEXT_MAX_TOKENS:
+            context = None
+        if context is not None:
+            payload = {"prompt": user_text, "context": context}
+        else:
+            system, prompt = _flatten(self.history.messages())
+            payload = {"system": system, "prompt": prompt}
+            metrics["context_rebuilt"] = True
+        try:
+            yield from self._stream("/api/generate", {**payload, **options}, req, metrics)
+        except requests.HTTPError as e:
+            if "ttft_sec" in metrics:
+                raise
+            _logger.warning("会话模式请求失败(%s)，改用 /api/chat 发送完整历史", e)
+            metrics["session_fallback"] = True
+            yield from self._stream("/api/chat", {"messages": self.history.messages(), **options}, req, metrics)
+            return
+
+        final = getattr(req, "final", {})
+        self._context = final.get("context")
+        if self._context and final.get("prompt_eval_count") is not None:
+            prompt_tokens = len(self._context) - (final.get("eval_count") or 0)
+            metrics["prefill_saved"] = max(0, prompt_tokens - final["prompt_eval_count"])
+            _logger.info("本轮 prefill %d token，复用上下文节省 %d token",
+                         final["prompt_eval_count"], metrics["prefill_saved"])
+
+    def _summarize(self, previous: str, messages: list) -> str:
+        """把移出历史的消息并入滚动摘要(在后台线程中调用)"""
+        lines = [f"{'用户' if m['role'] == 'user' else '助手'}：{m['content']}" for m in messages]
+        prompt = (
+            f"请把下面的对话压缩成一段摘要，不超过 {LLM_SUMMARY_TOKENS} 字，"
+            "保留事实、结论和待办事项，只输出摘要本身。\n\n"
+            + (f"已有摘要：{previous}\n\n" if previous else "")
+            + "对话：\n" + "\n".join(lines)
+        )
+        messages = [{"role": "user", "content": prompt}]
+        chunks = self._stream("/api/chat", {"messages": messages, "think": False}, _Request(), {})
+        return "".join(answer for _, answer in filter_stream(chunks, "hide"))
+
+    # ----------------- 同步接口 -----------------
+    def chat(self, user_text: str, stateless: bool = False, think: bool = None):
         """
         与大模型进行对话
         param user_text: 用户输入文本
+        param stateless: True 时不读写对话历史(一次性任务，可与其他请求并发)
+        param think: False 时要求模型不做推理(摘要等工具类调用)，None 使用模型默认行为
         return: 生成的回复内容(流式返回)
         """
-        self.history.append({"role": "user", "content": user_text})
-        
-        if len(self.history) > MAX_HISTORY * 2 + 1:
-            self.history = [SYSTEM_PROMPT] + self.history[-MAX_HISTORY * 2:]
-        
-        payload = {
-            "model": LLM_MODEL, 
-            "messages": self.history,  
-            "stream": True  #
-        }
-        
+        self.metrics = {}
+        options = {} if think is None else {"think": think}
+        full_response = ""
+        req = _Request()
         try:
-            resp = requests.post(
-                f"{OLLAMA_URL}/api/chat",
-                json=payload,
-                stream=True  
-            )
-            resp.raise_for_status()  
-            
-            full_response = ""  
-            for line in resp.iter_lines(decode_unicode=True):
-                if not line:
-                    continue
-                chunk = json.loads(line)
-                content = chunk.get("message", {}).get("content", "")
-                if content:
-                    yield content  
-                    full_response += content
-                if chunk.get("done"):  
-                    break
-            
-            self.history.append({"role": "assistant", "content": full_response})
-            
+            chunks = self._turn(user_text, stateless, req, self.metrics, options)
+            for display, answer in filter_stream(chunks, self.think_mode, self.on_reasoning):
+                if display:
+                    yield display
+                full_response += answer
+        except LLMCancelled:
+            # 保留已输出的部分，使历史仍按 用户/助手 交替
+            _logger.info("大模型请求已取消")
         except Exception as e:
             _logger.error("大模型调用失败: %s", e)
-            yield "抱歉，大模型调用失败"
\ No newline at end of file
+            if req.recorded:
+                self.history.pop()  # 撤回没有回复的用户消息，避免下一轮出现连续两条用户消息
+            yield _FALLBACK
+            return
+        if req.recorded:
+            self.history.append("assistant", full_response)
+
+    # ----------------- 异步接口 -----------------
+    async def achat(self, user_text: str, stateless: bool = False, think: bool = None):
+        """
+        chat() 的异步版本：async for 逐块获取回复，等待期间不阻塞事件循环
+        - 流在线程池中读取，经 asyncio.Queue 交给事件循环(on_reasoning 在读取线程中调用)
+        - stateless=True 的请求互不影响，可用 asyncio.gather 并发
+        - 取消所在任务(或提前退出 async for)会中断对应的 HTTP 请求
+        """
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+        req = _Request()
+        self.metrics = metrics = {}
+        options = {} if think is None else {"think": think}
+
+        def put(item):
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, item)
+            except RuntimeError:  # 事件循环已关闭
+                req.cancel()
+
+        def pump():
+            try:
+                chunks = self._turn(user_text, stateless, req, metrics, options)
+                for pair in filter_stream(chunks, self.think_mode, self.on_reasoning):
+                    put(pair)
+                item = _DONE
+            except BaseException as e:
+                item = e
+            put(item)
+
+        loop.run_in_executor(self._executor, pump)
+        full_response = ""
+        failed = False
+        try:
+            while True:
+                item = await queue.get()
+                if item is _DONE:
+                    break
+                if isinstance(item, LLMCancelled):
+                    _logger.info("大模型请求已取消")
+                    break
+                if isinstance(item, BaseException):
+                    _logger.error("大模型调用失败: %s", item)
+                    failed = True
+                    if req.recorded:
+                        self.history.pop()
+                    yield _FALLBACK
+                    break
+                display, answer = item
+                if display:
+                    yield display
+                full_response += answer
+        finally:
+            req.cancel()  # 正常结束时无影响；被取消或提前退出时中断读取线程
+            # cancel() 之后读取线程不会再写入用户消息；只有已写入时才补上回复
+            if req.recorded and not failed:
+                self.history.append("assistant", full_response)
@@ -0,0 +1,130 @@
+import logging
+import re
+import threading
+from config import SYSTEM_PROMPT, LLM_HISTORY_TOKENS, LLM_SUMMARY_TOKENS
+
+_logger = logging.getLogger(__name__)
+
+# 中日韩文字与全角符号：大致每字 1 个 token
+_CJK = re.compile(r"[\u3000-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uff00-\uffef]")
+# 其余文本按字母串、数字串、单个符号切分，每 4 个字符约 1 个 token
+_PIECE = re.compile(r"[A-Za-z]+|\d+|[^\sA-Za-z\d]")
+_MESSAGE_OVERHEAD = 4  # 每条消息的角色与分隔 token
+
+
+def estimate_tokens(text: str) -> int:
+    """快速估算文本的 token 数(无需加载分词器)"""
+    cjk = len(_CJK.findall(text))
+    rest = _CJK.sub(" ", text)
+    return cjk + sum((len(piece) + 3) // 4 for piece in _PIECE.findall(rest))
+
+
+def _truncate(text: str, budget: int) -> str:
+    while text and estimate_tokens(text) > budget:
+        text = text[:int(len(text) * 0.9)]
+    return text
+
+
+class ConversationHistory:
+    """
+    按 token 预算管理的对话历史
+    - 近期消息总量超过 budget 时，最早的消息移出请求
+    - 移出的消息在后台线程中交给 summarizer 并入滚动摘要，摘要作为一条系统消息放在历史最前面
+    - 摘要生成期间请求不等待，只是暂时不含这部分内容
+    因此无论对话多长，每次请求的提示词长度与首 token 延迟都基本不变
+    """
+    def __init__(self, system: dict = SYSTEM_PROMPT, budget: int = LLM_HISTORY_TOKENS,
+                 summary_budget: int = LLM_SUMMARY_TOKENS, summarizer=None):
+        """
+        param system: 系统提示消息
+        param budget: 近期消息的 token 预算
+        param summary_budget: 摘要的 token 上限
+        param summarizer: summarizer(已有摘要, 移出的消息列表) -> 新摘要；None 时直接丢弃移出的消息
+        """
+        self.system = system
+        self.budget = budget
+        self.summary_budget = summary_budget
+        self.summarizer = summarizer
+        self.summary = ""
+        self._turns = []  # [(消息, 估算 token 数)]
+        self._pending = []  # 等待并入摘要的消息
+        self._summarizing = False
+        self._lock = threading.Lock()
+        self._idle = threading.Event()
+        self._idle.set()
+        self.summary_count = 0
+
+    def __len__(self):
+        with self._lock:
+            return len(self._turns)
+
+    def append(self, role: str, content: str):
+        """追加一条消息，超出预算时移出最早的消息"""
+        message = {"role": role, "content": content}
+        with self._lock:
+            self._turns.append((message, estimate_tokens(content) + _MESSAGE_OVERHEAD))
+            self._trim()
+
+    def pop(self):
+        """移除最后一条消息(请求失败时撤回用户消息)"""
+        with self._lock:
+            if self._turns:
+                self._turns.pop()
+
+    def clear(self):
+        with self._lock:
+            self._turns.clear()
+            self._pending.clear()
+            self.summary = ""
+
+    def messages(self) -> list:
+        """本次请求要发送的消息：系统提示 + 滚动摘要 + 近期消息"""
+        with self._lock:
+            messages = [self.system]
+            if self.summary:
+                messages.append({"role": "system", "content": f"此前对话的摘要：{self.summary}"})
+            messages.extend(message for message, _ in self._turns)
+            return messages
+
+    def tokens(self) -> int:
+        """本次请求提示词的估算 token 数"""
+        return sum(estimate_tokens(m["content"]) + _MESSAGE_OVERHEAD for m in self.messages())
+
+    def wait_summary(self, timeout: float = None) -> bool:
+        """等待后台摘要完成"""
+        return self._idle.wait(timeout)
+
+    def _trim(self):
+        total = sum(tokens for _, tokens in self._turns)
+        # 最后一条(本轮用户输入)总是保留；移出时不让历史以助手消息开头
+        while len(self._turns) > 1 and (total > self.budget or self._turns[0][0]["role"] == "assistant"):
+            message, tokens = self._turns.pop(0)
+            total -= tokens
+            self._pending.append(message)
+        if not self._pending:
+            return
+        if self.summarizer is None:
+            self._pending.clear()
+        elif not self._summarizing:
+            self._summarizing = True
+            self._idle.clear()
+            threading.Thread(target=self._summarize, daemon=True, name="history-summary").start()
+
+    def _summarize(self):
+        """后台合并摘要，直到没有新移出的消息"""
+        while True:
+            with self._lock:
+                if not self._pending:
+                    self._summarizing = False
+                    self._idle.set()
+                    return
+                pending, self._pending = self._pending, []
+                previous = self.summary
+            try:
+                summary = _truncate(self.summarizer(previous, pending).strip(), self.summary_budget)
+            except Exception as e:
+                _logger.warning("对话摘要失败，较早的 %d 条消息将被丢弃: %s", len(pending), e)
+                continue
+            with self._lock:
+                self.summary = summary
+                self.summary_count += 1
@@ -1,4 +1,7 @@
 #大模型对话模块
-from .deepseek_client import DeepSeekClient
+from .deepseek_client import DeepSeekClient, LLMCancelled
+from .history import ConversationHistory, estimate_tokens
+from .reasoning import ThinkFilter, filter_stream
 
-__all__ = ["DeepSeekClient"]
\ No newline at end of file
+__all__ = ["DeepSeekClient", "LLMCancelled", "ConversationHistory", "estimate_tokens",
+           "ThinkFilter", "filter_stream"]
\ No newline at end of file
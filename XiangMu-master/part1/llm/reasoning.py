@@ -0,0 +1,87 @@
+OPEN_TAG = "<think>"
+CLOSE_TAG = "</think>"
+
+# 推理内容的处理方式
+THINK_MODES = ("hide", "show", "raw")
+
+
+def _partial_suffix(text: str, tag: str) -> int:
+    """text 末尾可能是 tag 前半部分的长度(标签被切在两个数据块之间)"""
+    for k in range(min(len(tag) - 1, len(text)), 0, -1):
+        if text.endswith(tag[:k]):
+            return k
+    return 0
+
+
+class ThinkFilter:
+    """
+    流式过滤 deepseek-r1 的 <think>...</think> 推理块
+    - feed() 输入模型输出的数据块，返回去掉推理块后的回答部分
+    - 标签可以被切在任意两个数据块之间
+    - 推理内容累积在 reasoning 中，并逐块交给 on_reasoning 回调(用于单独显示)
+    """
+    def __init__(self, on_reasoning=None):
+        self.on_reasoning = on_reasoning
+        self.reasoning = ""
+        self._in_think = False
+        self._pending = ""  # 末尾可能属于标签的字符，等下一个数据块再判断
+        self._strip_lead = False  # 推理块之后回答开头的空行不输出
+
+    def feed(self, chunk: str) -> str:
+        text = self._pending + chunk
+        self._pending = ""
+        out = []
+        while text:
+            tag = CLOSE_TAG if self._in_think else OPEN_TAG
+            i = text.find(tag)
+            if i < 0:
+                keep = _partial_suffix(text, tag)
+                self._emit(text[:len(text) - keep], out)
+                self._pending = text[len(text) - keep:]
+                break
+            self._emit(text[:i], out)
+            text = text[i + len(tag):]
+            self._in_think = not self._in_think
+            self._strip_lead = not self._in_think
+        return "".join(out)
+
+    def flush(self) -> str:
+        """输出结束时调用，返回缓存的剩余字符"""
+        out = []
+        self._emit(self._pending, out)
+        self._pending = ""
+        return "".join(out)
+
+    def _emit(self, text: str, out: list):
+        if not text:
+            return
+        if self._in_think:
+            self.reasoning += text
+            if self.on_reasoning is not None:
+                self.on_reasoning(text)
+            return
+        if self._strip_lead:
+            text = text.lstrip()
+            if not text:
+                return
+            self._strip_lead = False
+        out.append(text)
+
+
+def filter_stream(chunks, mode: str = "hide", on_reasoning=None):
+    """
+    对流式输出应用推理块过滤
+    param mode: "hide" 不显示推理；"show" 推理经 on_reasoning 单独显示；"raw" 连同 <think> 标签原样显示
+    return: 生成 (要显示的内容, 去掉推理后的回答) 二元组；三种模式下写入历史的都只有回答
+    """
+    if mode not in THINK_MODES:
+        raise ValueError(f"未知的推理处理方式：{mode}，可选：hide(不显示)、show(单独显示)、raw(原样显示)")
+    think_filter = ThinkFilter(on_reasoning if mode == "show" else None)
+    for chunk in chunks:
+        answer = think_filter.feed(chunk)
+        display = chunk if mode == "raw" else answer
+        if display or answer:
+            yield display, answer
+    tail = think_filter.flush()
+    if tail:
+        yield ("" if mode == "raw" else tail), tail
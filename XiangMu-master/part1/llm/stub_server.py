@@ -0,0 +1,184 @@
+"""
+本地 Ollama 替身服务(离线测试与基准测试用)
+- 支持 /api/chat 与 /api/generate 的流式 NDJSON 协议(HTTP/1.1 keep-alive，chunked 编码)
+- 可配置输出速度、响应头/首 token 延迟、失败率与中途断开，用于复现超时、重试与取消
+- /api/generate 返回模拟的 context 与 prompt_eval_count，用于验证会话模式
+用法：python -m llm.stub_server --port 11434 --rate 30
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from llm.history import estimate_tokens
+
+DEFAULT_REPLY = "<think>\n用户在问办公相关的问题。\n</think>\n\n好的，这是一个模拟的回复，用于离线测试大模型客户端。"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # 支持连接复用
+
+    def log_message(self, *args):
+        pass
+
+    def setup(self):
+        super().setup()
+        self.server.stub.connections += 1
+
+    def do_POST(self):
+        stub = self.server.stub
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        stub.requests += 1
+        stub.received.append((self.path, body))
+        if self.path not in ("/api/chat", "/api/generate"):
+            return self._send_error(404, "not found")
+        if stub.header_delay:
+            time.sleep(stub.header_delay)
+        if stub.fail_rate and (stub.fail_paths is None or self.path in stub.fail_paths) \
+                and stub.random.random() < stub.fail_rate:
+            stub.failures += 1
+            return self._send_error(stub.fail_status, "stub failure")
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        tokens = stub.tokens(body)
+        if stub.first_token_delay:
+            time.sleep(stub.first_token_delay)
+        generate = self.path == "/api/generate"
+        for i, token in enumerate(tokens):
+            if stub.drop_after is not None and i >= stub.drop_after:
+                self.close_connection = True
+                return  # 不发送结束块，模拟服务端中途崩溃
+            if generate:
+                self._write({"model": body.get("model"), "response": token, "done": False})
+            else:
+                self._write({"model": body.get("model"),
+                             "message": {"role": "assistant", "content": token}, "done": False})
+            if stub.token_rate and i + 1 < len(tokens):
+                time.sleep(1.0 / stub.token_rate)
+
+        final = {"model": body.get("model"), "done": True, "done_reason": "stop",
+                 "eval_count": len(tokens)}
+        if generate:
+            context = list(body.get("context") or [])
+            new_tokens = estimate_tokens(body.get("system", "") + body.get("prompt", "")) + 4
+            final["prompt_eval_count"] = new_tokens
+            final["context"] = context + [0] * (new_tokens + len(tokens))
+            final["response"] = ""
+        else:
+            final["prompt_eval_count"] = sum(estimate_tokens(m.get("content", "")) + 4
+                                             for m in body.get("messages", []))
+            final["message"] = {"role": "assistant", "content": ""}
+        self._write(final)
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _write(self, obj):
+        data = (json.dumps(obj, ensure_ascii=False) + "\n").encode("utf-8")
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def _send_error(self, status, message):
+        data = json.dumps({"error": message}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class StubOllama:
+    """
+    Ollama 替身服务，在后台线程中运行
+    用法：
+        with StubOllama(token_rate=0) as stub:
+            client = DeepSeekClient(base_url=stub.url)
+    """
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, reply: str = DEFAULT_REPLY,
+                 n_tokens: int = None, token_rate: float = 50.0, header_delay: float = 0.0,
+                 first_token_delay: float = 0.0, fail_rate: float = 0.0, fail_status: int = 500,
+                 fail_paths: tuple = None, drop_after: int = None, seed: int = 0):
+        """
+        param port: 0 表示自动选择空闲端口
+        param reply: 回复内容，按字切分为 token
+        param n_tokens: 回复的 token 数(循环重复 reply)，None 表示 reply 的长度
+        param token_rate: 每秒输出的 token 数，0 表示不限速
+        param header_delay: 返回响应头前的等待(模拟模型加载)
+        param first_token_delay: 首个 token 前的等待(模拟 prefill)
+        param fail_rate: 请求以 fail_status 失败的概率
+        param fail_paths: 只让这些路径的请求失败，None 表示所有路径
+        param drop_after: 输出该数量的 token 后直接断开连接
+        """
+        self.reply = reply
+        self.n_tokens = n_tokens
+        self.token_rate = token_rate
+        self.header_delay = header_delay
+        self.first_token_delay = first_token_delay
+        self.fail_rate = fail_rate
+        self.fail_status = fail_status
+        self.fail_paths = fail_paths
+        self.drop_after = drop_after
+        self.random = random.Random(seed)
+        self.requests = 0
+        self.connections = 0  # 客户端建立的 TCP 连接数
+        self.received = []  # 收到的请求 [(路径, 请求体)]
+        self.failures = 0
+        self._server = ThreadingHTTPServer((host, port), _Handler)
+        self._server.daemon_threads = True
+        self._server.stub = self
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def tokens(self, body: dict) -> list:
+        """本次请求要输出的 token"""
+        chars = list(self.reply)
+        if self.n_tokens is None:
+            return chars
+        return [chars[i % len(chars)] for i in range(self.n_tokens)]
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True, name="stub-ollama")
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地 Ollama 替身服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--rate", type=float, default=50.0, help="每秒输出的 token 数，0 表示不限速")
+    parser.add_argument("--tokens", type=int, help="每次回复的 token 数")
+    parser.add_argument("--header-delay", type=float, default=0.0)
+    parser.add_argument("--first-token-delay", type=float, default=0.0)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    parser.add_argument("--drop-after", type=int)
+    args = parser.parse_args()
+    stub = StubOllama(args.host, args.port, n_tokens=args.tokens, token_rate=args.rate,
+                      header_delay=args.header_delay, first_token_delay=args.first_token_delay,
+                      fail_rate=args.fail_rate, drop_after=args.drop_after)
+    print(f"Ollama 替身服务已启动：{stub.url}")
+    try:
+        stub._server.serve_forever()
+    except KeyboardInterrupt:
+        stub.stop()
+
+
+if __name__ == "__main__":
+    main()
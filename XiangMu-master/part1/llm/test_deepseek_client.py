@@ -0,0 +1,205 @@
+import asyncio
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from llm.deepseek_client import DeepSeekClient, _FALLBACK
+from llm.stub_server import StubOllama
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _client(url, **kwargs):
+    kwargs.setdefault("session_context", False)
+    return DeepSeekClient(base_url=url, timeout=(1.0, 5.0), **kwargs)
+
+
+def test_reply_and_history():
+    with StubOllama(token_rate=0) as stub:
+        client = _client(stub.url)
+        reply = "".join(client.chat("你好"))
+        client.close()
+    assert "模拟的回复" in reply
+    assert "<think>" not in reply
+    assert [m["role"] for m in client.history.messages()] == ["system", "user", "assistant"]
+
+
+def test_connection_failure_falls_back():
+    client = _client(f"http://127.0.0.1:{_free_port()}", retries=1, backoff=0.01)
+    assert "".join(client.chat("你好")) == _FALLBACK
+    # 失败的用户消息已撤回
+    assert [m["role"] for m in client.history.messages()] == ["system"]
+    client.close()
+
+
+def test_connection_is_reused():
+    with StubOllama(token_rate=0) as stub:
+        client = _client(stub.url)
+        reused = []
+        for _ in range(3):
+            "".join(client.chat("你好"))
+            reused.append(client.metrics["connection_reused"])
+        client.close()
+    assert reused == [False, True, True]
+    assert stub.connections == 1
+    assert stub.requests == 3
+
+
+def test_retry_until_server_is_up():
+    port = _free_port()
+    stubs = []
+    # 服务在构造时即开始监听，稍后再创建，模拟 Ollama 尚未启动
+    timer = threading.Timer(0.3, lambda: stubs.append(StubOllama(port=port, token_rate=0).start()))
+    timer.start()
+    try:
+        client = _client(f"http://127.0.0.1:{port}", retries=5, backoff=0.2)
+        reply = "".join(client.chat("你好"))
+        client.close()
+    finally:
+        timer.join()
+        for stub in stubs:
+            stub.stop()
+    assert "模拟的回复" in reply
+    assert client.metrics["retries"] >= 1
+    assert not client.metrics["connection_reused"]
+
+
+def test_http_error_falls_back_without_retry():
+    with StubOllama(fail_rate=1.0, token_rate=0) as stub:
+        client = _client(stub.url, retries=3, backoff=0.01)
+        assert "".join(client.chat("你好")) == _FALLBACK
+        client.close()
+    assert stub.requests == 1
+    assert len(client.history) == 0
+
+
+def test_cancel_stops_stream():
+    with StubOllama(reply="一二三四五", n_tokens=500, token_rate=100) as stub:
+        client = _client(stub.url)
+        t0 = time.perf_counter()
+        chunks = []
+        for chunk in client.chat("你好"):
+            chunks.append(chunk)
+            if len(chunks) == 5:
+                client.cancel()
+        elapsed = time.perf_counter() - t0
+        client.close()
+    assert 5 <= len(chunks) < 50
+    assert elapsed < 2.0  # 完整输出需要 5 秒
+    # 已输出的部分写入历史，保持 用户/助手 交替
+    messages = client.history.messages()
+    assert [m["role"] for m in messages] == ["system", "user", "assistant"]
+    assert messages[-1]["content"] == "".join(chunks)
+
+
+def _collect(client, text, **kwargs):
+    async def run():
+        return "".join([chunk async for chunk in client.achat(text, **kwargs)])
+    return run()
+
+
+def test_achat_concurrent_requests():
+    with StubOllama(reply="一二三", n_tokens=30, token_rate=100) as stub:
+        client = _client(stub.url)
+
+        async def main():
+            t0 = time.perf_counter()
+            replies = await asyncio.gather(*(_collect(client, f"问题{i}", stateless=True) for i in range(3)))
+            return replies, time.perf_counter() - t0
+
+        replies, elapsed = asyncio.run(main())
+        client.close()
+    assert replies == ["一二三" * 10] * 3
+    assert elapsed < 0.6  # 串行需要约 0.9 秒
+    assert stub.requests == 3
+    assert len(client.history) == 0  # 无状态请求不写入历史
+
+
+def test_achat_cancel_mid_stream():
+    with StubOllama(reply="一二三四五", n_tokens=500, token_rate=100) as stub:
+        client = _client(stub.url)
+        chunks = []
+
+        async def consume():
+            async for chunk in client.achat("你好"):
+                chunks.append(chunk)
+
+        async def main():
+            task = asyncio.create_task(consume())
+            while len(chunks) < 5:
+                await asyncio.sleep(0.01)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+        asyncio.run(main())
+        client.close()
+    messages = client.history.messages()
+    assert [m["role"] for m in messages] == ["system", "user", "assistant"]
+    assert messages[-1]["content"] == "".join(chunks)
+
+
+def test_achat_cancel_before_request_starts():
+    with StubOllama(token_rate=0) as stub:
+        client = _client(stub.url)
+        # 读取线程全部被占用，请求在取消前还没有开始
+        client._executor = ThreadPoolExecutor(max_workers=1)
+        gate = threading.Event()
+        client._executor.submit(gate.wait)
+
+        async def main():
+            task = asyncio.create_task(_collect(client, "你好"))
+            await asyncio.sleep(0.05)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+        asyncio.run(main())
+        gate.set()
+        client._executor.shutdown(wait=True)
+        client.close()
+    assert stub.requests == 0
+    assert [m["role"] for m in client.history.messages()] == ["system"]
+
+
+def test_session_context_is_reused():
+    with StubOllama(token_rate=0) as stub:
+        client = _client(stub.url, session_context=True)
+        "".join(client.chat("第一个问题"))
+        first = dict(client.metrics)
+        "".join(client.chat("第二个问题"))
+        second = client.metrics
+        client.close()
+    (path1, body1), (path2, body2) = stub.received
+    assert path1 == path2 == "/api/generate"
+    assert "context" not in body1 and "第一个问题" in body1["prompt"]
+    assert first["context_rebuilt"] and first["prefill_saved"] == 0
+    # 第二轮只发送新消息，沿用上一轮返回的 context
+    assert body2["prompt"] == "第二个问题"
+    assert body2["context"] and "system" not in body2
+    assert "context_rebuilt" not in second
+    assert second["prefill_saved"] == len(body2["context"])
+    assert [m["role"] for m in client.history.messages()] == ["system", "user", "assistant", "user", "assistant"]
+
+
+def test_session_falls_back_to_chat_on_http_error():
+    with StubOllama(token_rate=0, fail_rate=1.0, fail_paths=("/api/generate",)) as stub:
+        client = _client(stub.url, session_context=True)
+        reply = "".join(client.chat("你好"))
+        assert client.metrics["session_fallback"]
+        stub.fail_rate = 0.0
+        "".join(client.chat("再问一次"))
+        client.close()
+    assert "模拟的回复" in reply
+    assert [path for path, _ in stub.received] == ["/api/generate", "/api/chat", "/api/generate"]
+    assert [m["content"] for m in stub.received[1][1]["messages"][1:]] == ["你好"]
+    # 回退后没有 context，下一轮用完整历史重建
+    body = stub.received[2][1]
+    assert "context" not in body and "你好" in body["prompt"]
+    assert client.metrics["context_rebuilt"]
+    assert [m["role"] for m in client.history.messages()] == ["system", "user", "assistant", "user", "assistant"]
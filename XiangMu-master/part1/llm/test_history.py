@@ -0,0 +1,38 @@
+from llm.history import ConversationHistory, estimate_tokens
+
+
+def test_estimate_tokens():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("你好，世界") == 5
+    assert estimate_tokens("hello world 2024") == 2 + 2 + 1
+
+
+def test_old_turns_are_summarized_within_budget():
+    calls = []
+
+    def summarizer(previous, messages):
+        calls.append((previous, [m["content"] for m in messages]))
+        return previous + "".join(m["content"][0] for m in messages)
+
+    history = ConversationHistory(budget=40, summarizer=summarizer)
+    for i in range(10):
+        history.append("user", f"{i}号问题" * 3)
+        history.append("assistant", f"{i}号回答" * 3)
+    assert history.wait_summary(5)
+    messages = history.messages()
+    assert sum(estimate_tokens(m["content"]) + 4 for m in messages[2:]) <= 40
+    assert messages[1]["content"].startswith("此前对话的摘要：")
+    assert messages[2]["role"] == "user"  # 历史不以助手消息开头
+    assert history.summary == "".join(content[0] for _, contents in calls for content in contents)
+    assert calls and calls[0][0] == ""
+
+
+def test_latest_message_is_always_kept():
+    history = ConversationHistory(budget=5)
+    history.append("user", "这是一条远远超出预算的很长的用户输入")
+    assert [m["role"] for m in history.messages()] == ["system", "user"]
+    history.append("assistant", "回答")
+    history.append("user", "下一个问题")
+    # 没有摘要器时移出的消息直接丢弃
+    assert [m["content"] for m in history.messages()[1:]] == ["下一个问题"]
+    assert history.summary == ""
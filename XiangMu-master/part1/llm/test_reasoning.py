@@ -0,0 +1,47 @@
+import pytest
+from llm.reasoning import ThinkFilter, filter_stream
+
+TEXT = "<think>\n先想一想。\n</think>\n\n好的，回答。"
+
+
+def _splits(text):
+    """把 text 切成三块的所有方式，标签可能被切在任意位置"""
+    for i in range(len(text) + 1):
+        for j in range(i, len(text) + 1):
+            yield [text[:i], text[i:j], text[j:]]
+
+
+def _run(chunks, mode):
+    reasoning = []
+    pairs = list(filter_stream(chunks, mode, reasoning.append))
+    return "".join(d for d, _ in pairs), "".join(a for _, a in pairs), "".join(reasoning)
+
+
+@pytest.mark.parametrize("mode", ["hide", "show", "raw"])
+def test_tags_split_across_chunks(mode):
+    for chunks in _splits(TEXT):
+        display, answer, reasoning = _run(chunks, mode)
+        assert answer == "好的，回答。", chunks
+        assert display == (TEXT if mode == "raw" else "好的，回答。"), chunks
+        assert reasoning == ("\n先想一想。\n" if mode == "show" else ""), chunks
+
+
+def test_blank_lines_after_think_block_are_stripped():
+    think_filter = ThinkFilter()
+    assert think_filter.feed("<think>推理</think>") == ""
+    assert think_filter.feed("\n") == ""
+    assert think_filter.feed("\n  回答\n第二行") == "回答\n第二行"
+    assert think_filter.feed("\n\n结尾") == "\n\n结尾"  # 只去掉回答开头的空行
+    assert think_filter.reasoning == "推理"
+
+
+def test_partial_tag_at_end_is_flushed():
+    think_filter = ThinkFilter()
+    assert think_filter.feed("a < b <thi") == "a < b "
+    assert think_filter.flush() == "<thi"
+    assert list(filter_stream(["结果 <"], "raw")) == [("结果 <", "结果 "), ("", "<")]
+
+
+def test_unknown_mode():
+    with pytest.raises(ValueError, match="raw"):
+        list(filter_stream(["回答"], "strip"))
@@ -1,10 +1,15 @@
+import atexit
 import signal
 import sys
 import time
-import numpy as np
+STARTUP_T0 = time.perf_counter()  # 用于统计启动到菜单的耗时
 from audio.recorder import AudioRecorder
 from audio.stream_buffer import StreamBuffer
-from stt.whisper_engine import transcribe_once
+from stt import whisper_engine
+from stt.streaming import StreamingTranscriber
+from stt.keyword_spotter import KeywordSpotter
+from stt.worker import SttWorker
+from config import STT_WORKER_PROCESS, KWS_KEYWORDS
 from llm.deepseek_client import DeepSeekClient
 from ui.console_ui import ConsoleUI
 from rich.console import Console
@@ -22,16 +27,30 @@ from temperature import query_weather
 from note_assistant import NoteAssistant
 
 
+# 录音器、界面、识别引擎与各功能的助手都在主程序入口处创建：
+# 识别进程/进程池以 spawn 方式启动时会重新导入本模块，导入时不能占用声卡、注册热键、
+# 读取笔记日志(子进程可能截断父进程正在写的日志)或创建线程池
 console = Console()
-recorder = AudioRecorder()
-buffer = StreamBuffer()
-llm = DeepSeekClient()
-translator = Translator()
-note_ai = NoteAssistant()
+recorder = None
+ui = None
+stt_engine = whisper_engine
+spotter = None
+buffer = None
+llm = None
+translator = None
+note_ai = None
+
+# 流式识别线程：录音过程中实时显示并逐段确认文本
+streamer = None
+first_latency_reported = False
 
 # 当前功能
 function_type = None
 
+# 各功能的识别档位：翻译与笔记内容需要完整准确的句子，固定用听写档位；
+# 其余功能每个语音段按整段时长自动选择(笔记的短指令由指令词检测处理)
+FEATURE_PROFILES = {'2': "dictation", '4': "dictation"}
+
 
 # ===========================
 # 选择功能（不阻塞录音线程）
@@ -62,8 +81,18 @@ def select_function():
 # 开始录音
 # ===========================
 def start():
+    global streamer
+
+    # 上一次的识别线程(可能已被指令词检测取消)退出后再开始录音：
+    # 实时帧队列只能有一个消费者，共用的环形缓冲区也会被新线程清空
+    if streamer is not None:
+        streamer.cancel()
+        streamer.join()
     recorder.start_recording()
-    buffer.clear()
+    ui.reset_realtime()
+    streamer = StreamingTranscriber(recorder, buffer, on_partial=ui.update_realtime, engine=stt_engine,
+                                    profile=FEATURE_PROFILES.get(function_type))
+    streamer.start()
 
     msg = {
         '1': "🎤 说出你的文件操作需求…",
@@ -74,22 +103,57 @@ def start():
     console.print(f"[cyan]{msg.get(function_type, '')}[/cyan]")
 
 
+# ===========================
+# 短指令快速检测
+# ===========================
+def spot_command():
+    """单段短语音先做指令词检测：笔记助手响应全部指令词，其余功能只响应“退出”"""
+    span = recorder.segmenter.speech_span
+    if spotter is None or recorder.segmenter.count != 1:
+        return None
+    match = spotter.spot(recorder.full_audio.view()[span[0]:span[1]])
+    if match and (function_type == '4' or match.intent == "exit"):
+        return match
+    return None
+
+
 # ===========================
 # 停止录音 + 功能执行
 # ===========================
 def stop():
-    global function_type
+    global function_type, first_latency_reported
 
+    t_keyup = time.perf_counter()
+    # 先暂停流式识别，停止录音时送出的最后一段语音不会立即开始完整识别
+    streamer.hold()
     recorder.stop_recording()
     console.print("[yellow]⏹️ 正在识别语音…[/yellow]")
 
-    audio_np = np.array(recorder.full_audio, dtype="int16")
-    if not audio_np.size:
+    # 短指令命中时直接使用指令词，跳过完整识别；未命中再交给流式识别
+    match = spot_command()
+    if match:
+        streamer.cancel()
+        text = match.keyword
+        console.print(f"[dim]指令词：{match.keyword}(置信度 {match.confidence:.2f}，"
+                      f"{match.latency * 1000:.0f}ms)[/dim]")
+    else:
+        # ASR：已确认的部分在录音过程中识别完毕，这里只等待最后一段尾部
+        streamer.release()
+        text = streamer.result()
+    if not first_latency_reported:
+        first_latency_reported = True
+        console.print(f"[dim]首次识别：松开按键到出结果 {time.perf_counter() - t_keyup:.2f}s，"
+                      f"其中等待模型就绪 {stt_engine.get_stats().get('first_wait_sec', 0.0):.2f}s[/dim]")
+    capture = recorder.capture_stats()
+    if capture["dropped"]:
+        console.print(f"[dim]采集丢帧 {capture['dropped']}，最大帧间隔 {capture['max_gap_ms']:.0f}ms[/dim]")
+    if not text and streamer.error is not None:
+        console.print(f"[red]识别失败：{streamer.error}，请重试[/red]")
+        return
+    if not recorder.segmenter.count or not text:
         console.print("[red]未检测到语音，请重试[/red]")
         return
 
-    # ASR
-    text = transcribe_once(audio_np)
     ConsoleUI.print_asr(text)
     final_asr = ConsoleUI.ask_edit(text)
 
@@ -97,6 +161,10 @@ def stop():
         console.print("[red]空内容，请重试[/red]")
         return
 
+    if KWS_KEYWORDS.get(final_asr.strip("，。！ ")) == "exit":
+        select_function()
+        return
+
     # ===========================
     # 功能 1：文件操作
     # ===========================
@@ -153,12 +221,6 @@ def stop():
         select_function()  # ❗ 不退出，而是返回菜单
 
 
-# ===========================
-# UI 初始化
-# ===========================
-ui = ConsoleUI(start, stop)
-
-
 # ===========================
 # Ctrl + C 处理
 # ===========================
@@ -167,14 +229,26 @@ def sigint_handler(*_):
     sys.exit(0)
 
 
-signal.signal(signal.SIGINT, sigint_handler)
-
-
 # ===========================
 # 主程序
 # ===========================
 if __name__ == "__main__":
+    # 模型在后台(或独立识别进程中)加载与预热，菜单无需等待
+    if STT_WORKER_PROCESS:
+        stt_engine = SttWorker()
+    else:
+        whisper_engine.preload()
+    spotter = KeywordSpotter(stt_engine)
+    buffer = StreamBuffer()
+    llm = DeepSeekClient()
+    translator = Translator()
+    note_ai = NoteAssistant()
+    atexit.register(note_ai.close)  # 菜单退出与 Ctrl+C 都经 sys.exit 结束
+    recorder = AudioRecorder()
+    ui = ConsoleUI(start, stop)
+    signal.signal(signal.SIGINT, sigint_handler)
     console.print("程序已启动。按空格开始/停止录音", style="bold green")
+    console.print(f"[dim]启动到菜单耗时 {time.perf_counter() - STARTUP_T0:.2f}s[/dim]")
 
     select_function()
 
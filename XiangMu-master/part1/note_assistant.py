@@ -1,75 +1,105 @@
 import sys, os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-import json
-import datetime
 from llm.deepseek_client import DeepSeekClient
+from note_store import open_store
+from note_semantic import SemanticIndex
+from pathlib import Path
+from config import (NOTE_BACKEND, NOTE_SEARCH_LIMIT, NOTE_SEARCH_MODE, NOTE_SEMANTIC_TOP_K,
+                    NOTE_SEMANTIC_MIN_SCORE)
 from collections import Counter
+import logging
 import re
 
+_logger = logging.getLogger(__name__)
+
 class NoteAssistant:
     """
     智能笔记助手（已增强）
-    - notes 存在 notes.json（同目录）
+    - notes 由 note_store 存储(默认为追加写日志 notes.jsonl，首次运行时自动迁移 notes.json)
     - 本地快速摘要（笔记少时优先）
     - 大模型摘要（笔记多时，使用 DeepSeekClient）
     - 新增：列出全部笔记功能
+    - 语义检索：笔记向量存于 notes.emb.npy，关键词找不到时按意思查找(如用 "开会" 找到 "会议")；
+      首次语义检索时才开始计算向量，只记笔记、关键词能找到时不调用向量模型
     """
 
-    def __init__(self, note_file="notes.json"):
+    def __init__(self, note_file="notes.json", backend=NOTE_BACKEND, search_mode=NOTE_SEARCH_MODE,
+                 embedder=None):
+        """
+        param search_mode: "keyword"、"semantic" 或 "hybrid"(关键词没有结果时改用语义检索)
+        param embedder: 语义检索的向量模型，None 时按配置创建
+        """
         self.note_file = note_file
         self.ai = DeepSeekClient()
-
-        if not os.path.exists(self.note_file):
-            with open(self.note_file, "w", encoding="utf-8") as f:
-                json.dump([], f, ensure_ascii=False, indent=4)
-
-    # ----------------- 基础 I/O -----------------
-    def _load_notes(self):
-        with open(self.note_file, "r", encoding="utf-8") as f:
-            try:
-                return json.load(f)
-            except:
-                return []
-
-    def _save_notes(self, notes):
-        with open(self.note_file, "w", encoding="utf-8") as f:
-            json.dump(notes, f, ensure_ascii=False, indent=4)
+        self.store = open_store(backend, note_file)
+        self.search_mode = search_mode
+        self.semantic = None
+        if search_mode != "keyword":
+            self.semantic = SemanticIndex(Path(note_file).with_suffix(".emb"), embedder)
+        self._semantic_synced = False
+
+    def close(self):
+        """退出前调用：落盘笔记日志并保存搜索索引，下次启动无需重建"""
+        if self.semantic is not None:
+            self.semantic.close()
+        self.store.close()
+        self.ai.close()
 
     # ----------------- 操作方法 -----------------
     def add_note(self, text):
-        notes = self._load_notes()
-        entry = {
-            "time": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            "text": text
-        }
-        notes.append(entry)
-        self._save_notes(notes)
+        note = self.store.add(text)
+        if self._semantic_synced:  # 语义索引尚未启用时，新笔记在首次语义检索的 sync() 中排队
+            self.semantic.add(note["id"], text)
         return "已记录。"
 
     def list_notes(self, limit: int = None):
         """列出全部笔记（按时间升序），limit=None 列出全部"""
-        notes = self._load_notes()
+        notes = self.store.all() if limit is None else self.store.last(limit)
         if not notes:
             return "目前没有任何笔记。"
         lines = []
-        for n in notes if limit is None else notes[-limit:]:
+        for n in notes:
             lines.append(f"{n['time']} - {n['text']}")
         return "\n".join(lines)
 
     def search_notes(self, keyword):
-        notes = self._load_notes()
-        results = [n for n in notes if keyword in n["text"]]
+        if self.search_mode == "semantic":
+            return self.semantic_search(keyword)
+        results = self.store.search(keyword, limit=NOTE_SEARCH_LIMIT)
         if not results:
+            if self.search_mode == "hybrid":
+                return self.semantic_search(keyword)
             return "没有找到相关内容。"
         return "\n".join([f"{n['time']} - {n['text']}" for n in results])
 
+    def semantic_search(self, query, k=NOTE_SEMANTIC_TOP_K):
+        """按意思查找笔记，结果按相似度降序"""
+        if self.semantic is None:
+            return self.search_notes(query)
+        try:
+            if not self._semantic_synced:  # 启动后首次检索：旧笔记的向量在后台补算，清理已删除的
+                self.semantic.sync(self.store.all())
+                self._semantic_synced = True
+            hits = self.semantic.search(query, k, NOTE_SEMANTIC_MIN_SCORE)
+        except Exception as e:
+            _logger.warning("语义检索失败: %s", e)
+            return "没有找到相关内容。"
+        notes = {n["id"]: n for n in self.store.get([note_id for note_id, _ in hits])}
+        lines = [f"{notes[i]['time']} - {notes[i]['text']}" for i, _ in hits if i in notes]
+        pending = self.semantic.pending
+        if pending:
+            lines.append(f"(还有 {pending} 条笔记正在建立语义索引，暂未参与检索)")
+        if not lines:
+            return "没有找到相关内容。"
+        return "\n".join(lines)
+
     def delete_last(self):
-        notes = self._load_notes()
-        if not notes:
+        removed = self.store.delete_last()
+        if removed is None:
             return "没有可删除的笔记。"
-        removed = notes.pop()
-        self._save_notes(notes)
+        if self.semantic is not None:
+            self.semantic.remove(removed["id"])
         return f"已删除：{removed['text']}"
 
     # ----------------- 本地快速摘要（当笔记较少时优先使用） -----------------
@@ -114,13 +144,14 @@ class NoteAssistant:
         )
 
         answer = ""
-        for chunk in self.ai.chat(prompt):
+        # 一次性任务：不写入对话历史，也不需要模型推理
+        for chunk in self.ai.chat(prompt, stateless=True, think=False):
             answer += chunk
         return answer.strip()
 
     # ----------------- 对外 summarize 接口 -----------------
     def summarize(self):
-        notes = self._load_notes()
+        notes = self.store.all()
         if not notes:
             return "目前没有任何笔记。"
 
@@ -159,9 +190,11 @@ class NoteAssistant:
         if "找" in text or "搜索" in text:
             # 提取关键词（简化）
             keyword = re.sub(r"(找|搜索)", "", text).strip()
+            semantic = "语义" in keyword  # 如 "语义搜索 开会"：直接按意思查找
+            keyword = keyword.replace("语义", "").strip()
             if not keyword:
                 return "请告诉我想找的关键词。"
-            return self.search_notes(keyword)
+            return self.semantic_search(keyword) if semantic else self.search_notes(keyword)
 
         # —— 总结笔记 ——
         if "总结" in text:
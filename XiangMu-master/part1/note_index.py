@@ -0,0 +1,156 @@
+import json
+import logging
+import os
+import re
+from pathlib import Path
+
+_logger = logging.getLogger(__name__)
+
+_CJK_RUN = re.compile(r"[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+")
+_WORD = re.compile(r"[A-Za-z0-9]+")
+_INDEX_VERSION = 2  # 1 为 pickle 格式，已不再读取
+_EMPTY = frozenset()
+
+
+def index_terms(text: str) -> set:
+    """
+    建索引用的词项(无需中文分词)：汉字的单字与相邻二字组合，英文/数字按词(小写)
+    例如 "项目报告 v2" -> {项, 目, 报, 告, 项目, 目报, 报告, v2}
+    """
+    terms = set()
+    for run in _CJK_RUN.findall(text):
+        terms.update(run)
+        terms.update(run[i:i + 2] for i in range(len(run) - 1))
+    terms.update(w.lower() for w in _WORD.findall(text))
+    return terms
+
+
+def query_terms(keyword: str) -> set:
+    """查询用的汉字词项：相邻二字组合(单字时取单字)，原文包含 keyword 时必然包含全部这些词项"""
+    terms = set()
+    for run in _CJK_RUN.findall(keyword):
+        terms.update([run] if len(run) == 1 else (run[i:i + 2] for i in range(len(run) - 1)))
+    return terms
+
+
+def query_words(keyword: str) -> set:
+    """查询中的英文/数字串(小写)：原文包含 keyword 时，每个串都是某个索引词的子串"""
+    return {w.lower() for w in _WORD.findall(keyword)}
+
+
+def split_keywords(query: str) -> list:
+    """按空白拆分查询，"项目 报告" 表示同时包含 "项目" 与 "报告"(AND)"""
+    return query.split() or [query]
+
+
+def matches(text: str, keywords: list) -> bool:
+    """原文是否包含全部关键词(倒排索引只给出候选，最终以此为准)"""
+    return all(k in text for k in keywords)
+
+
+class NoteIndex:
+    """
+    笔记倒排索引：词项(汉字单字、二字组合，英文/数字词) -> 笔记编号集合
+    - add()/remove() 随笔记增删增量更新
+    - candidates() 对各关键词的倒排列表求交集(从最短的开始)，得到必然包含全部关键词的候选的超集，
+      调用方再用 matches() 逐条校验原文
+    - 英文/数字关键词在词表中按子串查找(词表远小于笔记数)，保持与逐条比较相同的子串语义
+    - save()/load() 把索引连同它覆盖到的日志位置一起存为 JSON，启动时只需补上之后追加的记录
+    """
+    def __init__(self):
+        self._postings = {}  # 词项 -> {笔记编号}
+        self._words = set()  # 英文/数字词项，用于子串查找
+
+    def __len__(self):
+        return len(self._postings)
+
+    def add(self, note_id: int, text: str):
+        for term in index_terms(text):
+            ids = self._postings.get(term)
+            if ids is None:
+                ids = self._postings[term] = set()
+                if not _CJK_RUN.match(term):
+                    self._words.add(term)
+            ids.add(note_id)
+
+    def remove(self, note_id: int, text: str):
+        for term in index_terms(text):
+            ids = self._postings.get(term)
+            if ids is None:
+                continue
+            ids.discard(note_id)
+            if not ids:
+                del self._postings[term]
+                self._words.discard(term)
+
+    def rebuild(self, notes):
+        """由笔记 [{"id", "text"}, ...] 重新建立索引"""
+        self.clear()
+        for note in notes:
+            self.add(note["id"], note["text"])
+
+    def clear(self):
+        self._postings.clear()
+        self._words.clear()
+
+    def candidates(self, keywords: list):
+        """
+        同时包含全部关键词的候选笔记编号
+        return: 编号集合；关键词中没有可索引的字符(只有符号等)时返回 None，调用方须逐条比较
+        """
+        postings = []
+        for keyword in keywords:
+            postings.extend(self._postings.get(t, _EMPTY) for t in query_terms(keyword))
+            for word in query_words(keyword):
+                ids = set()
+                for term in self._words:
+                    if word in term:
+                        ids |= self._postings[term]
+                postings.append(ids)
+        if not postings:
+            return None
+        postings.sort(key=len)
+        result = set(postings[0])
+        for ids in postings[1:]:
+            if not result:
+                break
+            result &= ids
+        return result
+
+    # ----------------- 存盘 -----------------
+    def save(self, path, source: dict):
+        """
+        原子写入索引文件(JSON，倒排列表存为升序的编号列表)
+        param source: 索引所对应日志的描述(inode、覆盖到的字节位置、mtime 等)，load() 时原样返回用于校验
+        """
+        path = Path(path)
+        tmp = path.with_name(path.name + ".tmp")
+        postings = {term: sorted(ids) for term, ids in self._postings.items()}
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": _INDEX_VERSION, "source": source, "postings": postings},
+                      f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp, path)
+
+    def load(self, path):
+        """
+        读取索引文件
+        return: 保存时的 source；文件不存在、损坏或版本不符时返回 None(索引为空，由调用方重建)
+        """
+        self.clear()
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data["version"] != _INDEX_VERSION:
+                return None
+            postings = {term: set(ids) for term, ids in data["postings"].items()}
+            source = data["source"]
+            if not isinstance(source, dict) or not all(isinstance(i, int) for ids in postings.values() for i in ids):
+                raise ValueError("格式不符")
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            _logger.warning("笔记索引 %s 无法读取，将重新建立: %s", path, e)
+            return None
+        self._postings = postings
+        self._words = {t for t in postings if not _CJK_RUN.match(t)}
+        return source
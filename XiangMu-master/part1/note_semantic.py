@@ -0,0 +1,277 @@
+import json
+import logging
+import os
+import threading
+import zlib
+from pathlib import Path
+import numpy as np
+import requests
+from config import (OLLAMA_URL, LLM_CONNECT_TIMEOUT, LLM_READ_TIMEOUT, LLM_KEEP_ALIVE,
+                    NOTE_EMBEDDER, NOTE_EMBED_MODEL, NOTE_EMBED_BATCH)
+from note_index import index_terms
+
+_logger = logging.getLogger(__name__)
+
+_MIN_CAPACITY = 1024  # 向量文件的初始行数，之后按需翻倍
+
+
+class OllamaEmbedder:
+    """
+    Ollama 向量模型(如 nomic-embed-text、bge-m3)
+    一批文本一次 /api/embed 请求；旧版 Ollama 没有该接口时退回逐条请求 /api/embeddings
+    """
+    def __init__(self, base_url: str = OLLAMA_URL, model: str = NOTE_EMBED_MODEL,
+                 timeout=(LLM_CONNECT_TIMEOUT, LLM_READ_TIMEOUT)):
+        self.name = f"ollama:{model}"
+        self.base_url = base_url
+        self.model = model
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def embed(self, texts: list) -> np.ndarray:
+        """return: (len(texts), 维度) 的 float32 矩阵"""
+        resp = self.session.post(f"{self.base_url}/api/embed", timeout=self.timeout,
+                                 json={"model": self.model, "input": list(texts), "keep_alive": LLM_KEEP_ALIVE})
+        if resp.status_code != 404:
+            resp.raise_for_status()
+            return np.asarray(resp.json()["embeddings"], dtype=np.float32)
+        vectors = []
+        for text in texts:
+            resp = self.session.post(f"{self.base_url}/api/embeddings", timeout=self.timeout,
+                                     json={"model": self.model, "prompt": text, "keep_alive": LLM_KEEP_ALIVE})
+            resp.raise_for_status()
+            vectors.append(resp.json()["embedding"])
+        return np.asarray(vectors, dtype=np.float32)
+
+
+class HashEmbedder:
+    """
+    确定性的字符哈希向量(无需模型，离线测试与基准测试用)
+    index_terms() 的词项(汉字单字、二字组合，英文词)按 crc32 带符号地累加到 dim 维，
+    只反映字面重合("开会" 与 "会议" 共享 "会")，不理解语义
+    """
+    def __init__(self, dim: int = 256):
+        self.name = f"hash:{dim}"
+        self.dim = dim
+
+    def embed(self, texts: list) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in zip(vectors, texts):
+            for term in index_terms(text):
+                h = zlib.crc32(term.encode("utf-8"))
+                row[h % self.dim] += 1.0 if h & 0x80000000 else -1.0
+        return vectors
+
+
+EMBEDDERS = ("ollama", "hash")
+
+
+def make_embedder(name: str = NOTE_EMBEDDER):
+    """按名称创建向量模型"""
+    if name == "ollama":
+        return OllamaEmbedder()
+    if name == "hash":
+        return HashEmbedder()
+    raise ValueError(f"未知的向量模型：{name}，可选：{', '.join(EMBEDDERS)}")
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+class SemanticIndex:
+    """
+    笔记语义索引
+    - 向量归一化后以 float16 存入 <path>.npy(np.memmap)，逐行追加，容量不足时翻倍扩容；
+      <path>.ids.npy 记录每行对应的笔记编号(0 表示空行或已删除)，<path>.json 记录向量模型与维度
+    - 已有笔记的向量不会重复计算：新增与尚未计算的笔记排队，由后台线程按 batch_size 分批计算，
+      检索不等待，只在已计算的笔记中查找；换了向量模型才整体重建
+    - 检索只需一次矩阵-向量乘法得到全部余弦相似度，再用 argpartition 取 top-k
+      矩阵乘法使用常驻内存的 float32 副本(NumPy 的 float16 乘法没有 BLAS 加速，慢一个数量级)；
+      副本只保存已使用的行，按需增长 1/4，不随文件容量翻倍
+    """
+    def __init__(self, path="notes.emb", embedder=None, batch_size: int = NOTE_EMBED_BATCH):
+        """
+        param path: 文件名前缀，生成 path.npy、path.ids.npy、path.json
+        param embedder: 提供 name 与 embed(texts) 的向量模型，None 时按配置创建
+        param batch_size: 后台每次计算向量的笔记条数
+        """
+        self.path = Path(path)
+        self.embedder = embedder if embedder is not None else make_embedder()
+        self.batch_size = batch_size
+        self._vec_path = self.path.with_name(self.path.name + ".npy")
+        self._ids_path = self.path.with_name(self.path.name + ".ids.npy")
+        self._meta_path = self.path.with_name(self.path.name + ".json")
+        self._lock = threading.Lock()
+        self._vectors = None  # float16 memmap (容量, 维度)
+        self._ids = None  # int64 memmap (容量,)
+        self._matrix = None  # float32 常驻副本，行数不少于 _size
+        self._size = 0  # 已使用的行数
+        self._rows = {}  # 笔记编号 -> 行号
+        self._pending = {}  # 等待计算向量的笔记：编号 -> 内容
+        self._backfilling = False
+        self._closed = False
+        self._idle = threading.Event()
+        self._idle.set()
+        self._open()
+
+    def __len__(self):
+        return len(self._rows)
+
+    @property
+    def pending(self) -> int:
+        """尚未计算向量的笔记数"""
+        with self._lock:
+            return len(self._pending)
+
+    def _open(self):
+        try:
+            meta = json.loads(self._meta_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return
+        if meta.get("embedder") != self.embedder.name:
+            _logger.info("向量模型由 %s 改为 %s，语义索引将重建", meta.get("embedder"), self.embedder.name)
+            return
+        self._vectors = np.load(self._vec_path, mmap_mode="r+")
+        self._ids = np.load(self._ids_path, mmap_mode="r+")
+        used = np.flatnonzero(self._ids)
+        self._size = int(used[-1]) + 1 if len(used) else 0
+        self._rows = {int(self._ids[row]): int(row) for row in used}
+        self._matrix = self._vectors[:self._size].astype(np.float32)
+
+    # ----------------- 与笔记同步 -----------------
+    def add(self, note_id: int, text: str):
+        """新增笔记，向量在后台计算"""
+        with self._lock:
+            if note_id not in self._rows:
+                self._pending[note_id] = text
+                self._start_backfill()
+
+    def remove(self, note_id: int):
+        with self._lock:
+            self._remove(note_id)
+
+    def _remove(self, note_id):
+        self._pending.pop(note_id, None)
+        row = self._rows.pop(note_id, None)
+        if row is not None:
+            self._ids[row] = 0
+            self._vectors[row] = 0
+            self._matrix[row] = 0
+
+    def sync(self, notes: list):
+        """与全部笔记对齐(启动后首次检索时调用，处理外部修改与尚未计算向量的旧笔记)"""
+        with self._lock:
+            current = {n["id"]: n["text"] for n in notes}
+            for note_id in [i for i in self._rows if i not in current]:
+                self._remove(note_id)
+            self._pending = {i: text for i, text in current.items() if i not in self._rows}
+            self._start_backfill()
+
+    def wait_idle(self, timeout: float = None) -> bool:
+        """等待后台向量计算完成"""
+        return self._idle.wait(timeout)
+
+    def close(self):
+        """停止后台计算(当前批次完成后退出)，未计算的笔记下次启动时由 sync() 重新排队"""
+        with self._lock:
+            self._closed = True
+
+    def _start_backfill(self):
+        if self._pending and not self._backfilling and not self._closed:
+            self._backfilling = True
+            self._idle.clear()
+            threading.Thread(target=self._backfill, daemon=True, name="note-embed").start()
+
+    def _backfill(self):
+        """后台分批计算排队笔记的向量，向量模型调用期间不持锁"""
+        while True:
+            with self._lock:
+                if not self._pending or self._closed:
+                    self._backfilling = False
+                    self._idle.set()
+                    return
+                batch = list(self._pending.items())[:self.batch_size]
+            try:
+                vectors = _normalize(self.embedder.embed([text for _, text in batch]))
+            except Exception as e:
+                _logger.warning("笔记向量计算失败，%d 条笔记暂不参与语义检索: %s", len(self._pending), e)
+                with self._lock:
+                    self._backfilling = False
+                    self._idle.set()
+                return
+            with self._lock:
+                # 计算期间被删除或修改的笔记不写入
+                keep = [i for i, (note_id, text) in enumerate(batch) if self._pending.get(note_id) == text]
+                if keep:
+                    self._append([batch[i][0] for i in keep], vectors[keep])
+                for i in keep:
+                    del self._pending[batch[i][0]]
+
+    def _append(self, ids: list, vectors: np.ndarray):
+        """把归一化的向量追加到文件末尾"""
+        if self._vectors is None or self._vectors.shape[1] != vectors.shape[1]:
+            self._create(vectors.shape[1], max(_MIN_CAPACITY, len(ids)))
+        elif self._size + len(ids) > len(self._ids):
+            self._grow(max(2 * len(self._ids), self._size + len(ids)))
+        rows = slice(self._size, self._size + len(ids))
+        if rows.stop > len(self._matrix):
+            rows_needed = max(rows.stop, len(self._matrix) * 5 // 4)
+            matrix = np.zeros((rows_needed, self._matrix.shape[1]), dtype=np.float32)
+            matrix[:self._size] = self._matrix[:self._size]
+            self._matrix = matrix
+        self._vectors[rows] = vectors
+        self._matrix[rows] = self._vectors[rows]
+        self._ids[rows] = ids  # 最后写编号：中途崩溃时这些行视为空行
+        self._vectors.flush()
+        self._ids.flush()
+        for row, note_id in enumerate(ids, self._size):
+            self._rows[note_id] = row
+        self._size = rows.stop
+
+    def _create(self, dim: int, capacity: int):
+        if self._rows:  # 旧向量全部作废，对应的笔记在下次 sync() 时重新排队
+            _logger.warning("向量维度变为 %d，已有的 %d 条向量作废", dim, len(self._rows))
+        self._vectors = np.lib.format.open_memmap(self._vec_path, mode="w+", dtype=np.float16,
+                                                  shape=(capacity, dim))
+        self._ids = np.lib.format.open_memmap(self._ids_path, mode="w+", dtype=np.int64, shape=(capacity,))
+        self._matrix = np.zeros((0, dim), dtype=np.float32)
+        self._size = 0
+        self._rows = {}
+        self._meta_path.write_text(json.dumps({"embedder": self.embedder.name, "dim": dim}), encoding="utf-8")
+
+    def _grow(self, capacity: int):
+        """扩容：写入更大的新文件后原子替换"""
+        dim = self._vectors.shape[1]
+        for path, old, shape, dtype in ((self._vec_path, self._vectors, (capacity, dim), np.float16),
+                                        (self._ids_path, self._ids, (capacity,), np.int64)):
+            tmp = path.with_name(path.name + ".tmp")
+            new = np.lib.format.open_memmap(tmp, mode="w+", dtype=dtype, shape=shape)
+            new[:self._size] = old[:self._size]
+            new.flush()
+            del new
+            os.replace(tmp, path)
+        self._vectors = np.load(self._vec_path, mmap_mode="r+")
+        self._ids = np.load(self._ids_path, mmap_mode="r+")
+
+    # ----------------- 检索 -----------------
+    def search(self, query: str, k: int = 5, min_score: float = 0.0) -> list:
+        """
+        与 query 语义最接近的笔记(只在已计算向量的笔记中查找，不等待后台计算)
+        return: [(笔记编号, 余弦相似度)]，按相似度降序，最多 k 条
+        """
+        with self._lock:
+            self._start_backfill()  # 上次后台计算失败时重试
+            if not self._rows:
+                return []
+        q = _normalize(self.embedder.embed([query]))[0]
+        with self._lock:
+            if len(q) != self._matrix.shape[1]:
+                raise ValueError(f"查询向量维度 {len(q)} 与索引维度 {self._matrix.shape[1]} 不一致")
+            scores = self._matrix[:self._size] @ q
+            k = min(k, self._size)
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            return [(int(self._ids[row]), float(scores[row])) for row in top
+                    if self._ids[row] and scores[row] >= min_score]
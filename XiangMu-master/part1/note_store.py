@@ -0,0 +1,618 @@
+import datetime
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from config import NOTE_FSYNC, NOTE_COMPACT_MIN
+from note_index import NoteIndex, index_terms, query_terms, query_words, split_keywords, matches
+
+_logger = logging.getLogger(__name__)
+
+FSYNC_POLICIES = ("always", "batch", "never")
+_FSYNC_BATCH_SEC = 1.0  # batch 策略下两次 fsync 的最短间隔
+_MAX_WORD_TERMS = 64  # 英文关键词对应的索引词超过该数量时不走全文索引，直接逐条比较原文
+
+
+def _now() -> str:
+    return datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _signature(path):
+    """文件签名(mtime_ns, 大小, inode)，任一变化即视为文件被修改"""
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size, st.st_ino
+
+
+class NoteStore:
+    """
+    笔记存储接口
+    笔记为 {"id": 编号, "time": "YYYY-mm-dd HH:MM:SS", "text": 内容}，按添加顺序排列
+    """
+    def add(self, text: str) -> dict:
+        raise NotImplementedError
+
+    def delete_last(self):
+        """删除最后一条笔记，返回被删除的笔记；没有笔记时返回 None"""
+        raise NotImplementedError
+
+    def all(self) -> list:
+        """全部笔记(按时间升序)"""
+        raise NotImplementedError
+
+    def last(self, n: int) -> list:
+        """最近的 n 条笔记(按时间升序)"""
+        return self.all()[-n:] if n > 0 else []
+
+    def count(self) -> int:
+        return len(self.all())
+
+    def get(self, ids) -> list:
+        """按编号取笔记(按时间升序)，不存在的编号忽略"""
+        wanted = set(ids)
+        return [n for n in self.all() if n["id"] in wanted]
+
+    def search(self, keyword: str, limit: int = None, offset: int = 0) -> list:
+        """
+        包含 keyword 的笔记(按时间升序，各存储的结果顺序一致)
+        param keyword: 以空白分隔的多个关键词须同时包含，如 "项目 报告"
+        param limit/offset: 分页，limit=None 返回全部
+        """
+        keywords = split_keywords(keyword)
+        results = [n for n in self.all() if matches(n["text"], keywords)]
+        return results[offset:] if limit is None else results[offset:offset + limit]
+
+    def cache_stats(self) -> dict:
+        """内存缓存的命中统计，没有缓存的存储返回空字典"""
+        return {}
+
+    def close(self):
+        pass
+
+
+class NoteCache:
+    """
+    进程内共享的笔记缓存(按文件路径)
+    - 文件只在首次读取或签名(mtime_ns, 大小, inode)变化时(如被外部编辑)重新解析
+    - 写入后直接保存内存中已修改的笔记与新签名，只读操作通常只需一次 stat，不读文件
+    """
+    def __init__(self):
+        self._entries = {}  # 绝对路径 -> (签名, 笔记列表)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, path, loader) -> list:
+        """
+        取缓存的笔记，文件签名变化时调用 loader() 重新加载
+        return: 缓存中的列表本身(调用方修改后须调用 put)
+        """
+        key = os.path.abspath(path)
+        sig = _signature(path)  # 先取签名再读取：期间文件若再被修改，下次读取会重新加载
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == sig:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        notes = loader()
+        with self._lock:
+            self._entries[key] = (sig, notes)
+        return notes
+
+    def put(self, path, notes: list):
+        """文件写入完成后更新缓存"""
+        with self._lock:
+            self._entries[os.path.abspath(path)] = (_signature(path), notes)
+
+    def invalidate(self, path=None):
+        """丢弃某个文件(None 表示全部)的缓存"""
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(os.path.abspath(path), None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "files": len(self._entries)}
+
+
+note_cache = NoteCache()
+
+
+class JsonNoteStore(NoteStore):
+    """
+    原有格式：每次写入都整体重写 notes.json(仅用于兼容与对比)
+    读取经进程内的 note_cache，文件未被外部修改时不重新解析
+    """
+    def __init__(self, path="notes.json"):
+        self.path = Path(path)
+        if not self.path.exists():
+            self._save([])
+
+    def _load(self) -> list:
+        return note_cache.get(self.path, self._read)
+
+    def _read(self) -> list:
+        with open(self.path, "r", encoding="utf-8") as f:
+            try:
+                notes = json.load(f)
+            except ValueError:
+                return []
+        for i, note in enumerate(notes):
+            note.setdefault("id", i + 1)
+        return notes
+
+    def _save(self, notes):
+        try:
+            with open(self.path, "w", encoding="utf-8") as f:
+                json.dump(notes, f, ensure_ascii=False, indent=4)
+        except OSError:
+            note_cache.invalidate(self.path)  # 内存中的笔记已修改但没写成功
+            raise
+        note_cache.put(self.path, notes)
+
+    def add(self, text):
+        notes = self._load()
+        note = {"id": (notes[-1]["id"] + 1) if notes else 1, "time": _now(), "text": text}
+        notes.append(note)
+        self._save(notes)
+        return note
+
+    def delete_last(self):
+        notes = self._load()
+        if not notes:
+            return None
+        removed = notes.pop()
+        self._save(notes)
+        return removed
+
+    def all(self):
+        return [dict(n) for n in self._load()]
+
+    def last(self, n):
+        return [dict(note) for note in self._load()[-n:]] if n > 0 else []
+
+    def count(self):
+        return len(self._load())
+
+    def cache_stats(self):
+        return note_cache.stats()
+
+
+class JournalNoteStore(NoteStore):
+    """
+    追加写日志(JSONL)存储
+    - 每行一条记录：{"op": "add", "id", "time", "text"} 或删除标记 {"op": "del", "id"}
+    - 添加/删除只追加一行，耗时与笔记总数无关；启动时重放日志得到内存中的笔记
+    - fsync 策略："always" 每次写入都落盘；"batch" 至多每秒落盘一次；"never" 只写入系统缓存
+    - 删除标记与被删除的记录累积到一定数量后，后台线程把日志压缩为只含现存笔记的新文件
+    - 日志不存在而旧的 notes.json 存在时，自动迁移(旧文件改名为 .bak 保留)
+    - 记录自己最后一次写入后的文件签名，读取时签名不同(文件被外部修改)则重新加载
+    - 维护倒排索引(NoteIndex)，搜索时求交集而不逐条扫描；索引在关闭时存为日志同目录下的 notes.jsonl.idx.json，
+      下次启动只需为其后追加的记录更新索引；索引文件缺失、损坏或与日志不符时重建
+    """
+    def __init__(self, path="notes.jsonl", legacy_path="notes.json", fsync: str = NOTE_FSYNC,
+                 compact_min: int = NOTE_COMPACT_MIN):
+        """
+        param compact_min: 失效记录数超过该值且超过现存笔记数时触发压缩
+        """
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"未知的 fsync 策略：{fsync}，可选：{', '.join(FSYNC_POLICIES)}")
+        self.path = Path(path)
+        self.fsync = fsync
+        self.compact_min = compact_min
+        self._lock = threading.RLock()
+        self._notes = {}  # 编号 -> 笔记，按添加顺序
+        self._next_id = 1
+        self._dead = 0  # 日志中已失效的记录数(删除标记 + 被删除的添加记录)
+        self._compacting = None  # 压缩期间新写入的记录
+        self._last_sync = 0.0
+        self.compactions = 0
+        self.hits = 0
+        self.misses = 0
+        self.index = NoteIndex()
+        self._index_path = self.path.with_name(self.path.name + ".idx.json")  # 与日志放在同一目录
+
+        if not self.path.exists() and legacy_path and Path(legacy_path).exists():
+            self._migrate(Path(legacy_path))
+        self._load()
+        self._open()
+
+    def _load(self):
+        """重放日志；存盘的索引与日志吻合时只为其后追加的记录更新索引，否则重建"""
+        source = self.index.load(self._index_path)
+        index_from = None
+        if source is not None and self.path.exists():
+            st = self.path.stat()
+            offset = source.get("offset")
+            if source.get("inode") == st.st_ino and isinstance(offset, int):
+                # 日志没有追加过记录时 mtime 也应相同，排除等长的原地改写
+                if offset < st.st_size or (offset == st.st_size and source.get("mtime_ns") == st.st_mtime_ns):
+                    index_from = offset
+        state = self._replay(index_from)
+        if state is None or state != source.get("state"):  # 日志被压缩或在索引覆盖的范围内被改写过
+            self.index.rebuild(self._notes.values())
+
+    def _state(self) -> list:
+        """当前笔记的概要(条数、最后一条的编号)，用于校验索引与日志是否吻合"""
+        return [len(self._notes), next(reversed(self._notes), 0)]
+
+    def _open(self):
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._sig = _signature(self.path)
+
+    def _sync(self):
+        """文件签名与自己最后一次写入后的不同时(被外部编辑或替换)重新加载"""
+        try:
+            sig = _signature(self.path)
+        except FileNotFoundError:
+            sig = None
+        if sig == self._sig or self._compacting is not None:
+            self.hits += 1
+            return
+        self.misses += 1
+        _logger.info("笔记日志 %s 已被外部修改，重新加载", self.path)
+        self._file.close()
+        self._notes.clear()
+        self._next_id = 1
+        self._dead = 0
+        self._replay()
+        self.index.rebuild(self._notes.values())
+        self._open()
+
+    # ----------------- 启动 -----------------
+    def _migrate(self, legacy: Path):
+        notes = JsonNoteStore(legacy).all()
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            for i, note in enumerate(notes, 1):
+                f.write(json.dumps({"op": "add", "id": i, "time": note["time"], "text": note["text"]},
+                                   ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+        legacy.rename(legacy.with_name(legacy.name + ".bak"))
+        _logger.info("已将 %d 条笔记从 %s 迁移到 %s", len(notes), legacy, self.path)
+
+    def _replay(self, index_from: int = None):
+        """
+        param index_from: 索引已覆盖到的字节位置，其后的记录同时更新索引；None 表示不更新
+        return: 重放到 index_from 时的 _state()(用于校验索引)，没有经过该位置时为 None
+        """
+        if not self.path.exists():
+            return None
+        offset = 0
+        state = None
+        line = b""
+        with open(self.path, "rb") as f:
+            for line in f:
+                if offset == index_from:
+                    state = self._state()
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    if not line.endswith(b"\n"):
+                        # 没有换行符的最后一行是进程崩溃时写了一半的记录，截断后继续追加
+                        _logger.warning("笔记日志 %s 末尾有不完整的记录，已忽略", self.path)
+                        break
+                    # 中间的损坏行只跳过，不能因此丢掉其后的有效记录
+                    _logger.warning("笔记日志 %s 第 %d 字节处的记录已损坏，已跳过", self.path, offset)
+                    offset += len(line)
+                    continue
+                self._apply(record, index=state is not None)
+                offset += len(line)
+        if offset == index_from:
+            state = self._state()
+        if offset < self.path.stat().st_size:
+            os.truncate(self.path, offset)
+        elif line and not line.endswith(b"\n"):
+            # 最后一条记录完整但缺少换行符：补上，否则下一条记录会接在同一行
+            with open(self.path, "ab") as f:
+                f.write(b"\n")
+        return state
+
+    def _apply(self, record: dict, index: bool = False):
+        if record["op"] == "add":
+            note = {"id": record["id"], "time": record["time"], "text": record["text"]}
+            self._notes[note["id"]] = note
+            self._next_id = max(self._next_id, note["id"] + 1)
+            if index:
+                self.index.add(note["id"], note["text"])
+        elif record["op"] == "del":
+            note = self._notes.pop(record["id"], None)
+            if note is not None:
+                self._dead += 1
+                if index:
+                    self.index.remove(note["id"], note["text"])
+            self._dead += 1
+
+    # ----------------- 写入 -----------------
+    def _append(self, record: dict):
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._file.flush()
+        self._sig = _signature(self._file.fileno())
+        if self.fsync == "always" or (self.fsync == "batch"
+                                      and time.monotonic() - self._last_sync >= _FSYNC_BATCH_SEC):
+            os.fsync(self._file.fileno())
+            self._last_sync = time.monotonic()
+        if self._compacting is not None:
+            self._compacting.append(record)
+
+    def add(self, text):
+        with self._lock:
+            self._sync()
+            note = {"id": self._next_id, "time": _now(), "text": text}
+            self._append({"op": "add", **note})
+            self._notes[note["id"]] = note
+            self.index.add(note["id"], text)
+            self._next_id += 1
+            return dict(note)
+
+    def delete_last(self):
+        with self._lock:
+            self._sync()
+            if not self._notes:
+                return None
+            _, note = self._notes.popitem()
+            self._append({"op": "del", "id": note["id"]})
+            self.index.remove(note["id"], note["text"])
+            self._dead += 2
+            self._maybe_compact()
+            return dict(note)
+
+    # ----------------- 读取 -----------------
+    def all(self):
+        with self._lock:
+            self._sync()
+            return [dict(n) for n in self._notes.values()]
+
+    def last(self, n):
+        with self._lock:
+            self._sync()
+            notes = []
+            for note in reversed(self._notes.values()):
+                if len(notes) >= n:
+                    break
+                notes.append(dict(note))
+            return notes[::-1]
+
+    def count(self):
+        with self._lock:
+            self._sync()
+            return len(self._notes)
+
+    def get(self, ids):
+        with self._lock:
+            self._sync()
+            return [dict(self._notes[i]) for i in sorted(set(ids)) if i in self._notes]
+
+    def search(self, keyword, limit=None, offset=0):
+        keywords = split_keywords(keyword)
+        with self._lock:
+            self._sync()
+            ids = self.index.candidates(keywords)
+            if ids is None:
+                notes = self._notes.values()
+            else:
+                notes = (self._notes[i] for i in sorted(ids) if i in self._notes)
+            results = []
+            for note in notes:
+                if matches(note["text"], keywords):
+                    results.append(note)
+                    if limit is not None and len(results) >= offset + limit:
+                        break
+        results = results[offset:offset + limit] if limit is not None else results[offset:]
+        return [dict(n) for n in results]
+
+    # ----------------- 压缩 -----------------
+    def _maybe_compact(self):
+        if self._compacting is None and self._dead >= max(self.compact_min, len(self._notes)):
+            self._compacting = []
+            snapshot = list(self._notes.values())
+            threading.Thread(target=self._compact, args=(snapshot,), daemon=True, name="note-compact").start()
+
+    def compact(self):
+        """立即压缩日志(同步执行)"""
+        with self._lock:
+            if self._compacting is not None:
+                return
+            self._compacting = []
+            snapshot = list(self._notes.values())
+        self._compact(snapshot)
+
+    def _compact(self, snapshot: list):
+        """把快照写入新文件(不持锁)，再补上期间新写入的记录并原子替换"""
+        tmp = self.path.with_name(self.path.name + ".compact")
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                for note in snapshot:
+                    f.write(json.dumps({"op": "add", **note}, ensure_ascii=False) + "\n")
+                with self._lock:
+                    for record in self._compacting:
+                        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                    f.flush()
+                    os.fsync(f.fileno())
+                    self._file.close()
+                    os.replace(tmp, self.path)
+                    self._open()
+                    self._dead = sum(2 for r in self._compacting if r["op"] == "del")
+                    self.compactions += 1
+                    self._save_index()  # 压缩后 inode 改变，旧的索引文件已不能使用
+        except OSError as e:
+            _logger.error("笔记日志压缩失败: %s", e)
+        finally:
+            with self._lock:
+                self._compacting = None
+
+    def _save_index(self):
+        """保存索引及其覆盖到的日志位置(须持锁，日志已 flush)"""
+        st = os.fstat(self._file.fileno())
+        try:
+            self.index.save(self._index_path, {"inode": st.st_ino, "offset": st.st_size,
+                                               "mtime_ns": st.st_mtime_ns, "state": self._state()})
+        except OSError as e:
+            _logger.warning("笔记索引保存失败，下次启动时重建: %s", e)
+
+    def close(self):
+        with self._lock:
+            if self._file.closed:
+                return
+            self._file.flush()
+            if self.fsync != "never":
+                os.fsync(self._file.fileno())
+            self._save_index()
+            self._file.close()
+
+    def cache_stats(self):
+        return {"hits": self.hits, "misses": self.misses}
+
+
+class SqliteNoteStore(NoteStore):
+    """
+    SQLite 存储，带 FTS5 全文索引
+    - notes 表的 time 列建有索引；notes_fts 以 rowid 关联笔记，索引列为 index_terms() 生成的词项
+      (汉字单字+二字组合)，中文无需分词器即可检索
+    - search() 先用 FTS5 按词项取候选，再校验原文包含关键词，按编号排序(与其他存储一致)，支持 LIMIT/OFFSET 分页；
+      英文关键词先在词表(notes_vocab)中查出包含它的索引词("ell" -> hello)，与逐条比较的子串语义一致，
+      这样的索引词太多或没有可用的词项时直接逐条比较原文
+    - 首次打开时导入 notes.jsonl 或 notes.json 中的笔记(原文件保留)，meta 表记录已导入，之后不再导入
+    """
+    _SYNC = {"always": "FULL", "batch": "NORMAL", "never": "OFF"}
+
+    def __init__(self, path="notes.db", legacy_path="notes.json", fsync: str = NOTE_FSYNC):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"未知的 fsync 策略：{fsync}，可选：{', '.join(FSYNC_POLICIES)}")
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(f"PRAGMA synchronous={self._SYNC[fsync]}")
+        with self._db:
+            self._db.execute("CREATE TABLE IF NOT EXISTS notes ("
+                             "id INTEGER PRIMARY KEY AUTOINCREMENT, time TEXT NOT NULL, text TEXT NOT NULL)")
+            self._db.execute("CREATE INDEX IF NOT EXISTS notes_time ON notes(time)")
+            self._db.execute("CREATE VIRTUAL TABLE IF NOT EXISTS notes_fts USING fts5(terms, tokenize='unicode61')")
+            self._db.execute("CREATE VIRTUAL TABLE IF NOT EXISTS notes_vocab USING fts5vocab(notes_fts, 'row')")
+            self._db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        if self._meta("migrated") is None:
+            # 只导入一次：否则删光笔记后，下次启动会把旧文件中的笔记重新导入
+            if legacy_path and not self.count():
+                self._migrate(Path(legacy_path))
+            with self._db:
+                self._db.execute("INSERT OR REPLACE INTO meta VALUES ('migrated', ?)", (_now(),))
+
+    def _meta(self, key: str):
+        row = self._db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _migrate(self, legacy: Path):
+        journal = legacy.with_suffix(".jsonl")
+        if journal.exists():
+            source = JournalNoteStore(journal, legacy_path=None)
+            notes = source.all()
+            source.close()
+        elif legacy.exists():
+            notes = JsonNoteStore(legacy).all()
+        else:
+            return
+        self.import_notes(notes)
+        _logger.info("已将 %d 条笔记导入 %s", len(notes), self.path)
+
+    def import_notes(self, notes: list):
+        """批量导入笔记([{"time", "text"}, ...])，单个事务完成"""
+        with self._lock, self._db:
+            for note in notes:
+                self._insert(note["time"], note["text"])
+
+    def _insert(self, time_str, text) -> int:
+        note_id = self._db.execute("INSERT INTO notes(time, text) VALUES (?, ?)", (time_str, text)).lastrowid
+        self._db.execute("INSERT INTO notes_fts(rowid, terms) VALUES (?, ?)",
+                         (note_id, " ".join(index_terms(text))))
+        return note_id
+
+    def add(self, text):
+        note = {"time": _now(), "text": text}
+        with self._lock, self._db:
+            note["id"] = self._insert(note["time"], text)
+        return note
+
+    def delete_last(self):
+        with self._lock, self._db:
+            row = self._db.execute("SELECT id, time, text FROM notes ORDER BY id DESC LIMIT 1").fetchone()
+            if row is None:
+                return None
+            self._db.execute("DELETE FROM notes WHERE id = ?", (row[0],))
+            self._db.execute("DELETE FROM notes_fts WHERE rowid = ?", (row[0],))
+        return self._note(row)
+
+    @staticmethod
+    def _note(row) -> dict:
+        return {"id": row[0], "time": row[1], "text": row[2]}
+
+    def _query(self, sql, params=()) -> list:
+        with self._lock:
+            return [self._note(row) for row in self._db.execute(sql, params)]
+
+    def all(self):
+        return self._query("SELECT id, time, text FROM notes ORDER BY id")
+
+    def last(self, n):
+        return self._query("SELECT id, time, text FROM notes ORDER BY id DESC LIMIT ?", (n,))[::-1]
+
+    def count(self):
+        with self._lock:
+            return self._db.execute("SELECT count(*) FROM notes").fetchone()[0]
+
+    def get(self, ids):
+        ids = sorted(set(ids))
+        return self._query("SELECT id, time, text FROM notes WHERE id IN (%s) ORDER BY id"
+                           % ",".join("?" * len(ids)), ids) if ids else []
+
+    def search(self, keyword, limit=None, offset=0):
+        keywords = split_keywords(keyword)
+        clauses = ['"%s"' % t for t in sorted(set().union(*map(query_terms, keywords)))]
+        for word in sorted(set().union(*map(query_words, keywords))):
+            with self._lock:  # 英文索引词排在汉字之前，term < '{' 只扫描词表中的英文/数字部分
+                terms = [t for (t,) in self._db.execute(
+                    "SELECT term FROM notes_vocab WHERE term < '{' AND instr(term, ?) > 0 LIMIT ?",
+                    (word, _MAX_WORD_TERMS + 1))]
+            if not terms:
+                return []  # 没有任何笔记包含这个英文串
+            if len(terms) <= _MAX_WORD_TERMS:
+                clauses.append("(" + " OR ".join('"%s"' % t for t in terms) + ")")
+        page = (-1 if limit is None else limit, offset)
+        verify = " AND ".join(["instr(n.text, ?) > 0"] * len(keywords))
+        if not clauses:  # 没有可用的词项(只有符号，或英文串太常见)，逐条比较原文
+            return self._query(f"SELECT id, time, text FROM notes n WHERE {verify} ORDER BY id LIMIT ? OFFSET ?",
+                               (*keywords, *page))
+        return self._query(
+            "SELECT n.id, n.time, n.text FROM notes_fts JOIN notes n ON n.id = notes_fts.rowid "
+            f"WHERE notes_fts MATCH ? AND {verify} ORDER BY n.id LIMIT ? OFFSET ?",
+            (" AND ".join(clauses), *keywords, *page))
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+STORES = ("journal", "json", "sqlite")
+
+
+def open_store(backend: str, note_file="notes.json") -> NoteStore:
+    """
+    按名称打开笔记存储
+    param backend: "journal"(追加写日志，默认)、"sqlite"(带全文索引) 或 "json"(原有格式)
+    param note_file: 原有的 notes.json 路径；其他存储的文件放在同一目录、同名不同后缀
+    """
+    note_file = Path(note_file)
+    if backend == "journal":
+        return JournalNoteStore(note_file.with_suffix(".jsonl"), legacy_path=note_file)
+    if backend == "sqlite":
+        return SqliteNoteStore(note_file.with_suffix(".db"), legacy_path=note_file)
+    if backend == "json":
+        return JsonNoteStore(note_file)
+    raise ValueError(f"未知的笔记存储：{backend}，可选：{', '.join(STORES)}")
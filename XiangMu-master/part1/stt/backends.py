@@ -0,0 +1,214 @@
+import os
+import threading
+import numpy as np
+from config import RATE, STT_BACKEND, STT_COMPUTE_TYPE, WHISPER_MODEL
+
+
+class SttBackend:
+    """
+    语音识别后端接口
+    - load() 加载模型；warmup() 做一次静音解码
+    - transcribe() 输入 float32 单声道 16kHz 音频，返回统一格式：
+      {"text": 全文, "segments": [(起始秒, 结束秒, 文本, no_speech_prob), ...]}
+    通用解码参数：prompt、temperature、beam_size、max_tokens(单个窗口最多输出的 token 数)、
+    condition_on_previous_text、no_speech_threshold；beam_size 为 None 时贪心解码，其余值为 None 的参数使用推理库默认值
+    """
+    name = ""
+
+    def __init__(self, model_name: str = WHISPER_MODEL, threads: int = 0):
+        """
+        param threads: 解码使用的 CPU 线程数，0 表示由推理库自行决定
+        """
+        self.model_name = model_name
+        self.threads = threads
+        self.model = None
+        self._lock = threading.Lock()  # 同一模型实例不支持并发解码
+
+    def load(self):
+        raise NotImplementedError
+
+    def warmup(self):
+        """首次解码需要初始化算子与缓存，用 1 秒静音提前完成"""
+        self.transcribe(np.zeros(RATE, dtype="float32"))
+
+    def transcribe(self, audio: np.ndarray, prompt: str = None, **options) -> dict:
+        raise NotImplementedError
+
+    def decode_prefix(self, audio: np.ndarray, prompt: str = None, max_tokens: int = 8) -> dict:
+        """
+        快速短解码：不输出时间戳，贪心解码最多 max_tokens 个 token 后停止，用于指令词检测
+        return: {"text": 文本, "avg_logprob": 平均对数概率, "no_speech_prob": 无语音概率}
+        """
+        raise NotImplementedError
+
+    # 支持直接输入 log-mel 特征的后端(流式识别复用增量特征缓存)
+    supports_mel = False
+
+    def mel_filters(self) -> np.ndarray:
+        """模型使用的 mel 滤波器组，形状 (n_mels, 201)"""
+        raise NotImplementedError
+
+    def transcribe_mel(self, log_mel: np.ndarray, prompt: str = None, **options) -> dict:
+        """
+        输入 stt.mel_cache 输出的 log10 mel 特征(单个窗口，不超过 30 秒)，返回格式同 transcribe()
+        """
+        raise NotImplementedError
+
+
+class WhisperBackend(SttBackend):
+    """openai-whisper 后端(fp32，CPU)"""
+    name = "whisper"
+
+    def load(self):
+        import whisper  # 导入 torch 本身就需要数秒，推迟到真正加载时
+        if self.threads:
+            import torch
+            torch.set_num_threads(self.threads)
+        self.model = whisper.load_model(self.model_name)
+        return self
+
+    def transcribe(self, audio, prompt=None, **options):
+        options = {k: v for k, v in options.items() if v is not None}
+        if "max_tokens" in options:
+            options["sample_len"] = options.pop("max_tokens")
+        with self._lock:
+            result = self.model.transcribe(
+                audio,
+                language="zh",
+                fp16=False,
+                initial_prompt=prompt,
+                **options
+            )
+        segments = [(seg["start"], seg["end"], seg["text"].strip(), seg.get("no_speech_prob", 0.0))
+                    for seg in result.get("segments", [])]
+        return {"text": result["text"].strip(), "segments": segments}
+
+    def decode_prefix(self, audio, prompt=None, max_tokens=8):
+        import whisper
+        mel = whisper.log_mel_spectrogram(whisper.pad_or_trim(audio), self.model.dims.n_mels)
+        options = whisper.DecodingOptions(language="zh", fp16=False, temperature=0.0, prompt=prompt,
+                                          sample_len=max_tokens, without_timestamps=True)
+        with self._lock:
+            result = whisper.decode(self.model, mel, options)
+        return {"text": result.text.strip(), "avg_logprob": result.avg_logprob,
+                "no_speech_prob": result.no_speech_prob}
+
+    supports_mel = True
+
+    def mel_filters(self):
+        from whisper.audio import mel_filters
+        return mel_filters("cpu", self.model.dims.n_mels).numpy()
+
+    def transcribe_mel(self, log_mel, prompt=None, **options):
+        import torch
+        import whisper
+        from whisper.tokenizer import get_tokenizer
+        from stt.mel_cache import normalize, HOP_LENGTH
+
+        options = {k: v for k, v in options.items() if v is not None}
+        no_speech_threshold = options.pop("no_speech_threshold", None)
+        options.pop("condition_on_previous_text", None)  # 单窗口解码，无前文可依赖
+        if "max_tokens" in options:
+            options["sample_len"] = options.pop("max_tokens")
+        duration = log_mel.shape[1] * HOP_LENGTH / RATE
+        mel = torch.from_numpy(normalize(log_mel))
+        decode_options = whisper.DecodingOptions(language="zh", fp16=False, prompt=prompt, **options)
+        with self._lock:
+            result = whisper.decode(self.model, mel, decode_options)
+        if no_speech_threshold is not None and result.no_speech_prob > no_speech_threshold \
+                and result.avg_logprob < -1.0:
+            return {"text": "", "segments": []}
+
+        # 按时间戳 token 切分：<|0.00|> 文本 <|2.40|><|2.40|> 文本 <|5.00|>
+        tokenizer = get_tokenizer(self.model.is_multilingual, num_languages=self.model.num_languages,
+                                  language="zh", task="transcribe")
+        segments, start, tokens = [], None, []
+        for token in result.tokens:
+            if token < tokenizer.timestamp_begin:
+                tokens.append(token)
+                continue
+            t = (token - tokenizer.timestamp_begin) * 0.02
+            if start is not None and tokens:
+                segments.append((start, min(t, duration), tokens))
+                start, tokens = None, []
+            else:
+                start = t
+        if tokens:
+            segments.append((start or 0.0, duration, tokens))
+        segments = [(s, e, tokenizer.decode(toks).strip(), result.no_speech_prob)
+                    for s, e, toks in segments]
+        return {"text": result.text.strip(), "segments": segments}
+
+
+class FasterWhisperBackend(SttBackend):
+    """faster-whisper 后端(CTranslate2，CPU 上默认 int8 量化)"""
+    name = "faster-whisper"
+
+    def __init__(self, model_name: str = WHISPER_MODEL, threads: int = 0,
+                 compute_type: str = STT_COMPUTE_TYPE):
+        super().__init__(model_name, threads)
+        self.compute_type = compute_type
+
+    def load(self):
+        # faster-whisper(CTranslate2) 为可选依赖，只在选用该后端时导入，未安装时仅可使用 openai-whisper 后端
+        try:
+            from faster_whisper import WhisperModel
+        except ImportError:
+            raise RuntimeError("使用 faster-whisper 后端需要安装：pip install faster-whisper") from None
+        self.model = WhisperModel(self.model_name, device="cpu",
+                                  compute_type=self.compute_type,
+                                  cpu_threads=self.threads or os.cpu_count() or 1)
+        return self
+
+    def transcribe(self, audio, prompt=None, **options):
+        options = {k: v for k, v in options.items() if v is not None}
+        options.setdefault("beam_size", 1)  # faster-whisper 默认 beam_size=5
+        if "max_tokens" in options:
+            options["max_new_tokens"] = options.pop("max_tokens")
+        with self._lock:
+            segments, _ = self.model.transcribe(
+                audio,
+                language="zh",
+                initial_prompt=prompt,
+                **options
+            )
+            # segments 是惰性生成器，需在锁内迭代完成解码
+            segments = [(seg.start, seg.end, seg.text.strip(), seg.no_speech_prob) for seg in segments]
+        return {"text": "".join(seg[2] for seg in segments), "segments": segments}
+
+    def decode_prefix(self, audio, prompt=None, max_tokens=8):
+        with self._lock:
+            segments, _ = self.model.transcribe(
+                audio,
+                language="zh",
+                initial_prompt=prompt,
+                beam_size=1,
+                temperature=0.0,
+                without_timestamps=True,
+                condition_on_previous_text=False,
+                max_new_tokens=max_tokens,
+            )
+            segments = list(segments)
+        if not segments:
+            return {"text": "", "avg_logprob": float("-inf"), "no_speech_prob": 1.0}
+        return {"text": "".join(seg.text.strip() for seg in segments),
+                "avg_logprob": min(seg.avg_logprob for seg in segments),
+                "no_speech_prob": segments[0].no_speech_prob}
+
+
+BACKENDS = {
+    WhisperBackend.name: WhisperBackend,
+    FasterWhisperBackend.name: FasterWhisperBackend,
+}
+
+
+def create_backend(name: str = STT_BACKEND, model_name: str = WHISPER_MODEL,
+                   threads: int = 0) -> SttBackend:
+    """
+    按名称创建识别后端(未加载模型)
+    param name: "whisper" 或 "faster-whisper"
+    param threads: 解码使用的 CPU 线程数，0 表示默认
+    """
+    if name not in BACKENDS:
+        raise ValueError(f"未知的语音识别后端：{name}，可选：{', '.join(BACKENDS)}")
+    return BACKENDS[name](model_name, threads)
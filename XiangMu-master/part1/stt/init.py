@@ -1,4 +1,12 @@
 # 语音转文本模块
-from .whisper_engine import transcribe_once, transcribe_window
+from .whisper_engine import transcribe_once, transcribe_window, preload, select_profile
+from .mel_cache import IncrementalMel
+from .model_cache import ModelCache
+from .streaming import StreamingTranscriber
+from .keyword_spotter import KeywordSpotter, KeywordMatch
+from .worker import SttWorker
+from .backends import SttBackend, WhisperBackend, FasterWhisperBackend, create_backend
 
-__all__ = ["transcribe_once", "transcribe_window"]
\ No newline at end of file
+__all__ = ["transcribe_once", "transcribe_window", "preload", "select_profile", "IncrementalMel", "ModelCache",
+           "StreamingTranscriber", "KeywordSpotter", "KeywordMatch", "SttWorker", "SttBackend", "WhisperBackend",
+           "FasterWhisperBackend", "create_backend"]
\ No newline at end of file
@@ -0,0 +1,57 @@
+import math
+import re
+import time
+from typing import NamedTuple, Optional
+import numpy as np
+from config import RATE, KWS_KEYWORDS, KWS_MAX_SEC, KWS_MIN_LOGPROB
+from stt import whisper_engine
+
+_STRIP = re.compile(r"[\s，。！？、,.!?]")
+_MAX_SUFFIX = 2  # 指令词后允许的附加字数，如“总结一下”“删除吧”
+
+
+class KeywordMatch(NamedTuple):
+    keyword: str
+    intent: str
+    confidence: float  # 快速解码的平均 token 概率
+    latency: float  # 检测耗时(秒)
+
+
+class KeywordSpotter:
+    """
+    短指令快速检测
+    - 只对不超过 KWS_MAX_SEC 的语音生效
+    - 用短指令档位的小模型、以指令词表作提示，解码开头几个 token 即停止
+    - 结果以某个指令词开头、且置信度足够时返回命中，调用方可跳过完整识别
+    """
+    def __init__(self, engine=whisper_engine, keywords: dict = None,
+                 max_sec: float = KWS_MAX_SEC, min_logprob: float = KWS_MIN_LOGPROB):
+        """
+        param engine: 提供 decode_prefix 的识别引擎(whisper_engine 或 SttWorker)
+        param keywords: 指令词 -> 意图
+        """
+        self.engine = engine
+        self.keywords = keywords if keywords is not None else KWS_KEYWORDS
+        self.max_sec = max_sec
+        self.min_logprob = min_logprob
+        self._prompt = "，".join(self.keywords) + "。"
+        # 中文每个字约 1~2 个 token，多留一个给标点
+        self._max_tokens = max(len(k) for k in self.keywords) * 2 + _MAX_SUFFIX + 1
+
+    def spot(self, audio_np: np.ndarray) -> Optional[KeywordMatch]:
+        """
+        param audio_np: 一段 int16 语音
+        return: 命中的 KeywordMatch；过长、未命中或置信度不足时返回 None
+        """
+        if not len(audio_np) or len(audio_np) > self.max_sec * RATE:
+            return None
+        t0 = time.perf_counter()
+        result = self.engine.decode_prefix(audio_np, prompt=self._prompt, max_tokens=self._max_tokens)
+        if result["no_speech_prob"] > 0.5 or result["avg_logprob"] < self.min_logprob:
+            return None
+        text = _STRIP.sub("", result["text"])
+        for keyword, intent in self.keywords.items():
+            if text.startswith(keyword) and len(text) - len(keyword) <= _MAX_SUFFIX:
+                return KeywordMatch(keyword, intent, math.exp(result["avg_logprob"]),
+                                    time.perf_counter() - t0)
+        return None
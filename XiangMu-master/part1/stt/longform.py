@@ -0,0 +1,117 @@
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from audio.vad_segmenter import VadSegmenter
+from stt.backends import create_backend
+from stt.model_cache import estimate_mb
+from config import (RATE, STT_BACKEND, STT_PROFILES, LONGFORM_CHUNK_SEC, LONGFORM_WORKERS, MODEL_CACHE_MB)
+
+_logger = logging.getLogger(__name__)
+_PUNCT = "，。！？、,.!?"
+
+_pool = None
+_pool_lock = threading.Lock()
+_worker_backend = None  # 子进程中的识别后端
+_worker_options = {}  # 子进程中的解码参数
+
+
+def worker_count() -> int:
+    """
+    并行识别的进程数
+    每个进程各加载一份听写档位的模型，进程数同时受 MODEL_CACHE_MB 限制，不超出识别模型的内存预算
+    """
+    per_worker = estimate_mb(STT_PROFILES["dictation"]["model"])
+    return max(1, min(LONGFORM_WORKERS or os.cpu_count() or 1, MODEL_CACHE_MB // per_worker))
+
+
+def split_at_silences(audio: np.ndarray, max_sec: float = LONGFORM_CHUNK_SEC) -> list:
+    """
+    在 VAD 静音处切分长录音
+    - 先按语音段切分(单段不超过 max_sec)
+    - 再把相邻语音段合并成尽量接近 max_sec 的块，减少块数
+    param audio: int16 音频
+    return: 各块的 (起点, 终点) 样本位置列表
+    """
+    limit = int(max_sec * RATE)
+    chunks = []
+    for utt in VadSegmenter(max_utterance_sec=max_sec).segment(audio):
+        if chunks and utt.end - chunks[-1][0] <= limit:
+            chunks[-1] = (chunks[-1][0], utt.end)
+        else:
+            chunks.append((utt.start, utt.end))
+    return chunks
+
+
+def _init_worker(backend_name, profile, threads):
+    """子进程初始化：每个进程加载一份听写档位的模型，平分 CPU 线程"""
+    global _worker_backend, _worker_options
+    _worker_options = {k: v for k, v in profile.items() if k != "model"}
+    _worker_backend = create_backend(backend_name, profile["model"], threads).load()
+
+
+def _transcribe_chunk(audio: np.ndarray) -> str:
+    return _worker_backend.transcribe(audio.astype("float32") / 32768.0, **_worker_options)["text"]
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    """惰性创建进程池，之后复用，避免每次重新加载模型"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            workers = worker_count()
+            threads = max(1, (os.cpu_count() or 1) // workers)
+            # 主进程中有音频回调和推理线程，使用 spawn 避免 fork 带来的死锁
+            _pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(STT_BACKEND, STT_PROFILES["dictation"], threads),
+            )
+        return _pool
+
+
+def shutdown():
+    """关闭进程池"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(cancel_futures=True)
+            _pool = None
+
+
+def transcribe_long(audio_np: np.ndarray) -> str:
+    """
+    长录音并行识别：在静音处切成不超过 LONGFORM_CHUNK_SEC 的块，
+    由进程池并发识别后按顺序拼接
+    用于整段转写已有的长音频(bench.py longform 等离线场景)
+    param audio_np: int16 音频
+    return: 识别文本(未做繁简转换)
+    """
+    chunks = split_at_silences(audio_np)
+    if not chunks:
+        return ""
+    _logger.info("长录音 %.0f 秒切分为 %d 块，%d 个进程并行识别",
+                 len(audio_np) / RATE, len(chunks), worker_count())
+    return join_texts(transcribe_chunks(audio_np, chunks))
+
+
+def transcribe_chunks(audio_np: np.ndarray, chunks: list) -> list:
+    """
+    由进程池并发识别 audio_np 中的各块(流式识别积压的语音段也经此并行识别)
+    param chunks: 各块的 (起点, 终点) 样本位置
+    return: 与 chunks 一一对应的识别文本(未做繁简转换)
+    """
+    return list(_get_pool().map(_transcribe_chunk, [audio_np[s:e] for s, e in chunks]))
+
+
+def join_texts(texts) -> str:
+    """按顺序拼接各块文本，块之间没有标点时补一个逗号"""
+    result = ""
+    for text in texts:
+        if text and result and result[-1] not in _PUNCT:
+            result += "，"
+        result += text
+    return result
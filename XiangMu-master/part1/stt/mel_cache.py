@@ -0,0 +1,105 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from config import RATE, RING_SEC
+
+# 与 Whisper 的特征提取参数保持一致
+N_FFT = 400
+HOP_LENGTH = 160
+N_FRAMES = 3000  # 30 秒窗口的帧数
+PAD_VALUE = -10.0  # 静音(全零)帧的 log10 mel 值：log10(1e-10)
+
+
+class IncrementalMel:
+    """
+    增量 log-mel 特征缓存
+    - 与 Whisper 相同的 STFT(400 点 Hann 窗、160 点帧移)与 mel 滤波器组
+    - 每次只为新到达的样本计算新增的帧，已计算的帧按环形窗口保留
+    - 缓存的是未归一化的 log10 mel，窗口级的动态范围压缩与归一化在解码前进行
+    """
+    def __init__(self, filters: np.ndarray, max_frames: int = RATE * RING_SEC // HOP_LENGTH):
+        """
+        param filters: mel 滤波器组，形状 (n_mels, N_FFT // 2 + 1)
+        param max_frames: 最多保留的帧数
+        """
+        self.filters = np.asarray(filters, dtype=np.float32)
+        self.n_mels = self.filters.shape[0]
+        self._window = np.hanning(N_FFT + 1)[:-1].astype(np.float32)  # 周期 Hann 窗(同 torch.hann_window)
+        self.max_frames = max_frames
+        self._buf = np.empty((self.n_mels, max_frames * 2), dtype=np.float32)  # 满时整体前移，摊销 O(1)
+        self.reset()
+
+    def reset(self):
+        """开始新的录音前清空"""
+        self._samples = None  # 尚未用完的样本(float32)
+        self._sample_base = 0  # _samples[0] 在录音中的样本位置
+        self._start = 0  # _buf 中第一个有效帧的位置
+        self._end = 0
+        self.total_frames = 0  # 已计算的帧数(帧 t 以样本 t*HOP_LENGTH 为中心)
+        self.frames_computed = 0
+
+    def feed(self, pcm: np.ndarray):
+        """输入新的 int16 样本，计算所有可计算的新帧"""
+        audio = pcm.astype(np.float32) / 32768.0
+        if self._samples is None:
+            if audio.size <= N_FFT // 2:
+                return
+            # 与 Whisper(center=True) 一致，开头做反射填充
+            pad = audio[1:N_FFT // 2 + 1][::-1]
+            self._samples = np.concatenate((pad, audio))
+            self._sample_base = -(N_FFT // 2)
+        else:
+            self._samples = np.concatenate((self._samples, audio))
+
+        first = self.total_frames * HOP_LENGTH - N_FFT // 2 - self._sample_base
+        usable = self._samples.size - first - N_FFT
+        if usable < 0:
+            return
+        n = usable // HOP_LENGTH + 1
+        frames = sliding_window_view(self._samples[first:], N_FFT)[::HOP_LENGTH][:n]
+        power = np.abs(np.fft.rfft(frames * self._window, axis=1)) ** 2
+        log_mel = np.log10(np.maximum(self.filters @ power.T, 1e-10))
+        self._append(log_mel)
+
+        consumed = first + n * HOP_LENGTH
+        self._samples = self._samples[consumed:]
+        self._sample_base += consumed
+
+    def _append(self, log_mel):
+        n = log_mel.shape[1]
+        if self._end + n > self._buf.shape[1]:
+            keep = min(self.max_frames, self._end - self._start)
+            self._buf[:, :keep] = self._buf[:, self._end - keep:self._end]
+            self._start, self._end = 0, keep
+        self._buf[:, self._end:self._end + n] = log_mel
+        self._end += n
+        self._start = max(self._start, self._end - self.max_frames)
+        self.total_frames += n
+        self.frames_computed += n
+
+    @property
+    def first_frame(self) -> int:
+        """缓存中最早的帧号"""
+        return self.total_frames - (self._end - self._start)
+
+    def since(self, frame: int):
+        """
+        获取从第 frame 帧到最新帧的特征
+        return: (n_mels, n) 的只读视图；frame 已被淘汰时返回 None
+        """
+        if frame < self.first_frame:
+            return None
+        view = self._buf[:, self._start + frame - self.first_frame:self._end]
+        view.flags.writeable = False
+        return view
+
+
+def normalize(log_mel: np.ndarray, n_frames: int = N_FRAMES) -> np.ndarray:
+    """
+    窗口级归一化并补齐到 n_frames 帧，与 Whisper 对 “窗口音频 + 静音填充” 提取的特征一致
+    param log_mel: IncrementalMel 输出的 log10 mel
+    """
+    log_mel = log_mel[:, -n_frames:]
+    floor = max(float(log_mel.max()), PAD_VALUE) - 8.0 if log_mel.size else PAD_VALUE
+    out = np.full((log_mel.shape[0], n_frames), (max(PAD_VALUE, floor) + 4.0) / 4.0, dtype=np.float32)
+    out[:, :log_mel.shape[1]] = (np.maximum(log_mel, floor) + 4.0) / 4.0
+    return out
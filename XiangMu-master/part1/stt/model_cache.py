@@ -0,0 +1,88 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from config import STT_BACKEND, STT_COMPUTE_TYPE, MODEL_CACHE_MB
+from stt.backends import create_backend
+
+_logger = logging.getLogger(__name__)
+
+# 各模型 fp32 常驻内存的估算值(MB)
+_MODEL_MB = {"tiny": 150, "base": 290, "small": 970, "medium": 3000, "large": 6200, "turbo": 3300}
+
+
+def estimate_mb(model_name: str, backend: str = STT_BACKEND) -> int:
+    """估算模型加载后的内存占用"""
+    size = _MODEL_MB.get(model_name.split(".")[0].split("-")[0], 1000)
+    if backend == "faster-whisper" and STT_COMPUTE_TYPE.startswith("int8"):
+        size = size // 3
+    return size
+
+
+class ModelCache:
+    """
+    进程内统一的识别模型缓存
+    - 按模型名加载并预热，同一模型只加载一次，不同模型可并行加载
+    - 总内存超过预算时，按最近最少使用(LRU)淘汰其他模型
+    """
+    def __init__(self, budget_mb: int = MODEL_CACHE_MB, backend: str = STT_BACKEND, threads: int = 0):
+        self.budget_mb = budget_mb
+        self.backend = backend
+        self.threads = threads
+        self._entries = OrderedDict()  # 模型名 -> Future(SttBackend)，按使用顺序排列
+        self._lock = threading.Lock()
+        self.load_times = {}  # 模型名 -> 加载+预热耗时(秒)
+
+    def get(self, model_name: str):
+        """获取已加载的后端，未加载时在当前线程加载(其他线程会等待同一次加载)"""
+        with self._lock:
+            future = self._entries.get(model_name)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._entries[model_name] = future
+            self._entries.move_to_end(model_name)
+        if owner:
+            self._load(model_name, future)
+        return future.result()
+
+    def loaded(self) -> list:
+        """已加载完成的模型名(按使用顺序)"""
+        with self._lock:
+            return [name for name, f in self._entries.items() if f.done() and not f.exception()]
+
+    def used_mb(self) -> int:
+        """已加载模型的估算内存占用(MB)"""
+        with self._lock:
+            return self._used_mb()
+
+    def _used_mb(self) -> int:
+        return sum(estimate_mb(name, self.backend) for name, f in self._entries.items()
+                   if f.done() and not f.exception())
+
+    def _load(self, model_name, future):
+        try:
+            t0 = time.perf_counter()
+            backend = create_backend(self.backend, model_name, self.threads).load()
+            backend.warmup()
+            self.load_times[model_name] = time.perf_counter() - t0
+            _logger.info("识别模型 %s 已就绪，耗时 %.2fs", model_name, self.load_times[model_name])
+            future.set_result(backend)
+        except BaseException as e:
+            with self._lock:
+                self._entries.pop(model_name, None)
+            future.set_exception(e)
+            return
+        self._evict(keep=model_name)
+
+    def _evict(self, keep):
+        """超出内存预算时淘汰最久未使用的模型(正在使用的对象由调用方持有，不受影响)"""
+        with self._lock:
+            for name in list(self._entries):
+                if self._used_mb() <= self.budget_mb:
+                    break
+                future = self._entries[name]
+                if name != keep and future.done():
+                    del self._entries[name]
+                    _logger.info("内存预算 %dMB 不足，淘汰识别模型 %s", self.budget_mb, name)
@@ -0,0 +1,281 @@
+import logging
+import queue
+import threading
+import time
+import numpy as np
+from audio.stream_buffer import StreamBuffer
+from config import RATE, REALTIME_PROCESS_INTERVAL, LONGFORM_BACKLOG_SEC
+from stt import whisper_engine
+from stt.mel_cache import IncrementalMel, HOP_LENGTH
+
+_logger = logging.getLogger(__name__)
+
+_PUNCT = "，。！？、,.!?"
+_STABLE_MARGIN = 1.0  # 窗口末尾这段时间内结束的分段仍可能变化，暂不确认(秒)
+
+
+def _append(text: str, piece: str, sentence_end: bool = False) -> str:
+    """拼接已确认文本；语音段结束时补一个逗号分隔"""
+    text += piece
+    if sentence_end and text and text[-1] not in _PUNCT:
+        text += "，"
+    return text
+
+
+class StreamingTranscriber(threading.Thread):
+    """
+    流式实时识别线程
+    - 每隔 REALTIME_PROCESS_INTERVAL 从录音器的实时帧队列取数据写入环形缓冲区，
+      对“尚未确认”的音频窗口重新解码，显示实时结果
+    - local-agreement：连续两次解码结果中相同的前缀分段视为稳定，予以确认，
+      窗口起点随之后移，后续只解码未确认部分
+    - VAD 语音段结束时，把该段剩余的未确认音频一次性解码并确认
+    - 排队的语音段(如长听写松开按键后积压的多段)总时长超过 LONGFORM_BACKLOG_SEC 时，
+      一次交给引擎的 transcribe_batch 由进程池并行识别，而不是逐段串行解码
+    - 引擎支持直接输入 mel 特征时，log-mel 随新音频增量计算并缓存，
+      每次窗口解码只需为新到达的约 interval 秒音频提取特征，而不是整个窗口
+    - 所有位置都是录音器一侧的样本位置(与 VAD 语音段一致)，实时队列丢帧时缓冲区从新位置重新开始
+    - 窗口解码出错时本段不再做窗口解码，由语音段结束时的整段解码补上；整段解码出错时重试一次，
+      仍失败则记入 error
+    录音结束后 result() 只需等待最后一段尾部的解码，按键松开后的等待时间大幅缩短；
+    hold() 可在停止录音前暂停处理，先做指令词检测，未命中再 release() 交给本线程解码
+    """
+    daemon = True
+
+    def __init__(self, recorder, buffer: StreamBuffer = None, on_partial=None,
+                 engine=whisper_engine, interval: float = REALTIME_PROCESS_INTERVAL,
+                 profile: str = None):
+        """
+        param recorder: AudioRecorder，需已调用 start_recording
+        param buffer: 滑动窗口使用的环形缓冲区(容量即最大窗口 RING_SEC)
+        param on_partial: 实时结果回调 on_partial(text)
+        param engine: 提供 transcribe_once / transcribe_window(可选 mel_filters / transcribe_mel)的识别引擎
+        param profile: 识别档位，None 时每个语音段按整段时长选择，实时窗口使用听写档位
+        """
+        super().__init__()
+        self.recorder = recorder
+        self.buffer = buffer if buffer is not None else StreamBuffer()
+        self.buffer.clear()
+        self.on_partial = on_partial
+        self.engine = engine
+        self.interval = interval
+        self.profile = profile
+        self.committed = ""  # 已确认的文本
+        self._commit_pos = 0  # 已确认音频的终点(本次录音中的样本位置)
+        self._end_pos = 0  # 环形缓冲区末尾的样本位置
+        self._mel_origin = 0  # 特征缓存第 0 帧对应的样本位置
+        self._window_failed = False  # 当前语音段的窗口解码出错，等待整段解码
+        self._ended = False  # 已取到录音结束标记
+        self._hypothesis = []  # 上一次解码的未确认分段 [(起始样本, 结束样本, 文本)]
+        self._partial = ""
+        self._mel = None  # 增量 log-mel 特征缓存，引擎不支持时为 None
+        self._cancelled = threading.Event()
+        self._resume = threading.Event()  # 清除时暂停处理语音段与窗口
+        self._resume.set()
+        self.decode_count = 0
+        self.decode_time = 0.0
+        self.error = None  # 最近一次未能恢复的解码错误
+
+    # ----------------- 对外接口 -----------------
+    def result(self) -> str:
+        """等待录音结束后的尾部解码完成，返回完整文本"""
+        self.join()
+        _logger.info("流式识别：解码 %d 次，共 %.2f 秒", self.decode_count, self.decode_time)
+        if self._mel is not None:
+            _logger.info("增量特征：共计算 %d 帧", self._mel.frames_computed)
+        return self.committed.rstrip("，")
+
+    def hold(self):
+        """
+        暂停：之后到达的语音段(包括停止录音时的最后一段)先不解码，正在进行的一次解码照常完成
+        用于按键松开后先做指令词检测，避免完整识别与指令词检测争用模型
+        """
+        self._resume.clear()
+
+    def release(self):
+        """恢复 hold() 暂停的处理"""
+        self._resume.set()
+
+    def cancel(self):
+        """
+        放弃剩余的识别(例如已由指令词检测得到结果)，正在进行的一次解码完成后线程退出，
+        之后不再读取实时帧队列(调用方在开始下一次录音前应 join 本线程，保证队列只有一个消费者)
+        """
+        self._cancelled.set()
+        self._resume.set()
+
+    # ----------------- 线程主循环 -----------------
+    def run(self):
+        self._init_mel()
+        next_tick = time.perf_counter()
+        while True:
+            utt = self._next_utterance(next_tick)
+            self._resume.wait()  # hold() 期间取到的语音段等 release() 或 cancel() 后再处理
+            if self._cancelled.is_set():
+                break
+            self._pull_frames()
+            if utt is None:
+                break
+            if utt is not False:
+                self._commit_batch(self._take_backlog(utt))
+                if self._ended:
+                    break
+            elif self.recorder.segmenter.in_speech and not self._window_failed:
+                try:
+                    self._decode_window()
+                except Exception as e:
+                    _logger.warning("窗口解码失败，本段改为在语音段结束时整段解码: %s", e)
+                    self._window_failed = True
+            next_tick = time.perf_counter() + self.interval
+
+    def _init_mel(self):
+        """在识别线程中获取 mel 滤波器(可能需要等待模型加载)，失败时退回音频窗口解码"""
+        if not hasattr(self.engine, "transcribe_mel"):
+            return
+        try:
+            filters = self.engine.mel_filters(self.profile)
+        except Exception as e:
+            _logger.warning("无法获取 mel 滤波器，流式识别不使用特征缓存: %s", e)
+            return
+        if filters is not None:
+            self._mel = IncrementalMel(filters, max_frames=self.buffer.capacity // HOP_LENGTH)
+
+    def _next_utterance(self, deadline):
+        """等待到下一次解码时刻；期间有语音段结束则提前返回该段，录音结束返回 None"""
+        try:
+            return self.recorder.utterances.get(timeout=max(0.0, deadline - time.perf_counter()))
+        except queue.Empty:
+            return False
+
+    def _pull_frames(self):
+        """把实时帧队列中的新数据写入环形缓冲区"""
+        start = self.recorder.realtime_position
+        pcm = self.recorder.get_realtime_chunk()
+        if pcm is None:
+            return
+        if start != self._end_pos:
+            # 实时队列丢帧(如等待模型加载期间)：丢失的音频由语音段结束时的整段解码补上
+            _logger.warning("实时队列丢失 %.1f 秒音频，滑动窗口从新位置重新开始", (start - self._end_pos) / RATE)
+            self.buffer.clear()
+            self._hypothesis = []
+            if self._mel is not None:
+                self._mel.reset()
+                self._mel_origin = start
+        self.buffer.extend(pcm)
+        if self._mel is not None:
+            self._mel.feed(pcm)
+        self._end_pos = start + len(pcm)
+
+    def _decode(self, fn, *args, **kwargs):
+        t0 = time.perf_counter()
+        out = fn(*args, **kwargs)
+        self.decode_count += 1
+        self.decode_time += time.perf_counter() - t0
+        return out
+
+    def _take_backlog(self, utt) -> list:
+        """连同 utt 取出队列中已在排队的语音段；取到录音结束标记时记入 _ended"""
+        batch = [utt]
+        while True:
+            try:
+                nxt = self.recorder.utterances.get_nowait()
+            except queue.Empty:
+                return batch
+            if nxt is None:
+                self._ended = True
+                return batch
+            batch.append(nxt)
+
+    # ----------------- 确认逻辑 -----------------
+    def _commit_batch(self, batch: list):
+        """确认一批语音段：积压较多且引擎支持时并行识别，否则(或并行识别出错时)逐段解码"""
+        pending = [(utt, utt.audio[max(0, self._commit_pos - utt.start):]) for utt in batch]
+        pending = [(utt, piece) for utt, piece in pending if len(piece)]
+        profiles = {whisper_engine.select_profile(len(utt.audio) / RATE, self.profile) for utt, _ in pending}
+        if (len(pending) > 1 and sum(len(piece) for _, piece in pending) >= LONGFORM_BACKLOG_SEC * RATE
+                and profiles == {"dictation"} and hasattr(self.engine, "transcribe_batch")):
+            ends = np.cumsum([len(piece) for _, piece in pending]).tolist()
+            bounds = list(zip([0] + ends[:-1], ends))
+            try:
+                texts = self._decode(self.engine.transcribe_batch,
+                                     np.concatenate([piece for _, piece in pending]), bounds,
+                                     profile="dictation")
+            except Exception as e:
+                _logger.warning("积压语音段并行识别失败，改为逐段识别: %s", e)
+            else:
+                _logger.info("积压 %d 个语音段(%.0f 秒)并行识别", len(pending), ends[-1] / RATE)
+                for text in texts:
+                    self.committed = _append(self.committed, text, sentence_end=True)
+                self._commit_pos = max(self._commit_pos, batch[-1].end)
+                self._window_failed = False
+                self._hypothesis = []
+                self._show(self.committed)
+                return
+        for utt in batch:
+            self._commit_utterance(utt)
+
+    def _commit_utterance(self, utt):
+        """语音段结束：解码该段中尚未确认的部分并全部确认"""
+        skip = max(0, self._commit_pos - utt.start)
+        if skip < len(utt.audio):
+            # 档位按整段语音的时长选择，而不是按剩余未确认部分的时长
+            profile = whisper_engine.select_profile(len(utt.audio) / RATE, self.profile)
+            text = ""
+            for attempt in range(2):  # 识别进程崩溃时 SttWorker 已重启，再试一次
+                try:
+                    text = self._decode(self.engine.transcribe_once, utt.audio[skip:],
+                                        prompt=self.committed or None, profile=profile)
+                    break
+                except Exception as e:
+                    _logger.warning("语音段解码失败(第 %d 次): %s", attempt + 1, e)
+                    if attempt:
+                        self.error = e
+            self.committed = _append(self.committed, text, sentence_end=True)
+        self._commit_pos = max(self._commit_pos, utt.end)
+        self._window_failed = False
+        self._hypothesis = []
+        self._show(self.committed)
+
+    def _decode_window(self):
+        """对未确认的窗口重新解码，确认与上一次结果一致的前缀分段"""
+        window_start = max(self._commit_pos, self._end_pos - len(self.buffer))
+        window_len = self._end_pos - window_start
+        if window_len < RATE * self.interval:
+            return
+        log_mel = None
+        if self._mel is not None:
+            frame = -(-(window_start - self._mel_origin) // HOP_LENGTH)  # 向上取整到帧边界
+            log_mel = self._mel.since(frame)
+        if log_mel is not None:
+            window_start = self._mel_origin + frame * HOP_LENGTH
+            segments = self._decode(self.engine.transcribe_mel, log_mel,
+                                    prompt=self.committed or None, with_segments=True,
+                                    profile=self.profile)
+        else:
+            segments = self._decode(self.engine.transcribe_window, self.buffer.latest(window_len),
+                                    prompt=self.committed or None, with_segments=True,
+                                    profile=self.profile)
+        current = [(window_start + int(s * RATE), window_start + int(e * RATE), text)
+                   for s, e, text in segments]
+
+        stable_end = self._end_pos - int(_STABLE_MARGIN * RATE)
+        agreed = 0
+        for prev, cur in zip(self._hypothesis, current):
+            if prev[2] != cur[2] or cur[1] > stable_end:
+                break
+            agreed += 1
+        # 未确认音频即将超出环形缓冲区时，强制确认第一个分段
+        if not agreed and current and window_len >= self.buffer.capacity - RATE * self.interval * 2:
+            agreed = 1
+
+        for _, end, text in current[:agreed]:
+            self.committed = _append(self.committed, text)
+            self._commit_pos = end
+        self._hypothesis = current[agreed:]
+        self._show(self.committed + "".join(text for _, _, text in self._hypothesis))
+
+    def _show(self, text):
+        if text != self._partial:
+            self._partial = text
+            if self.on_partial is not None:
+                self.on_partial(text)
@@ -0,0 +1,93 @@
+import numpy as np
+from audio.recorder import AudioRecorder
+from audio.sources import SyntheticSource
+from config import RATE
+from stt.keyword_spotter import KeywordSpotter
+from stt.streaming import StreamingTranscriber
+
+KEYWORDS = {"删除": "delete", "列出": "list", "退出": "exit"}
+
+
+class PrefixEngine:
+    """decode_prefix 返回固定结果的识别引擎，记录完整识别是否被调用"""
+    def __init__(self, text, avg_logprob=-0.1, no_speech_prob=0.0):
+        self.result = {"text": text, "avg_logprob": avg_logprob, "no_speech_prob": no_speech_prob}
+        self.prefix_calls = []
+        self.once_calls = []
+
+    def decode_prefix(self, audio, prompt=None, max_tokens=None):
+        self.prefix_calls.append((len(audio), prompt, max_tokens))
+        return self.result
+
+    def transcribe_once(self, audio, prompt=None, profile=None):
+        self.once_calls.append(len(audio))
+        return "完整识别结果"
+
+    def transcribe_window(self, audio, prompt=None, with_segments=False, profile=None):
+        return []
+
+
+def _speech(seconds=0.8):
+    return np.ones(int(seconds * RATE), np.int16)
+
+
+def test_hit():
+    engine = PrefixEngine(" 删除吧。")
+    match = KeywordSpotter(engine, KEYWORDS).spot(_speech())
+    assert (match.keyword, match.intent) == ("删除", "delete")
+    assert 0 < match.confidence <= 1
+    (_, prompt, max_tokens), = engine.prefix_calls
+    assert prompt == "删除，列出，退出。"
+    assert max_tokens == 7
+
+
+def test_miss():
+    spotter = KeywordSpotter(PrefixEngine("删除明天的会议安排"), KEYWORDS)
+    assert spotter.spot(_speech()) is None  # 指令词后内容过长，是普通语句
+    assert KeywordSpotter(PrefixEngine("你好"), KEYWORDS).spot(_speech()) is None
+    assert KeywordSpotter(PrefixEngine("删除", avg_logprob=-2.0), KEYWORDS).spot(_speech()) is None
+    assert KeywordSpotter(PrefixEngine("删除", no_speech_prob=0.9), KEYWORDS).spot(_speech()) is None
+
+
+def test_long_audio_is_not_decoded():
+    engine = PrefixEngine("删除")
+    spotter = KeywordSpotter(engine, KEYWORDS, max_sec=1.5)
+    assert spotter.spot(_speech(2.0)) is None
+    assert spotter.spot(_speech(0)) is None
+    assert engine.prefix_calls == []
+
+
+def _held_recording(engine):
+    """与 main.stop() 相同：先暂停流式识别再结束录音，最后一段语音留待指令词检测"""
+    source = SyntheticSource(pattern=((0.3, False), (0.8, True), (0.9, False)))
+    recorder = AudioRecorder(source)
+    recorder.start()
+    recorder.start_recording()
+    streamer = StreamingTranscriber(recorder, engine=engine, interval=0.05)
+    streamer.hold()
+    streamer.start()
+    assert source.finished.wait(10)
+    recorder.stop_recording()
+    start, end = recorder.segmenter.speech_span
+    return recorder.full_audio.view()[start:end], streamer
+
+
+def test_hit_skips_commit():
+    engine = PrefixEngine("退出")
+    audio, streamer = _held_recording(engine)
+    match = KeywordSpotter(engine, KEYWORDS).spot(audio)
+    assert match.intent == "exit"
+    streamer.cancel()
+    streamer.join(5)
+    assert not streamer.is_alive()
+    assert engine.once_calls == []  # 命中时不做完整识别
+
+
+def test_miss_falls_through_to_commit():
+    engine = PrefixEngine("今天天气不错")
+    audio, streamer = _held_recording(engine)
+    assert KeywordSpotter(engine, KEYWORDS).spot(audio) is None
+    assert engine.once_calls == []  # 判定在完整识别之前完成
+    streamer.release()
+    assert streamer.result() == "完整识别结果"
+    assert len(engine.once_calls) == 1
@@ -0,0 +1,25 @@
+from audio.sources import SyntheticSource
+from config import RATE
+from stt import longform
+
+
+def test_split_at_silences_merges_up_to_max():
+    pattern = [(0.5, False)] + [(4.0, True), (1.0, False)] * 5
+    audio = SyntheticSource(pattern=pattern).read_all()
+    chunks = longform.split_at_silences(audio, max_sec=10)
+    assert len(chunks) == 3
+    assert all(e - s <= 10 * RATE for s, e in chunks)
+    assert all(a[1] <= b[0] for a, b in zip(chunks, chunks[1:]))
+
+
+def test_join_texts():
+    assert longform.join_texts(["你好", "", "世界。", "再见"]) == "你好，世界。再见"
+
+
+def test_worker_count_respects_model_budget(monkeypatch):
+    monkeypatch.setattr(longform, "LONGFORM_WORKERS", 16)
+    monkeypatch.setattr(longform, "MODEL_CACHE_MB", 2048)
+    monkeypatch.setattr(longform, "estimate_mb", lambda model: 970)
+    assert longform.worker_count() == 2
+    monkeypatch.setattr(longform, "MODEL_CACHE_MB", 100)
+    assert longform.worker_count() == 1
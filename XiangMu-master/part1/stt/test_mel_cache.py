@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+from audio.sources import SyntheticSource
+from config import CHUNK
+from stt.mel_cache import IncrementalMel, normalize, HOP_LENGTH, N_FFT, N_FRAMES
+
+whisper_audio = pytest.importorskip("whisper.audio")
+
+
+def _audio(seconds=5.0):
+    return SyntheticSource(pattern=((0.5, False), (seconds - 1.0, True), (0.5, False))).read_all()
+
+
+def _incremental(audio, chunk=CHUNK, max_frames=N_FRAMES):
+    mel = IncrementalMel(whisper_audio.mel_filters("cpu", 80).numpy(), max_frames=max_frames)
+    for i in range(0, len(audio), chunk):
+        mel.feed(audio[i:i + chunk])
+    return mel
+
+
+def _reference(audio):
+    """Whisper 对 “窗口音频 + 静音填充” 提取的特征(与 transcribe() 相同)"""
+    samples = audio.astype(np.float32) / 32768.0
+    return whisper_audio.log_mel_spectrogram(samples, 80, padding=whisper_audio.N_SAMPLES)[:, :N_FRAMES].numpy()
+
+
+def test_matches_whisper_full_window():
+    audio = _audio()
+    mel = _incremental(audio)
+    ours = normalize(mel.since(0))
+    ref = _reference(audio)
+    # 音频末尾 N_FFT/2 个样本内的帧需要之后的音频才能计算，增量缓存中尚不存在
+    tail = len(audio) // HOP_LENGTH - N_FFT // 2 // HOP_LENGTH - 1
+    assert mel.total_frames >= tail
+    np.testing.assert_allclose(ours[:, :tail], ref[:, :tail], atol=1e-3)
+    np.testing.assert_allclose(ours[:, len(audio) // HOP_LENGTH + 2:], ref[:, len(audio) // HOP_LENGTH + 2:],
+                               atol=1e-3)
+
+
+def test_window_from_later_frame_matches_whisper():
+    audio = _audio(8.0)
+    mel = _incremental(audio)
+    frame = 3 * 100  # 窗口从第 3 秒开始
+    window = audio[frame * HOP_LENGTH:]
+    ours = normalize(mel.since(frame))
+    ref = _reference(window)
+    # 窗口开头 Whisper 用反射填充，增量缓存用的是真实的前文，只比较之后的帧
+    tail = len(window) // HOP_LENGTH - 2
+    np.testing.assert_allclose(ours[:, 2:tail], ref[:, 2:tail], atol=1e-3)
+
+
+def test_chunk_size_does_not_matter():
+    audio = _audio()
+    a = _incremental(audio, chunk=CHUNK)
+    b = _incremental(audio, chunk=7919)
+    assert a.total_frames == b.total_frames
+    np.testing.assert_allclose(a.since(0), b.since(0), atol=1e-4)
+
+
+def test_old_frames_are_evicted():
+    audio = _audio()
+    mel = _incremental(audio, max_frames=200)
+    assert mel.first_frame == mel.total_frames - 200
+    assert mel.since(mel.first_frame - 1) is None
+    assert mel.since(mel.first_frame).shape == (80, 200)
+    assert mel.frames_computed == mel.total_frames
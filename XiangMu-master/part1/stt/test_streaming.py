@@ -0,0 +1,174 @@
+import queue
+import numpy as np
+from audio.frame_queue import FrameQueue
+from audio.recorder import AudioRecorder
+from audio.sources import SyntheticSource
+from config import RATE
+from stt.streaming import StreamingTranscriber
+
+
+class FakeEngine:
+    """按调用记录参数的识别引擎；fail_once / fail_window 模拟识别进程出错"""
+    def __init__(self, text="你好", fail_once=0, fail_window=False, segments=None):
+        self.text = text
+        self.fail_once = fail_once
+        self.fail_window = fail_window
+        self.segments = segments or []
+        self.once_calls = []
+        self.window_calls = []
+
+    def transcribe_once(self, audio, prompt=None, profile=None):
+        self.once_calls.append((len(audio), profile))
+        if self.fail_once:
+            self.fail_once -= 1
+            raise RuntimeError("识别进程异常退出")
+        return self.text
+
+    def transcribe_window(self, audio, prompt=None, with_segments=False, profile=None):
+        self.window_calls.append(len(audio))
+        if self.fail_window:
+            raise RuntimeError("窗口解码失败")
+        return self.segments
+
+
+def _run(engine, pattern=((0.3, False), (1.5, True), (0.9, False)), hold=False):
+    source = SyntheticSource(pattern=pattern)
+    recorder = AudioRecorder(source)
+    recorder.start()
+    recorder.start_recording()
+    streamer = StreamingTranscriber(recorder, engine=engine, interval=0.05)
+    if hold:
+        streamer.hold()
+    streamer.start()
+    assert source.finished.wait(10)
+    recorder.stop_recording()
+    return recorder, streamer
+
+
+def test_commit_uses_profile_of_whole_utterance():
+    engine = FakeEngine()
+    _, streamer = _run(engine)
+    assert streamer.result() == "你好"
+    assert [profile for _, profile in engine.once_calls] == ["command"]
+
+
+def test_decode_error_is_retried():
+    engine = FakeEngine(fail_once=1, fail_window=True)
+    _, streamer = _run(engine)
+    assert streamer.result() == "你好"
+    assert len(engine.once_calls) == 2
+    assert streamer.error is None
+
+
+def test_decode_error_is_reported():
+    engine = FakeEngine(fail_once=2)
+    _, streamer = _run(engine)
+    assert streamer.result() == ""
+    assert isinstance(streamer.error, RuntimeError)
+
+
+def test_cancel_stops_reading_frames():
+    engine = FakeEngine()
+    recorder, streamer = _run(engine, hold=True)
+    queued = len(recorder.realtime_frames)
+    assert queued > 0
+    streamer.cancel()
+    streamer.join(5)
+    assert not streamer.is_alive()
+    assert engine.once_calls == []
+    assert len(recorder.realtime_frames) == queued  # 取消后不再读取实时帧队列
+    assert recorder.realtime_position == 0
+
+
+def test_release_after_hold_decodes_last_utterance():
+    engine = FakeEngine()
+    recorder, streamer = _run(engine, hold=True)
+    assert engine.once_calls == []
+    streamer.release()
+    assert streamer.result() == "你好"
+    assert recorder.realtime_position == len(recorder.full_audio)
+
+
+class _Segmenter:
+    in_speech = True
+
+
+class _Recorder:
+    """只提供实时帧队列的录音器替身"""
+    def __init__(self, frames):
+        self.realtime_frames = frames
+        self.utterances = queue.Queue()
+        self.segmenter = _Segmenter()
+
+    @property
+    def realtime_position(self):
+        return self.realtime_frames.position
+
+    def get_realtime_chunk(self):
+        return self.realtime_frames.drain()
+
+
+def test_window_positions_follow_recorder_after_dropped_frames():
+    frame = RATE // 10
+    frames = FrameQueue(capacity=20, frame_size=frame)
+    engine = FakeEngine(segments=[(0.0, 0.5, "甲")])
+    streamer = StreamingTranscriber(_Recorder(frames), engine=engine, interval=0.5)
+    for i in range(30):  # 队列容量 2 秒，丢弃 1 秒
+        frames.push(np.full(frame, i, np.int16))
+    streamer._pull_frames()
+    assert streamer._end_pos == 2 * RATE  # 丢帧位于取出的帧之后，下一次读取时才体现为位置跳跃
+    for i in range(30, 40):
+        frames.push(np.full(frame, i, np.int16))
+    streamer._pull_frames()
+    assert streamer._end_pos == 4 * RATE
+    assert len(streamer.buffer) == RATE  # 缓冲区从新位置重新开始
+    streamer._decode_window()
+    assert engine.window_calls == [RATE]
+    assert streamer._hypothesis == [(3 * RATE, 3 * RATE + RATE // 2, "甲")]
+
+
+class BatchEngine(FakeEngine):
+    def __init__(self, fail_batch=False):
+        super().__init__()
+        self.fail_batch = fail_batch
+        self.batch_calls = []
+
+    def transcribe_batch(self, audio, bounds, profile=None):
+        self.batch_calls.append((len(audio), bounds, profile))
+        if self.fail_batch:
+            raise RuntimeError("进程池异常")
+        return [f"第{i}段" for i in range(len(bounds))]
+
+
+_LONG_DICTATION = ((0.3, False), (8.0, True), (1.0, False), (8.0, True), (1.0, False), (8.0, True))
+
+
+def test_backlog_is_decoded_in_parallel(monkeypatch):
+    monkeypatch.setattr("stt.streaming.LONGFORM_BACKLOG_SEC", 20)
+    engine = BatchEngine()
+    # hold 期间语音段全部积压在队列中，相当于按键松开后剩余的长听写
+    recorder, streamer = _run(engine, pattern=_LONG_DICTATION, hold=True)
+    streamer.release()
+    assert streamer.result() == "第0段，第1段，第2段"
+    assert engine.once_calls == []
+    (length, bounds, profile), = engine.batch_calls
+    assert profile == "dictation"
+    assert len(bounds) == 3 and bounds[0][0] == 0 and bounds[-1][1] == length
+    assert all(a[1] == b[0] for a, b in zip(bounds, bounds[1:]))
+
+
+def test_backlog_falls_back_to_serial_decoding(monkeypatch):
+    monkeypatch.setattr("stt.streaming.LONGFORM_BACKLOG_SEC", 20)
+    engine = BatchEngine(fail_batch=True)
+    _, streamer = _run(engine, pattern=_LONG_DICTATION, hold=True)
+    streamer.release()
+    assert streamer.result() == "你好，你好，你好"
+    assert len(engine.batch_calls) == 1 and len(engine.once_calls) == 3
+
+
+def test_short_backlog_is_decoded_serially():
+    engine = BatchEngine()
+    _, streamer = _run(engine, pattern=((0.3, False), (1.5, True), (1.0, False), (1.5, True)), hold=True)
+    streamer.release()
+    assert streamer.result() == "你好，你好"
+    assert engine.batch_calls == []
@@ -0,0 +1,62 @@
+import numpy as np
+from config import RATE, STT_PROFILES
+from stt import whisper_engine
+
+
+class FakeBackend:
+    supports_mel = False
+
+    def __init__(self):
+        self.calls = []
+
+    def transcribe(self, audio, prompt=None, **options):
+        self.calls.append(options)
+        return {"text": "你好", "segments": [(0.0, 1.0, "你好", 0.0)]}
+
+
+def _fake_backend(monkeypatch):
+    backend = FakeBackend()
+    profiles = []
+
+    def get_backend(profile):
+        profiles.append(profile)
+        return backend
+
+    monkeypatch.setattr(whisper_engine, "_get_backend", get_backend)
+    return backend, profiles
+
+
+def test_window_options_are_greedy_and_uncapped():
+    for profile in STT_PROFILES:
+        options = whisper_engine._decode_options(profile, window=True)
+        assert "beam_size" not in options and "best_of" not in options
+        assert "max_tokens" not in options and "model" not in options
+        assert options["temperature"] == 0.0
+
+
+def test_commit_options_keep_profile_settings():
+    options = whisper_engine._decode_options("dictation")
+    expected = {k: v for k, v in STT_PROFILES["dictation"].items() if k != "model"}
+    assert options == expected
+
+
+def test_transcribe_window_uses_greedy_dictation(monkeypatch):
+    backend, profiles = _fake_backend(monkeypatch)
+    audio = np.zeros(RATE, dtype=np.int16)  # 1 秒的窗口不按时长选短指令档位
+    assert whisper_engine.transcribe_window(audio, with_segments=True) == [(0.0, 1.0, "你好")]
+    assert profiles == ["dictation"]
+    assert "beam_size" not in backend.calls[0] and backend.calls[0]["temperature"] == 0.0
+
+
+def test_transcribe_once_selects_profile_by_duration(monkeypatch):
+    backend, profiles = _fake_backend(monkeypatch)
+    whisper_engine.transcribe_once(np.zeros(RATE, dtype=np.int16))
+    whisper_engine.transcribe_once(np.zeros(10 * RATE, dtype=np.int16))
+    assert profiles == ["command", "dictation"]
+    assert backend.calls[1]["beam_size"] == STT_PROFILES["dictation"]["beam_size"]
+
+
+def test_select_profile():
+    assert whisper_engine.select_profile(1.0) == "command"
+    assert whisper_engine.select_profile(10.0) == "dictation"
+    assert whisper_engine.select_profile(1.0, "dictation") == "dictation"
@@ -1,42 +1,197 @@
-import whisper
+import logging
 import threading
+import time
+from concurrent.futures import Future
 import opencc
 import numpy as np
-from config import WHISPER_MODEL  
+from config import RATE, LONGFORM_MIN_SEC, STT_PROFILES, COMMAND_MAX_SEC
+from stt import longform
+from stt.model_cache import ModelCache
 
-_lock = threading.Lock()
-_model = whisper.load_model(WHISPER_MODEL)
+_logger = logging.getLogger(__name__)
 _converter = opencc.OpenCC("t2s")
+_cache = ModelCache()
+_model_future = None
+_future_lock = threading.Lock()
+stats = {}  # 加载/预热/首次识别耗时(秒)
 
-def transcribe_once(audio_np: np.ndarray) -> str:
+
+def preload() -> Future:
+    """
+    在后台线程加载各识别档位的模型并做静音预热(可重复调用，只加载一次)
+    短指令档位的小模型先加载，最早可用
+    return: 全部模型就绪的 Future，result() 返回 ModelCache
+    """
+    global _model_future
+    with _future_lock:
+        if _model_future is None:
+            _model_future = Future()
+            threading.Thread(target=_load, args=(_model_future,), daemon=True).start()
+        return _model_future
+
+
+def _load(future: Future):
+    try:
+        t0 = time.perf_counter()
+        for name in ("command", "dictation"):
+            _cache.get(STT_PROFILES[name]["model"])
+        stats["load_sec"] = time.perf_counter() - t0
+        stats["model_load_sec"] = dict(_cache.load_times)
+        _logger.info("语音识别模型已就绪：%s", ", ".join(_cache.loaded()))
+        future.set_result(_cache)
+    except BaseException as e:
+        _logger.error("语音识别模型加载失败: %s", e)
+        future.set_exception(e)
+
+
+def select_profile(duration_sec: float, profile: str = None) -> str:
+    """
+    选择识别档位
+    param duration_sec: 音频时长
+    param profile: 调用方指定的档位("command"/"dictation")，None 时按时长自动选择
+    """
+    if profile in STT_PROFILES:
+        return profile
+    return "command" if duration_sec <= COMMAND_MAX_SEC else "dictation"
+
+
+def _get_backend(profile: str):
+    """获取档位对应的模型(未加载完时等待)，记录首次识别时的等待时间"""
+    preload()
+    model_name = STT_PROFILES[profile]["model"]
+    if "first_wait_sec" not in stats:
+        t0 = time.perf_counter()
+        backend = _cache.get(model_name)
+        stats["first_wait_sec"] = time.perf_counter() - t0
+        return backend
+    return _cache.get(model_name)
+
+
+def _window_profile(profile: str = None) -> str:
+    """实时窗口的档位：窗口只是一段语音的片段，不能按窗口时长选择，未指定时使用听写档位"""
+    return profile if profile in STT_PROFILES else "dictation"
+
+
+_WINDOW_OVERRIDES = ("model", "max_tokens", "beam_size", "best_of", "temperature")
+
+
+def _decode_options(profile: str, window: bool = False) -> dict:
+    """
+    档位的解码参数
+    param window: 实时窗口：每 interval 秒重新解码一次，固定用贪心解码(temperature 0，不做 beam search)，
+                  也不限制 token 数(短指令档位的上限会截断窗口文本)；语音段结束时的整段解码仍使用档位的设置
+    """
+    if window:
+        options = {k: v for k, v in STT_PROFILES[profile].items() if k not in _WINDOW_OVERRIDES}
+        options["temperature"] = 0.0
+        return options
+    return {k: v for k, v in STT_PROFILES[profile].items() if k != "model"}
+
+
+def get_stats() -> dict:
+    """返回加载/预热/首次识别耗时"""
+    return dict(stats)
+
+
+def transcribe_once(audio_np: np.ndarray, prompt: str = None, profile: str = None) -> str:
     """
     单次语音转文字(适用于完整音频片段)
     :param audio_np: 音频数据(numpy数组)
+    :param prompt: 已确认的上文，作为解码提示
+    :param profile: 识别档位，None 时按时长自动选择(只传入完整语音段的一部分时，应由调用方按整段时长选好)
     :return: 转换后的文本(简体中文)
     """
-    with _lock: 
-        result = _model.transcribe(
-            audio_np.astype("float32") / 32768.0,  
-            language="zh",  
-            fp16=False
-        )
-    return _converter.convert(result["text"].strip())
+    profile = select_profile(len(audio_np) / RATE, profile)
+    # 长录音(离线整段转写)在静音处切块，多核并行识别
+    if profile == "dictation" and len(audio_np) > LONGFORM_MIN_SEC * RATE and longform.worker_count() > 1:
+        return _converter.convert(longform.transcribe_long(audio_np))
+    result = _get_backend(profile).transcribe(
+        audio_np.astype("float32") / 32768.0,
+        prompt=prompt,
+        **_decode_options(profile)
+    )
+    return _converter.convert(result["text"])
+
+
+def transcribe_batch(audio_np: np.ndarray, bounds: list, profile: str = None) -> list:
+    """
+    一次识别多段语音(流式识别积压的语音段)：听写档位且有多个进程可用时交给进程池并行识别，
+    否则在本进程中逐段识别
+    param audio_np: 各段首尾相接的 int16 音频
+    param bounds: 各段的 (起点, 终点) 样本位置
+    param profile: 识别档位，None 时按各段时长自动选择
+    return: 与 bounds 一一对应的文本(简体中文)
+    """
+    if profile == "dictation" and len(bounds) > 1 and longform.worker_count() > 1:
+        return [_converter.convert(text) for text in longform.transcribe_chunks(audio_np, bounds)]
+    return [transcribe_once(audio_np[start:end], profile=profile) for start, end in bounds]
+
 
-def transcribe_window(audio_np: np.ndarray) -> str:
+def transcribe_window(audio_np: np.ndarray, prompt: str = None, with_segments: bool = False,
+                      profile: str = None):
     """
     实时窗口语音转文字
     param audio_np: 音频数据
-    return: 转换后的文本，无语音时返回空字符串
-    """
-    with _lock:  
-        result = _model.transcribe(
-            audio_np.astype("float32") / 32768.0, 
-            language="zh",
-            fp16=False,
-            condition_on_previous_text=True,  
-            temperature=0.3,  
-            no_speech_threshold=0.7 
-        )
-    if result.get("no_speech_prob", 0.0) > 0.7:
-        return ""
-    return _converter.convert(result["text"].strip())
\ No newline at end of file
+    param prompt: 已确认的上文，作为解码提示
+    param with_segments: True 时返回分段列表 [(起始秒, 结束秒, 文本), ...]
+    param profile: 识别档位，None 时使用听写档位
+    return: 转换后的文本，无语音时返回空字符串(或空列表)
+    """
+    profile = _window_profile(profile)
+    result = _get_backend(profile).transcribe(
+        audio_np.astype("float32") / 32768.0,
+        prompt=prompt,
+        condition_on_previous_text=True,
+        no_speech_threshold=0.7,
+        **_decode_options(profile, window=True)
+    )
+    return _window_result(result, with_segments)
+
+
+def _window_result(result: dict, with_segments: bool):
+    segments = [(start, end, _converter.convert(text))
+                for start, end, text, no_speech_prob in result["segments"]
+                if no_speech_prob <= 0.7 and text]
+    if with_segments:
+        return segments
+    return "".join(text for _, _, text in segments)
+
+
+def decode_prefix(audio_np: np.ndarray, prompt: str = None, max_tokens: int = 8) -> dict:
+    """
+    短指令快速解码(指令词检测用)：使用短指令档位的模型，只解码开头几个 token
+    return: {"text": 简体文本, "avg_logprob": 平均对数概率, "no_speech_prob": 无语音概率}
+    """
+    result = _get_backend("command").decode_prefix(
+        audio_np.astype("float32") / 32768.0,
+        prompt=prompt,
+        max_tokens=max_tokens
+    )
+    result["text"] = _converter.convert(result["text"])
+    return result
+
+
+def mel_filters(profile: str = None):
+    """
+    返回档位模型的 mel 滤波器组，供流式识别增量计算特征
+    后端不支持直接输入 mel 特征时返回 None
+    """
+    backend = _get_backend(_window_profile(profile))
+    return backend.mel_filters() if backend.supports_mel else None
+
+
+def transcribe_mel(log_mel: np.ndarray, prompt: str = None, with_segments: bool = False,
+                   profile: str = None):
+    """
+    实时窗口语音转文字(输入增量特征缓存中的 log-mel 特征，省去整窗特征提取)
+    param log_mel: stt.mel_cache.IncrementalMel 输出的 (n_mels, 帧数) 特征
+    其余参数与返回值同 transcribe_window
+    """
+    profile = _window_profile(profile)
+    result = _get_backend(profile).transcribe_mel(
+        log_mel,
+        prompt=prompt,
+        no_speech_threshold=0.7,
+        **_decode_options(profile, window=True)
+    )
+    return _window_result(result, with_segments)
@@ -0,0 +1,156 @@
+import atexit
+import logging
+import multiprocessing
+import threading
+from multiprocessing import shared_memory
+import numpy as np
+from config import RATE, MAX_RECORD_SEC
+
+_logger = logging.getLogger(__name__)
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    """子进程附加到父进程创建的共享内存，生命周期由父进程负责"""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:  # Python < 3.13：spawn 子进程与父进程共用 resource_tracker，重复登记无害
+        return shared_memory.SharedMemory(name=name)
+
+
+def _worker_main(conn, shm_name: str):
+    """
+    识别进程主循环
+    请求：(方法名, 形状, dtype, 参数)，数组内容从共享内存读取；None 表示退出
+    响应：("ok", 结果) 或 ("error", 错误描述)
+    """
+    from stt import whisper_engine
+    shm = _attach(shm_name)
+    whisper_engine.preload()
+    try:
+        while True:
+            try:
+                msg = conn.recv()
+            except EOFError:
+                break
+            if msg is None:
+                break
+            method, shape, dtype, kwargs = msg
+            try:
+                fn = getattr(whisper_engine, method)
+                if shape is None:
+                    result = fn(**kwargs)
+                else:
+                    result = fn(np.ndarray(shape, dtype=dtype, buffer=shm.buf), **kwargs)
+                conn.send(("ok", result))
+            except Exception as e:
+                conn.send(("error", f"{type(e).__name__}: {e}"))
+    finally:
+        shm.close()
+
+
+class SttWorker:
+    """
+    独立进程中的语音识别，避免解码与音频采集线程争抢 GIL
+    - 音频经 multiprocessing.shared_memory 传递，父进程拷贝一次，不做 pickle
+    - 请求与识别结果经 Pipe 传递，只包含形状、dtype、解码参数和文本
+    - restart() 重建识别进程，主程序无需重启
+    提供与 whisper_engine 相同的 transcribe_once / transcribe_window / transcribe_mel / decode_prefix 等接口
+    """
+    def __init__(self, capacity_bytes: int = RATE * MAX_RECORD_SEC * 2):
+        self._ctx = multiprocessing.get_context("spawn")
+        self._shm = shared_memory.SharedMemory(create=True, size=capacity_bytes)
+        self._lock = threading.Lock()  # 共享内存同一时间只承载一个请求
+        self._proc = None
+        self._conn = None
+        self.restarts = 0
+        self.start()
+        atexit.register(self.close)
+
+    def start(self):
+        """启动识别进程(进程内后台加载模型)"""
+        parent_conn, child_conn = self._ctx.Pipe()
+        # 非守护进程：长录音并行识别需要在识别进程内再创建进程池
+        self._proc = self._ctx.Process(target=_worker_main, args=(child_conn, self._shm.name),
+                                       name="stt-worker")
+        self._proc.start()
+        child_conn.close()
+        self._conn = parent_conn
+
+    def restart(self):
+        """终止并重建识别进程"""
+        with self._lock:
+            self._stop_process()
+            self.start()
+            self.restarts += 1
+        _logger.warning("语音识别进程已重启(第 %d 次)", self.restarts)
+
+    def _stop_process(self, timeout: float = 5.0):
+        if self._proc is None:
+            return
+        try:
+            self._conn.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+        self._proc.join(timeout)
+        if self._proc.is_alive():
+            self._proc.terminate()
+            self._proc.join()
+        self._conn.close()
+        self._proc = None
+
+    def close(self):
+        """停止识别进程并释放共享内存"""
+        with self._lock:
+            self._stop_process()
+            if self._shm is not None:
+                self._shm.close()
+                self._shm.unlink()
+                self._shm = None
+
+    def _call(self, method: str, array: np.ndarray = None, **kwargs):
+        if array is not None:
+            array = np.ascontiguousarray(array)
+            if array.nbytes > self._shm.size:
+                raise ValueError(f"数据过大：{array.nbytes} 字节，共享内存 {self._shm.size} 字节")
+        with self._lock:
+            try:
+                if array is None:
+                    self._conn.send((method, None, None, kwargs))
+                else:
+                    np.ndarray(array.shape, dtype=array.dtype, buffer=self._shm.buf)[...] = array
+                    self._conn.send((method, array.shape, array.dtype.str, kwargs))
+                status, result = self._conn.recv()
+            except (EOFError, OSError):
+                status, result = "died", f"退出码 {self._proc.exitcode}"
+        if status == "died":
+            self.restart()
+            raise RuntimeError(f"语音识别进程异常退出({result})，已重启")
+        if status == "error":
+            raise RuntimeError(f"语音识别失败：{result}")
+        return result
+
+    # ----------------- 与 whisper_engine 相同的接口 -----------------
+    def transcribe_once(self, audio_np: np.ndarray, prompt: str = None, profile: str = None) -> str:
+        return self._call("transcribe_once", audio_np, prompt=prompt, profile=profile)
+
+    def transcribe_batch(self, audio_np: np.ndarray, bounds: list, profile: str = None) -> list:
+        return self._call("transcribe_batch", audio_np, bounds=bounds, profile=profile)
+
+    def transcribe_window(self, audio_np: np.ndarray, prompt: str = None, with_segments: bool = False,
+                          profile: str = None):
+        return self._call("transcribe_window", audio_np, prompt=prompt, with_segments=with_segments,
+                          profile=profile)
+
+    def decode_prefix(self, audio_np: np.ndarray, prompt: str = None, max_tokens: int = 8) -> dict:
+        return self._call("decode_prefix", audio_np, prompt=prompt, max_tokens=max_tokens)
+
+    def mel_filters(self, profile: str = None):
+        return self._call("mel_filters", profile=profile)
+
+    def transcribe_mel(self, log_mel: np.ndarray, prompt: str = None, with_segments: bool = False,
+                       profile: str = None):
+        return self._call("transcribe_mel", log_mel, prompt=prompt, with_segments=with_segments,
+                          profile=profile)
+
+    def get_stats(self) -> dict:
+        return self._call("get_stats")
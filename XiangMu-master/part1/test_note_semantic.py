@@ -0,0 +1,95 @@
+import numpy as np
+from note_assistant import NoteAssistant
+from note_semantic import HashEmbedder, SemanticIndex
+
+NOTES = {1: "明天下午开会讨论项目进度", 2: "周末去超市买菜", 3: "会议纪要：项目延期一周", 4: "给妈妈打电话"}
+
+
+class CountingEmbedder(HashEmbedder):
+    """记录被计算向量的文本"""
+    def __init__(self):
+        super().__init__()
+        self.texts = []
+
+    def embed(self, texts):
+        self.texts.extend(texts)
+        return super().embed(texts)
+
+
+def _index(tmp_path, embedder=None, notes=NOTES):
+    index = SemanticIndex(tmp_path / "notes.emb", embedder or HashEmbedder(), batch_size=2)
+    for note_id, text in notes.items():
+        index.add(note_id, text)
+    assert index.wait_idle(5)
+    return index
+
+
+def test_append(tmp_path):
+    index = _index(tmp_path)
+    assert len(index) == 4 and index.pending == 0
+    # 常驻副本只保存已使用的行，不随文件容量分配
+    assert len(index._vectors) == 1024
+    assert len(index._matrix) == 4
+    for note_id in range(5, 25):
+        index.add(note_id, f"第{note_id}条笔记")
+    assert index.wait_idle(5)
+    assert len(index) == 24
+    assert 24 <= len(index._matrix) < 48
+
+
+def test_top_k_ordering(tmp_path):
+    index = _index(tmp_path)
+    hits = index.search("项目会议", k=3)
+    assert len(hits) == 3
+    assert {hits[0][0], hits[1][0]} == {1, 3}  # 与项目/会议字面重合的两条排在前面
+    scores = [score for _, score in hits]
+    assert scores == sorted(scores, reverse=True)
+    q = HashEmbedder().embed(["项目会议"])[0]
+    v = HashEmbedder().embed([NOTES[hits[0][0]]])[0]
+    expected = q @ v / np.linalg.norm(q) / np.linalg.norm(v)
+    assert abs(hits[0][1] - expected) < 1e-2  # 向量以 float16 存储
+    assert index.search("项目会议", k=3, min_score=hits[1][1]) == hits[:2]
+
+
+def test_reopen_does_not_embed_again(tmp_path):
+    _index(tmp_path).close()
+    embedder = CountingEmbedder()
+    index = SemanticIndex(tmp_path / "notes.emb", embedder)
+    assert len(index) == 4 and len(index._matrix) == 4
+    index.sync([{"id": i, "text": t} for i, t in NOTES.items()])
+    assert index.wait_idle(5)
+    assert embedder.texts == []
+    assert index.search("买菜", k=1)[0][0] == 2
+
+
+def test_delete(tmp_path):
+    index = _index(tmp_path)
+    index.remove(2)
+    assert len(index) == 3
+    assert 2 not in [note_id for note_id, _ in index.search("买菜", k=4)]
+    index.close()
+    # 删除已写入文件，重新打开后仍然生效；之后新增的笔记追加在末尾
+    index = SemanticIndex(tmp_path / "notes.emb", HashEmbedder())
+    assert len(index) == 3
+    index.add(5, "周末去超市买菜")
+    assert index.wait_idle(5)
+    assert index.search("买菜", k=1)[0][0] == 5
+
+
+def test_add_note_does_not_embed_until_semantic_search(tmp_path):
+    embedder = CountingEmbedder()
+    assistant = NoteAssistant(tmp_path / "notes.json", search_mode="hybrid", embedder=embedder)
+    try:
+        for text in NOTES.values():
+            assistant.add_note(text)
+        assert "买菜" in assistant.search_notes("买菜")  # 关键词命中，不需要向量
+        assert embedder.texts == []
+        assistant.search_notes("项目开会")  # 关键词没有结果，首次语义检索时才为已有笔记计算向量
+        assert assistant.semantic.wait_idle(5)
+        assistant.add_note("下周讨论预算")
+        assert assistant.semantic.wait_idle(5)
+        notes = [*NOTES.values(), "下周讨论预算"]
+        assert sorted(t for t in embedder.texts if t in notes) == sorted(notes)  # 每条笔记只计算一次
+        assert "下周讨论预算" in assistant.semantic_search("讨论预算")
+    finally:
+        assistant.close()
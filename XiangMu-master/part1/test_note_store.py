@@ -0,0 +1,357 @@
+import json
+import os
+import time
+import pytest
+from note_index import NoteIndex
+from note_store import JournalNoteStore, JsonNoteStore, NoteCache, SqliteNoteStore, note_cache
+
+
+def _open(path, **kwargs):
+    return JournalNoteStore(path, legacy_path=None, fsync="never", **kwargs)
+
+
+def _texts(store):
+    return [n["text"] for n in store.all()]
+
+
+def test_replay(tmp_path):
+    path = tmp_path / "notes.jsonl"
+    store = _open(path)
+    for text in ("项目报告", "买菜", "开会"):
+        store.add(text)
+    assert store.delete_last()["text"] == "开会"
+    store.close()
+
+    store = _open(path)
+    assert _texts(store) == ["项目报告", "买菜"]
+    assert store.add("写周报")["id"] == 4  # 编号不复用
+    store.close()
+
+
+def test_torn_tail_is_truncated(tmp_path):
+    path = tmp_path / "notes.jsonl"
+    store = _open(path)
+    store.add("项目报告")
+    store.close()
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"op": "add", "id": 2, "ti')  # 崩溃时写了一半的记录
+
+    store = _open(path)
+    assert _texts(store) == ["项目报告"]
+    store.add("买菜")
+    store.close()
+    lines = path.read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line)["text"] for line in lines] == ["项目报告", "买菜"]
+
+
+def test_tail_without_newline_is_not_merged(tmp_path):
+    path = tmp_path / "notes.jsonl"
+    store = _open(path)
+    store.add("A")
+    store.close()
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps({"op": "add", "id": 2, "time": "2024-01-01 00:00:00", "text": "B"}))  # 缺少换行符
+
+    store = _open(path)
+    store.add("C")
+    store.add("D")
+    store.close()
+    store = _open(path)
+    assert _texts(store) == ["A", "B", "C", "D"]
+    store.close()
+    assert len(path.read_text(encoding="utf-8").splitlines()) == 4
+
+
+def test_corrupt_line_in_the_middle_is_skipped(tmp_path):
+    path = tmp_path / "notes.jsonl"
+    store = _open(path)
+    store.add("A")
+    store.close()
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"op": "add", "id": 2, "te\n')
+    store = _open(path)
+    store.add("C")
+    store.close()
+
+    store = _open(path)
+    assert _texts(store) == ["A", "C"]  # 损坏行之后的记录不被截断
+    store.close()
+    assert len(path.read_text(encoding="utf-8").splitlines()) == 3
+
+
+def test_compaction(tmp_path):
+    path = tmp_path / "notes.jsonl"
+    store = _open(path, compact_min=10**6)
+    for i in range(10):
+        store.add(f"笔记{i} report")
+    for _ in range(6):
+        store.delete_last()
+    store.compact()
+    assert store.compactions == 1
+    lines = path.read_text(encoding="utf-8").splitlines()
+    assert len(lines) == 4
+    assert [n["id"] for n in store.search("report")] == [1, 2, 3, 4]
+    store.close()
+
+    store = _open(path)
+    assert _texts(store) == [f"笔记{i} report" for i in range(4)]
+    store.close()
+
+
+def test_background_compaction(tmp_path):
+    path = tmp_path / "notes.jsonl"
+    store = _open(path, compact_min=6)  # 第 3 次删除后失效记录达到 6 条
+    for i in range(6):
+        store.add(f"笔记{i}")
+    for _ in range(3):
+        store.delete_last()
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:  # 压缩在后台线程中进行
+        with store._lock:
+            if store.compactions and store._compacting is None:
+                break
+        time.sleep(0.01)
+    assert store.compactions == 1
+    assert _texts(store) == ["笔记0", "笔记1", "笔记2"]
+    store.close()
+    assert len(path.read_text(encoding="utf-8").splitlines()) == 3
+
+
+def test_index_reloaded_without_rebuild(tmp_path, monkeypatch):
+    path = tmp_path / "notes.jsonl"
+    store = _open(path)
+    for text in ("项目报告", "买菜", "项目进度"):
+        store.add(text)
+    store.delete_last()
+    store.compact()
+    store.add("项目总结")
+    store.close()
+
+    def rebuild(self, notes):
+        raise AssertionError("索引与日志吻合时不应重建")
+
+    monkeypatch.setattr(NoteIndex, "rebuild", rebuild)
+    store = _open(path)
+    assert [n["text"] for n in store.search("项目")] == ["项目报告", "项目总结"]
+    store.close()
+
+
+def test_index_catches_up_with_appended_records(tmp_path):
+    path = tmp_path / "notes.jsonl"
+    store = _open(path)
+    store.add("项目报告")
+    store.close()
+    # 索引保存后日志又追加了记录(如另一个进程写入)：只为新记录更新索引
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps({"op": "add", "id": 2, "time": "2024-01-01 00:00:00", "text": "项目总结"},
+                           ensure_ascii=False) + "\n")
+        f.write(json.dumps({"op": "del", "id": 1}) + "\n")
+
+    store = _open(path)
+    assert [n["text"] for n in store.search("项目")] == ["项目总结"]
+    store.close()
+
+
+def test_stale_index_is_rebuilt(tmp_path):
+    path = tmp_path / "notes.jsonl"
+    store = _open(path)
+    store.add("项目报告")
+    store.add("买菜")
+    store.close()
+    # 在索引覆盖的范围内改写日志(inode 不变)
+    with open(path, "r+", encoding="utf-8") as f:
+        f.truncate(0)
+        f.write(json.dumps({"op": "add", "id": 1, "time": "2024-01-01 00:00:00", "text": "开会"},
+                           ensure_ascii=False) + "\n")
+
+    store = _open(path)
+    assert store.search("项目") == []
+    assert [n["text"] for n in store.search("开会")] == ["开会"]
+    store.close()
+
+
+def test_index_is_saved_as_json(tmp_path):
+    path = tmp_path / "notes.jsonl"
+    store = _open(path)
+    store.add("项目报告 v2")
+    store.close()
+    data = json.loads((tmp_path / "notes.jsonl.idx.json").read_text(encoding="utf-8"))
+    assert data["version"] == 2
+    assert data["source"]["offset"] == path.stat().st_size
+    assert data["source"]["mtime_ns"] == path.stat().st_mtime_ns
+    assert data["postings"]["项目"] == [1] and data["postings"]["v2"] == [1]
+
+
+def test_rewrite_of_same_size_is_detected(tmp_path):
+    path = tmp_path / "notes.jsonl"
+    store = _open(path)
+    store.add("项目报告")
+    store.close()
+    # 等长改写：inode、长度、记录数都不变，只有 mtime 不同
+    text = path.read_text(encoding="utf-8").replace("项目报告", "会议纪要")
+    st = path.stat()
+    with open(path, "r+", encoding="utf-8") as f:
+        f.write(text)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+    store = _open(path)
+    assert store.search("项目") == []
+    assert [n["text"] for n in store.search("会议")] == ["会议纪要"]
+    store.close()
+
+
+@pytest.mark.parametrize("content", ["not json", '{"version": 2, "source": {}, "postings": {"项": "x"}}',
+                                     '{"version": 1}'])
+def test_unreadable_index_is_rebuilt(tmp_path, content):
+    path = tmp_path / "notes.jsonl"
+    store = _open(path)
+    store.add("项目报告")
+    store.close()
+    (tmp_path / "notes.jsonl.idx.json").write_text(content, encoding="utf-8")
+
+    store = _open(path)
+    assert [n["text"] for n in store.search("项目")] == ["项目报告"]
+    store.close()
+
+
+@pytest.mark.parametrize("fsync", ["always", "batch", "never"])
+def test_fsync_policies(tmp_path, fsync):
+    path = tmp_path / "notes.jsonl"
+    store = JournalNoteStore(path, legacy_path=None, fsync=fsync)
+    store.add("项目报告")
+    store.close()
+    assert _texts(_open(path)) == ["项目报告"]
+
+
+NOTES = ["项目报告", "hello world", "买菜", "Yellow 项目进度", "help", "报告项目 shell", "项", "a+b"]
+
+
+def _stores(tmp_path):
+    journal = _open(tmp_path / "notes.jsonl")
+    sqlite = SqliteNoteStore(tmp_path / "notes.db", legacy_path=None, fsync="never")
+    for text in NOTES:
+        journal.add(text)
+        sqlite.add(text)
+    return journal, sqlite
+
+
+@pytest.mark.parametrize("keyword, expected", [
+    ("项目", ["项目报告", "Yellow 项目进度", "报告项目 shell"]),  # 汉字二字组合
+    ("目报", ["项目报告"]),
+    ("项", ["项目报告", "Yellow 项目进度", "报告项目 shell", "项"]),  # 单字
+    ("项目 报告", ["项目报告", "报告项目 shell"]),
+    ("ell", ["hello world", "Yellow 项目进度", "报告项目 shell"]),  # 英文子串经 fts5vocab 查出 hello/yellow/shell
+    ("hel", ["hello world", "help", "报告项目 shell"]),
+    ("ell 项目", ["Yellow 项目进度", "报告项目 shell"]),
+    ("+", ["a+b"]),  # 没有可用的词项时逐条比较原文
+    ("xyz", []),
+])
+def test_sqlite_search_matches_journal(tmp_path, keyword, expected):
+    journal, sqlite = _stores(tmp_path)
+    assert [n["text"] for n in sqlite.search(keyword)] == expected
+    assert sqlite.search(keyword) == journal.search(keyword)
+    journal.close()
+    sqlite.close()
+
+
+def test_sqlite_search_pages(tmp_path):
+    journal, sqlite = _stores(tmp_path)
+    texts = [n["text"] for n in sqlite.search("项")]
+    pages = [[n["text"] for n in sqlite.search("项", limit=2, offset=i)] for i in (0, 2, 4)]
+    assert pages == [texts[0:2], texts[2:4], []]
+    for store in (journal, sqlite):
+        assert [n["text"] for n in store.search("ell", limit=1, offset=1)] == ["Yellow 项目进度"]
+    journal.close()
+    sqlite.close()
+
+
+def test_sqlite_delete_last(tmp_path):
+    _, sqlite = _stores(tmp_path)
+    assert sqlite.delete_last()["text"] == "a+b"
+    assert sqlite.delete_last()["text"] == "项"
+    assert [n["text"] for n in sqlite.search("项")] == ["项目报告", "Yellow 项目进度", "报告项目 shell"]
+    assert sqlite.search("+") == []
+    sqlite.close()
+
+
+def test_sqlite_legacy_migration_runs_once(tmp_path):
+    legacy = tmp_path / "notes.json"
+    legacy.write_text(json.dumps([{"time": "2024-01-01 00:00:00", "text": "旧笔记"}], ensure_ascii=False),
+                      encoding="utf-8")
+    store = SqliteNoteStore(tmp_path / "notes.db", legacy_path=legacy, fsync="never")
+    assert [n["text"] for n in store.all()] == ["旧笔记"]
+    assert store._meta("migrated") is not None
+    store.delete_last()
+    store.close()
+    assert legacy.exists()  # 原文件保留
+
+    # 删光笔记后重新打开，不会再次导入旧文件
+    store = SqliteNoteStore(tmp_path / "notes.db", legacy_path=legacy, fsync="never")
+    assert store.count() == 0
+    store.close()
+
+
+def test_note_cache_hit_and_miss(tmp_path):
+    path = tmp_path / "notes.json"
+    path.write_text("[]", encoding="utf-8")
+    cache = NoteCache()
+    loads = []
+
+    def loader():
+        loads.append(path.read_text(encoding="utf-8"))
+        return json.loads(loads[-1])
+
+    assert cache.get(path, loader) == []
+    assert cache.get(path, loader) == []
+    assert cache.stats() == {"hits": 1, "misses": 1, "files": 1}
+    assert len(loads) == 1
+
+    cache.invalidate(path)
+    cache.get(path, loader)
+    assert len(loads) == 2
+
+
+def _bump_mtime(path):
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+
+@pytest.mark.parametrize("change", ["mtime", "size", "rename"])
+def test_note_cache_invalidated_on_change(tmp_path, change):
+    path = tmp_path / "notes.json"
+    path.write_text('["A"]', encoding="utf-8")
+    cache = NoteCache()
+
+    def loader():
+        return json.loads(path.read_text(encoding="utf-8"))
+
+    assert cache.get(path, loader) == ["A"]
+    st = os.stat(path)
+    if change == "mtime":  # 大小不变的原地修改
+        path.write_text('["B"]', encoding="utf-8")
+        _bump_mtime(path)
+    elif change == "size":  # 修改后 mtime 恰好相同(粗粒度时间戳)
+        path.write_text('["B", "C"]', encoding="utf-8")
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns))
+    else:  # 编辑器写入临时文件后改名替换：大小、mtime 都相同，只有 inode 不同
+        tmp = tmp_path / "notes.json.tmp"
+        tmp.write_text('["B"]', encoding="utf-8")
+        os.utime(tmp, ns=(st.st_atime_ns, st.st_mtime_ns))
+        os.replace(tmp, path)
+        assert os.stat(path).st_ino != st.st_ino
+    assert cache.get(path, loader) != ["A"]
+    assert cache.stats()["misses"] == 2
+
+
+def test_json_store_reads_through_cache(tmp_path):
+    path = tmp_path / "notes.json"
+    store = JsonNoteStore(path)
+    store.add("项目报告")
+    before = note_cache.stats()
+    assert [n["text"] for n in store.all()] == ["项目报告"]
+    assert note_cache.stats()["hits"] == before["hits"] + 1  # 自己写入后直接命中，不重新解析
+    # 外部修改后重新加载
+    path.write_text(json.dumps([{"time": "2024-01-01 00:00:00", "text": "外部编辑"}], ensure_ascii=False),
+                    encoding="utf-8")
+    _bump_mtime(path)
+    assert [n["text"] for n in store.all()] == ["外部编辑"]
@@ -24,8 +24,11 @@ class ConsoleUI:
         self.last_segment = ""
 
     def update_realtime(self, text: str):
-        """更新实时识别的文本"""
+        """更新并显示实时识别的文本"""
+        if text == self.realtime_text:
+            return
         self.realtime_text = text
+        console.print(f"[实时] {text}", style="dim")
 
     def get_last_realtime_text(self) -> str:
         """获取最终的实时识别文本"""